@@ -1,5 +1,10 @@
 # -*- mode: python ; coding: utf-8 -*-
+# 默认打成目录（dist\NPD_Model\NPD_Model.exe）：单文件 exe 每次启动都要先把整个运行时解压到临时目录，
+# 目录版直接从磁盘加载，冷启动快得多。需要单文件时：set NPD_ONEFILE=1 后再打包。
+# 不用 UPX：压缩过的 DLL 每次加载都要解压，还常被杀毒软件逐个扫描，拖慢启动。
+import os
 
+ONEFILE = os.environ.get('NPD_ONEFILE') == '1'
 
 a = Analysis(
     ['npd_windows.py'],
@@ -10,29 +15,58 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # numpy 对图形界面只是可选加速（未安装时各模块退回纯 Python）；其余是用不到的标准库
+    excludes=['numpy', 'unittest', 'doctest', 'pydoc', 'lib2to3', 'test'],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='NPD_Model',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if ONEFILE:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='NPD_Model',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='NPD_Model',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='NPD_Model',
+    )
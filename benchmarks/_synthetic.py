@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""基准用的合成数据（可复现）：按内置卡片的文字风格拼出任意规模的库，以及按内置映射生成的事件流。"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from npd import (  # noqa: E402
+    EscalationLevel,
+    PatternCard,
+    PatternRegistry,
+    TriggerType,
+    get_likely_patterns_for_trigger,
+    get_registry,
+)
+from npd_journal import new_incident  # noqa: E402
+from npd_library import LibraryKey, registry_to_dict  # noqa: E402
+
+
+def _fragments():
+    builtin = get_registry()
+    texts = [c.description for c in builtin.cards] + [c.healing_note for c in builtin.cards]
+    return [part for t in texts for part in t.replace("。", "，").split("，") if part]
+
+
+def make_library_dict(n_cards, n_triggers=None, patterns_per_trigger=6, seed=0):
+    """返回库文件格式的字典（不继承内置库）：n_cards 张卡片、n_triggers 个触发。"""
+    rng = random.Random(seed)
+    frags = _fragments()
+    n_triggers = n_triggers or max(8, n_cards // 10)
+    base = registry_to_dict()
+    patterns = [
+        {
+            "name": f"模式{i:06d}",
+            "value": f"pattern_{i}",
+            "serves_need": rng.choice(base["needs"])["value"],
+            "description": "，".join(rng.sample(frags, 3)) + "。",
+            "healing_note": "，".join(rng.sample(frags, 2)) + "。",
+        }
+        for i in range(n_cards)
+    ]
+    triggers = [
+        {
+            "name": f"触发{i:05d}",
+            "value": f"trigger_{i}",
+            "description": "，".join(rng.sample(frags, 2)),
+            "patterns": [patterns[j]["value"] for j in rng.sample(range(n_cards), min(patterns_per_trigger, n_cards))],
+        }
+        for i in range(n_triggers)
+    ]
+    return {"extends": None, "needs": base["needs"], "triggers": triggers, "patterns": patterns}
+
+
+def make_registry(n_cards, n_triggers=None, patterns_per_trigger=6, seed=0):
+    """直接构建合成注册表（跳过库文件编译），用于测量查询与格式化在大库上的开销。"""
+    data = make_library_dict(n_cards, n_triggers, patterns_per_trigger, seed)
+    needs = {n: n for n in get_registry().needs}
+    need_by_value = {n.value: n for n in needs}
+    pattern_keys = {p["value"]: LibraryKey("pattern", p["name"], p["value"]) for p in data["patterns"]}
+    cards = [
+        PatternCard(pattern_keys[p["value"]], need_by_value[p["serves_need"]], p["description"], p["healing_note"])
+        for p in data["patterns"]
+    ]
+    trigger_patterns = {}
+    trigger_desc = {}
+    for t in data["triggers"]:
+        key = LibraryKey("trigger", t["name"], t["value"])
+        trigger_patterns[key] = [pattern_keys[v] for v in t["patterns"]]
+        trigger_desc[key] = t["description"]
+    need_desc = {n: get_registry().need_description(n) for n in needs}
+    return PatternRegistry(cards, trigger_patterns, trigger_desc, need_desc)
+
+
+def synthetic_incidents(n, seed=0, start=datetime(2020, 1, 1)):
+    """按内置映射随机生成 n 条事件，时间从 start 起每条间隔约 6 小时。"""
+    rng = random.Random(seed)
+    triggers = list(TriggerType)
+    stages = list(EscalationLevel)
+    ts = start
+    for _ in range(n):
+        ts += timedelta(minutes=rng.randint(30, 690))
+        picked = rng.sample(triggers, rng.choice((1, 1, 2)))
+        candidates = [p for t in picked for p in get_likely_patterns_for_trigger(t)]
+        patterns = list(dict.fromkeys(rng.sample(candidates, min(len(candidates), rng.randint(1, 3)))))
+        yield new_incident(picked, patterns, rng.choice(stages), "合成事件", timestamp=ts)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+事件归档基准：把 N 条合成事件（默认 50 万条，约每 6 小时一条）写成 .jsonl 日志与 .npda 归档，
+比较文件大小，以及「全部事件的行为模式计数」「某一年的触发计数」在两种格式上的耗时——
+日志只能逐行解析，归档只读用到的列（装有 NumPy 时另测 numpy=True 的向量化路径）。
+
+运行：python benchmarks/bench_archive.py [--incidents N]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from _synthetic import synthetic_incidents  # noqa: E402
+from npd_archive import IncidentArchive, pack_journal, write_archive  # noqa: E402
+from npd_journal import iter_incidents, new_incident  # noqa: E402
+from npd import get_registry  # noqa: E402
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def check_mixed_widths(tmp: str) -> None:
+    """各块收窄到不同宽度（B 与 H）的计数列，拼接后的整列须与逐条事件一致。"""
+    pattern = get_registry().patterns[0]
+    incidents = [new_incident(patterns=(pattern,)) for _ in range(4)] + [new_incident(patterns=(pattern,) * 300)]
+    path = os.path.join(tmp, "mixed.npda")
+    write_archive(path, incidents, chunk_rows=4)
+    with IncidentArchive(path) as archive:
+        expected = [len(inc.patterns) for inc in incidents]
+        assert list(archive.column("pattern_count")) == expected, list(archive.column("pattern_count"))
+        assert len(archive.column("pattern")) == sum(expected)
+        if HAS_NUMPY:
+            assert archive.column("pattern_count", numpy=True).tolist() == expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=500000, help="事件数")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        check_mixed_widths(tmp)
+        journal = os.path.join(tmp, "journal.jsonl")
+        archive_path = os.path.join(tmp, "history.npda")
+        with open(journal, "w", encoding="utf-8") as f:
+            for incident in synthetic_incidents(args.incidents):
+                f.write(incident.to_json() + "\n")
+        pack_ms, _ = _timed(lambda: pack_journal(journal, archive_path))
+        print(f"事件数：{args.incidents:,}；日志 {os.path.getsize(journal) / 1e6:,.1f} MB，"
+              f"归档 {os.path.getsize(archive_path) / 1e6:,.2f} MB（打包 {pack_ms / 1000:.1f} s）")
+
+        with IncidentArchive(archive_path) as archive:
+            first = archive.chunks[0]["ts_min"]
+            year = time.gmtime(first).tm_year + 1
+            since, until = f"{year}-01-01", f"{year}-12-31"
+
+            def journal_patterns():
+                return Counter(p.value for inc in iter_incidents(journal) for p in inc.patterns)
+
+            def journal_year():
+                return Counter(t.value for inc in iter_incidents(journal)
+                               if since <= inc.timestamp.date().isoformat() <= until for t in inc.triggers)
+
+            cases = [
+                ("全部事件的行为模式计数", journal_patterns, lambda: archive.counts("pattern"),
+                 lambda: archive.counts("pattern", numpy=True)),
+                (f"{year} 年的触发计数", journal_year, lambda: archive.counts("trigger", since, until),
+                 lambda: archive.counts("trigger", since, until, numpy=True)),
+            ]
+            for label, slow, fast, vector in cases:
+                slow_ms, _ = _timed(slow)
+                fast_ms, _ = _timed(fast)
+                line = f"{label}：日志 {slow_ms:,.0f} ms，归档 {fast_ms:,.1f} ms"
+                if HAS_NUMPY:
+                    vector()  # 先导入 NumPy
+                    vector_ms, _ = _timed(vector)
+                    line += f"，归档 + NumPy {vector_ms:,.1f} ms"
+                print(line)
+            touched = sum(c["columns"]["pattern"][1] for c in archive.chunks)
+            print(f"模式计数读取的字节：{touched / 1e6:.2f} MB / 归档 {archive.nbytes / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
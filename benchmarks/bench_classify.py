@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+短语分类吞吐：合成一份 N MB 的聊天记录（大部分是无关内容，夹杂词表中的说法），
+测量自动机编译耗时、整篇 classify() 与逐行 classify_lines() 的 MB/秒。
+
+运行：python benchmarks/bench_classify.py [--mb 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from npd_classify import PATTERN_PHRASES, TRIGGER_PHRASES, PhraseClassifier  # noqa: E402
+
+_FILLER = "今天下班有点晚路上堵车晚饭吃了面条周末可能去公园走走天气预报说会下雨记得带伞"
+
+
+def _chat(mb, seed=0):
+    rng = random.Random(seed)
+    phrases = [p for ps in (*PATTERN_PHRASES.values(), *TRIGGER_PHRASES.values()) for p in ps]
+    lines = []
+    size = 0
+    while size < mb * 1e6:
+        n = rng.randint(8, 40)
+        start = rng.randrange(len(_FILLER) - 8)
+        text = (_FILLER * 2)[start:start + n]
+        if rng.random() < 0.2:
+            cut = rng.randrange(len(text))
+            text = text[:cut] + rng.choice(phrases) + text[cut:]
+        line = f"{rng.choice(('妈妈', '我'))}：{text}"
+        lines.append(line)
+        size += len(line.encode("utf-8")) + 1
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mb", type=float, default=8.0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    classifier = PhraseClassifier()
+    print(f"编译自动机：{len(classifier.automaton)} 条短语，{(time.perf_counter() - start) * 1000:.2f} ms")
+
+    lines = _chat(args.mb)
+    text = "\n".join(lines)
+    mb = len(text.encode("utf-8")) / 1e6
+
+    start = time.perf_counter()
+    result = classifier.classify(text, limit=3)
+    elapsed = time.perf_counter() - start
+    top = "、".join(f"{s.key.name}×{s.count}" for s in result.patterns)
+    print(f"整篇分类：{mb:.1f} MB，{elapsed:.2f} s，{mb / elapsed:.1f} MB/秒（前三：{top}）")
+
+    start = time.perf_counter()
+    matched = sum(1 for _, r in classifier.classify_lines(lines) if r)
+    elapsed = time.perf_counter() - start
+    print(f"逐行分类：{len(lines):,} 行，{elapsed:.2f} s，{len(lines) / elapsed:,.0f} 行/秒，{matched:,} 行有命中")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+命令行冷启动与批处理吞吐：
+  - 冷启动：多次启动子进程取中位数，与空解释器（python -c pass）对比；
+  - 导入检查：用 -X importtime 确认命令行从不导入 tkinter；
+  - 批处理：向 batch 子命令灌入 N 行触发名，测量每秒处理行数。
+
+运行：python benchmarks/bench_cli_startup.py [--runs N] [--lines N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "npd_cli.py")
+sys.path.insert(0, ROOT)
+
+from npd import TriggerType  # noqa: E402
+
+
+def _median_ms(cmd, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=15, help="每项冷启动的次数")
+    parser.add_argument("--lines", type=int, default=100000, help="批处理输入行数")
+    args = parser.parse_args(argv)
+
+    py = sys.executable
+    base = _median_ms([py, "-c", "pass"], args.runs)
+    print(f"空解释器：            {base:7.1f} ms")
+    for label, cmd in [
+        ("trigger boundary", [py, CLI, "trigger", "boundary"]),
+        ("pattern gaslighting", [py, CLI, "pattern", "gaslighting"]),
+        ("search 你想多了", [py, CLI, "search", "你想多了"]),
+    ]:
+        ms = _median_ms(cmd, args.runs)
+        print(f"{label:<22}{ms:7.1f} ms（比空解释器多 {ms - base:.1f} ms）")
+
+    proc = subprocess.run([py, "-X", "importtime", CLI, "trigger", "boundary"],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    imported = {line.rsplit("|", 1)[-1].strip() for line in proc.stderr.splitlines() if "|" in line}
+    print(f"导入模块数：{len(imported)}；tkinter 已导入：{'是' if any(m.startswith('tkinter') for m in imported) else '否'}")
+
+    names = [t.value if i % 2 else t.name for i, t in enumerate(TriggerType)]
+    data = "\n".join(names[i % len(names)] for i in range(args.lines)) + "\n"
+    start = time.perf_counter()
+    out = subprocess.run([py, CLI, "batch"], input=data.encode("utf-8"), stdout=subprocess.PIPE, check=True).stdout
+    elapsed = time.perf_counter() - start
+    n_out = out.count(b"\n")
+    print(f"batch：{args.lines} 行 → {n_out} 行 JSON，{args.lines / elapsed:,.0f} 行/秒（含启动）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+模型图基准：在合成库上测量建图（邻接 + 传递闭包）耗时，以及多跳查询
+——某需求由哪些触发最终喂给、两个触发共有的模式、某模式的全部上游触发——
+用位掩码闭包与逐跳遍历注册表（不建图时的写法）各要多久；最后是最小触发覆盖。
+
+运行：python benchmarks/bench_graph.py [--cards N [N ...]]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from _synthetic import make_registry  # noqa: E402
+from npd_graph import ModelGraph  # noqa: E402
+
+
+def _naive_feeding(registry, need):
+    out = []
+    for t in registry.triggers:
+        for p in registry.patterns_for_trigger(t):
+            card = registry.card_for_pattern(p)
+            if card is not None and card.serves_need == need:
+                out.append(t)
+                break
+    return out
+
+
+def _naive_shared(registry, a, b):
+    other = set(registry.patterns_for_trigger(b))
+    return [p for p in registry.patterns_for_trigger(a) if p in other]
+
+
+def _naive_upstream(registry, pattern):
+    return [t for t in registry.triggers if pattern in registry.patterns_for_trigger(t)]
+
+
+def _per_call_us(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 10000, 50000], help="合成库的卡片数")
+    args = parser.parse_args(argv)
+
+    for n in args.cards:
+        registry = make_registry(n)
+        start = time.perf_counter()
+        graph = ModelGraph(registry)
+        built = time.perf_counter() - start
+        needs = [(need,) for need in registry.needs] * 20
+        pairs = [(registry.triggers[i], registry.triggers[i + 1]) for i in range(0, min(200, len(registry.triggers) - 1))]
+        patterns = [(p,) for p in registry.patterns[:200]]
+        print(f"卡片数：{n:,}（{len(registry.triggers):,} 个触发，{len(graph):,} 个节点）  建图 {built * 1000:.1f} ms")
+        rows = [
+            ("喂给某需求的触发", lambda need: graph.triggers_feeding(need), lambda need: _naive_feeding(registry, need), needs),
+            ("两个触发共有的模式", graph.shared_patterns, lambda a, b: _naive_shared(registry, a, b), pairs),
+            ("某模式的上游触发", lambda p: graph.ancestors(p, "trigger"), lambda p: _naive_upstream(registry, p), patterns),
+        ]
+        for label, fast, slow, cases in rows:
+            _per_call_us(fast, cases)  # 超过 EAGER_NODES 的大库闭包按需计算：先走一遍，测的是缓存后的查询
+            assert [list(fast(*c)) for c in cases[:5]] == [list(slow(*c)) for c in cases[:5]]
+            g, s = _per_call_us(fast, cases), _per_call_us(slow, cases)
+            print(f"  {label}：闭包 {g:9.1f} µs  逐跳遍历 {s:10.1f} µs（{s / g:7.1f}×）")
+        start = time.perf_counter()
+        cover = graph.min_trigger_cover()
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        graph.min_trigger_cover()
+        again = time.perf_counter() - start
+        print(f"  最小触发覆盖：{len(cover.triggers):,} 个触发（{'已证明最少' if cover.exact else '预算内最好'}）"
+              f"  首次 {first * 1000:.1f} ms  缓存 {again * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
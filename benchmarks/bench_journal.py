@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+事件日志基准：写入 N 条合成事件，测量追加吞吐、重新打开（读取汇总）耗时、汇总查询耗时与全量流式读取耗时。
+
+运行：python benchmarks/bench_journal.py [--incidents N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _synthetic import synthetic_incidents  # noqa: E402
+from npd_journal import IncidentJournal, iter_incidents  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=200000, help="事件数")
+    args = parser.parse_args(argv)
+
+    incidents = list(synthetic_incidents(args.incidents))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.jsonl")
+        start = time.perf_counter()
+        with IncidentJournal(path) as journal:
+            for inc in incidents:
+                journal.append(inc)
+        append_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with IncidentJournal(path) as journal:
+            reopen_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            journal.pattern_counts()
+            journal.need_counts()
+            query_us = (time.perf_counter() - start) * 1e6
+
+        start = time.perf_counter()
+        n = sum(1 for _ in iter_incidents(path))
+        scan_s = time.perf_counter() - start
+
+        size_mb = os.path.getsize(path) / 1e6
+    print(f"事件数：{n}（{size_mb:.1f} MB）")
+    print(f"追加：{args.incidents / append_s:,.0f} 条/秒")
+    print(f"重新打开（读取汇总，不重扫）：{reopen_ms:.2f} ms")
+    print(f"汇总查询：{query_us:.0f} µs")
+    print(f"全量流式读取：{scan_s:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
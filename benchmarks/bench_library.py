@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+外部模式库加载基准：同一个合成库分别测量「解析 + 编译 + 写缓存」（冷启动）与「内存映射缓存」（热启动）的耗时。
+
+运行：python benchmarks/bench_library.py [--cards N ...]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _synthetic import make_library_dict  # noqa: E402
+import npd_library  # noqa: E402
+
+
+def _ms(func):
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 10000], help="合成库卡片数")
+    args = parser.parse_args(argv)
+
+    print(f"{'卡片数':>8}{'源文件 KB':>12}{'缓存 KB':>10}{'冷启动 ms':>12}{'热启动 ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.cards:
+            path = os.path.join(tmp, f"lib_{n}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_library_dict(n), f, ensure_ascii=False)
+            cold, _ = _ms(lambda: npd_library.load_library(path))
+            warm, registry = _ms(lambda: npd_library.load_library(path))
+            assert len(registry.cards) == n
+            src_kb = os.path.getsize(path) / 1024
+            cache_kb = os.path.getsize(npd_library.default_cache_path(path)) / 1024
+            print(f"{n:>8}{src_kb:>12.0f}{cache_kb:>10.0f}{cold:>12.1f}{warm:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
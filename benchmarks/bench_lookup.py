@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+搜索框过滤基准：在合成库（默认 1 万个模式 + 1000 个触发）上构建过滤索引，
+再模拟逐字输入几条查询，报告每次按键的过滤耗时（最坏与中位数），对照一帧的 16 ms。
+
+运行：python benchmarks/bench_lookup.py [--cards N] [--triggers N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from _synthetic import make_registry  # noqa: E402
+from npd_lookup import LookupIndex  # noqa: E402
+
+QUERIES = ("模式00012", "pattern_42", "触发0009", "ms00", "gaslighting", "zzz")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=10000, help="模式数")
+    parser.add_argument("--triggers", type=int, default=1000, help="触发数")
+    args = parser.parse_args(argv)
+
+    registry = make_registry(args.cards, n_triggers=args.triggers)
+    start = time.perf_counter()
+    index = LookupIndex(registry)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"条目数：{len(index):,}；构建索引：{build_ms:,.0f} ms")
+
+    for query in QUERIES:
+        index.filter("")
+        times = []
+        for n in range(1, len(query) + 1):
+            start = time.perf_counter()
+            _, total = index.filter(query[:n])
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"  逐字输入「{query}」：每键最坏 {max(times):.2f} ms、中位 {statistics.median(times):.2f} ms"
+              f"（最终 {total:,} 项）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+两种存储形式的内存与查询开销：普通 PatternRegistry 与列式 CompactRegistry（npd_compact）。
+
+对每个规模生成合成库文件，先编译好 .npdlib 缓存，再分别以两种形式从缓存加载，
+用 tracemalloc 统计加载后仍被注册表占用的内存，并测量常用查询的单次耗时。
+最后演示两个「语言版本」共用一张字符串表时第二个版本的增量。
+
+运行：python benchmarks/bench_memory.py [--sizes 10000 100000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [HERE, ROOT]
+
+from _synthetic import make_library_dict  # noqa: E402
+from npd import PatternCard, PatternRegistry  # noqa: E402
+from npd_compact import compact_registry  # noqa: E402
+from npd_library import load_library  # noqa: E402
+
+
+def _retained(build):
+    """build() 返回的对象在建完后仍占用的字节数（tracemalloc 统计）。"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def _us_per_call(func, args, rounds=3):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for a in args:
+            func(a)
+        per = (time.perf_counter() - start) / len(args) * 1e6
+        best = per if best is None else min(best, per)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10000, 100000])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"lib_{n}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_library_dict(n), f, ensure_ascii=False)
+            load_library(path)  # 编译并写入缓存
+
+            print(f"\n[{n:,} 张卡片]")
+            results = {}
+            for label, compact in (("普通", False), ("紧凑", True)):
+                start = time.perf_counter()
+                registry, size = _retained(lambda: load_library(path, compact=compact))
+                load_ms = (time.perf_counter() - start) * 1000
+                triggers = list(registry.triggers[:2000])
+                values = [c.pattern.value for c in registry.cards[:2000]]
+                q1 = _us_per_call(registry.cards_for_trigger, triggers)
+                q2 = _us_per_call(lambda v: registry.lookup("pattern", v), values)
+                results[label] = size
+                print(f"  {label}：{size / 1e6:8.1f} MB，加载（含 tracemalloc）{load_ms:8.1f} ms，"
+                      f"cards_for_trigger {q1:6.2f} µs，lookup {q2:6.2f} µs")
+                del registry
+            print(f"  紧凑 / 普通 = {results['紧凑'] / results['普通']:.2f}")
+
+        # 语言版本：第二个版本只改动约十分之一的文字，共用第一个版本的字符串表
+        n = args.sizes[0]
+        base = load_library(os.path.join(tmp, f"lib_{n}.json"))
+        first, size1 = _retained(lambda: compact_registry(base))
+        variant = PatternRegistry(
+            [PatternCard(c.pattern, c.serves_need, c.description + ("（译）" if i % 10 == 0 else ""), c.healing_note)
+             for i, c in enumerate(base.cards)],
+            base.trigger_patterns,
+            {t: base.trigger_description(t) for t in base.triggers},
+            {x: base.need_description(x) for x in base.needs},
+        )
+        strings = first.strings
+        before = strings.nbytes
+
+        def build_variant():
+            registry = compact_registry(variant, strings=strings)
+            strings.freeze()
+            return registry
+
+        _, size2 = _retained(build_variant)
+        print(f"\n[语言版本，{n:,} 张卡片] 第一个版本 {size1 / 1e6:.1f} MB；共用字符串表的第二个版本"
+              f"共 {size2 / 1e6:.2f} MB（其中新增字符串 {(strings.nbytes - before) / 1e6:.2f} MB）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
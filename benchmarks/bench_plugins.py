@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+扩展包启动基准：在临时目录里生成 N 个假扩展包（各带 dist-info 入口点与一个触发、一个模式），
+在子进程中测量命令行启动到输出结果的耗时——不装扩展包、首次启动（扫描入口点 + 导入 + 合成缓存）、
+之后的启动（只 stat + 映射缓存），并核对之后的启动没有导入任何扩展包、也没有导入 importlib.metadata。
+
+运行：python benchmarks/bench_plugins.py [--packs N [N ...]] [--repeat R]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+CLI = os.path.join(ROOT, "npd_cli.py")
+
+_PACK_SOURCE = '''LIBRARY = {{
+    "patterns": [{{"name": "假模式{i}", "value": "dummy_pattern_{i}", "serves_need": "control_supply",
+                  "description": "基准用", "healing_note": "基准用"}}],
+    "triggers": [{{"name": "假触发{i}", "value": "dummy_trigger_{i}", "description": "基准用",
+                  "patterns": ["dummy_pattern_{i}"]}}],
+}}
+'''
+
+# 取一次注册表后报告：触发数、已导入的假扩展包数、是否导入了 importlib.metadata
+_PROBE = ("import sys, npd; r = npd.get_registry(); "
+          "print(len(r.triggers), sum(m.startswith('npd_dummy_pack_') for m in sys.modules), "
+          "'importlib.metadata' in sys.modules)")
+
+
+def make_packs(site: str, n: int) -> None:
+    for i in range(n):
+        name = f"npd_dummy_pack_{i}"
+        info = os.path.join(site, f"{name}-1.0.dist-info")
+        os.makedirs(info)
+        with open(os.path.join(info, "METADATA"), "w", encoding="utf-8") as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+        with open(os.path.join(info, "entry_points.txt"), "w", encoding="utf-8") as f:
+            f.write(f"[npd.packs]\ndummy{i:05d} = {name}:LIBRARY\n")
+        with open(os.path.join(site, name + ".py"), "w", encoding="utf-8") as f:
+            f.write(_PACK_SOURCE.format(i=i))
+
+
+def _run(args, env) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def _probe(env) -> str:
+    return subprocess.run([sys.executable, "-c", _PROBE], env=env, check=True, cwd=ROOT,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packs", type=int, nargs="+", default=[0, 100, 1000], help="假扩展包个数")
+    parser.add_argument("--repeat", type=int, default=7, help="之后的启动测几次（取中位数）")
+    args = parser.parse_args(argv)
+    command = [CLI, "trigger", "设立边界", "--format", "json"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, NPD_NO_PACKS="1")
+        baseline = statistics.median(_run(command, env) for _ in range(args.repeat))
+        print(f"不加载扩展包（NPD_NO_PACKS=1）：{baseline * 1000:7.1f} ms")
+        for n in args.packs:
+            site, cache = os.path.join(tmp, f"site{n}"), os.path.join(tmp, f"cache{n}")
+            os.makedirs(site)
+            make_packs(site, n)
+            env = dict(os.environ, PYTHONPATH=site, NPD_CACHE_DIR=cache)
+            env.pop("NPD_NO_PACKS", None)
+            cold = _run(command, env)
+            _run(command, env)  # 首次运行在扩展包目录里写了 __pycache__，目录 mtime 变了：再扫描一次入口点（不再导入）
+            warm = statistics.median(_run(command, env) for _ in range(args.repeat))
+            _probe(env)  # 探测用 python -c，sys.path 与命令行不同，先让它建好自己的索引
+            triggers, imported, metadata = _probe(env).split()
+            print(f"{n:5,} 个扩展包：首次 {cold * 1000:8.1f} ms  之后 {warm * 1000:7.1f} ms"
+                  f"（{warm / baseline:4.2f}×）  触发 {triggers}  之后导入扩展包 {imported} 个")
+            assert imported == "0" and metadata == "False", "之后的启动不应导入扩展包或 importlib.metadata"
+
+
+if __name__ == "__main__":
+    main()
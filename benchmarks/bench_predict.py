@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+序列预测基准：逐条学习 N 条合成事件的吞吐（每条 O(1)）、界面实时查询「接下来可能」的延迟，
+以及绑定日志时从 .seq.json 恢复并只补读新增行的耗时（对比从头读整份日志）。
+
+运行：python benchmarks/bench_predict.py [--incidents N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from _synthetic import synthetic_incidents  # noqa: E402
+from npd import BehaviorPattern, TriggerType  # noqa: E402
+from npd_journal import IncidentJournal  # noqa: E402
+from npd_predict import SequencePredictor  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=100000, help="事件数")
+    parser.add_argument("--queries", type=int, default=20000, help="预测查询次数")
+    args = parser.parse_args(argv)
+
+    incidents = list(synthetic_incidents(args.incidents))
+    predictor = SequencePredictor()
+    start = time.perf_counter()
+    predictor.observe_all(incidents)
+    observe_s = time.perf_counter() - start
+
+    triggers = list(TriggerType)
+    patterns = list(BehaviorPattern)
+    start = time.perf_counter()
+    for i in range(args.queries):
+        predictor.predict(triggers[i % len(triggers)], (patterns[i % len(patterns)], patterns[i * 7 % len(patterns)]), 3)
+    query_us = (time.perf_counter() - start) / args.queries * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "journal.jsonl")
+        split = len(incidents) - 100
+        with IncidentJournal(path) as journal:
+            for inc in incidents[:split]:
+                journal.append(inc)
+        start = time.perf_counter()
+        SequencePredictor.for_journal(path).checkpoint()
+        cold_s = time.perf_counter() - start
+        with IncidentJournal(path) as journal:
+            for inc in incidents[split:]:
+                journal.append(inc)
+        start = time.perf_counter()
+        warm = SequencePredictor.for_journal(path)
+        warm_s = time.perf_counter() - start
+
+    print(f"事件数：{args.incidents:,}")
+    print(f"逐条学习：{args.incidents / observe_s:,.0f} 条/秒")
+    print(f"预测查询（触发 + 前 2 个模式）：{query_us:.1f} µs/次")
+    print(f"绑定日志，从头读：{cold_s * 1000:,.0f} ms；从 .seq.json 恢复并补读 100 条：{warm_s * 1000:,.1f} ms"
+          f"（共 {warm.count:,} 条）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+多触发查询基准：统计每秒可完成的查询数（命中缓存 / 每次新建引擎不走缓存）。
+
+运行：python benchmarks/bench_query.py [--number N]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from npd import TriggerType, get_registry  # noqa: E402
+from npd_query import TriggerQueryEngine  # noqa: E402
+
+
+def _all_queries():
+    """所有 2~3 个触发的组合，外加一组带权重的查询。"""
+    triggers = list(TriggerType)
+    queries = [set(c) for r in (2, 3) for c in itertools.combinations(triggers, r)]
+    queries += [{a: 2.0, b: 0.5} for a, b in itertools.combinations(triggers, 2)]
+    return queries
+
+
+def _qps(engine, queries, number):
+    start = time.perf_counter()
+    n = 0
+    for q in itertools.islice(itertools.cycle(queries), number):
+        engine.query(q)
+        n += 1
+    return n / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=50000, help="查询次数")
+    args = parser.parse_args(argv)
+
+    queries = _all_queries()
+    registry = get_registry()
+    uncached = TriggerQueryEngine(registry, cache_size=0)
+    cached = TriggerQueryEngine(registry)
+    print(f"查询组合数：{len(queries)}")
+    print(f"不走缓存：{_qps(uncached, queries, args.number):>12,.0f} 次/秒")
+    print(f"命中缓存：{_qps(cached, queries, args.number):>12,.0f} 次/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+卡片注册表基准：对比「每次调用都重建卡片列表」（旧实现）与「预建索引查表」（注册表）的单次调用开销。
+
+运行：python benchmarks/bench_registry.py [--number N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import npd  # noqa: E402
+from npd import CoreNeed, PatternCard, TriggerType  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# 旧实现（每次调用都重新构造卡片与临时字典），仅用于对照
+# ---------------------------------------------------------------------------
+
+def _legacy_get_pattern_cards():
+    return [PatternCard(c.pattern, c.serves_need, c.description, c.healing_note)
+            for c in npd._builtin_pattern_cards()]
+
+
+def _legacy_get_likely_patterns_for_trigger(trigger):
+    return npd._builtin_trigger_patterns().get(trigger, [])
+
+
+def _legacy_get_cards_for_trigger(trigger):
+    patterns = _legacy_get_likely_patterns_for_trigger(trigger)
+    all_cards = {c.pattern: c for c in _legacy_get_pattern_cards()}
+    return [all_cards[p] for p in patterns if p in all_cards]
+
+
+def _legacy_find_patterns_by_need(need):
+    return [c for c in _legacy_get_pattern_cards() if c.serves_need == need]
+
+
+def _per_call_us(func, arg, number):
+    if arg is None:
+        total = timeit.timeit(func, number=number)
+    else:
+        total = timeit.timeit(lambda: func(arg), number=number)
+    return total / number * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000, help="每项调用次数")
+    args = parser.parse_args(argv)
+
+    trigger = TriggerType.被质疑或要求负责
+    need = CoreNeed.控制血包在身边
+    npd.get_registry()  # 预热：构建注册表不计入单次调用开销
+
+    cases = [
+        ("get_pattern_cards", _legacy_get_pattern_cards, npd.get_pattern_cards, None),
+        ("get_likely_patterns_for_trigger", _legacy_get_likely_patterns_for_trigger,
+         npd.get_likely_patterns_for_trigger, trigger),
+        ("get_cards_for_trigger", _legacy_get_cards_for_trigger, npd.get_cards_for_trigger, trigger),
+        ("find_patterns_by_need", _legacy_find_patterns_by_need, npd.find_patterns_by_need, need),
+    ]
+    print(f"{'函数':<34}{'旧实现 µs/次':>14}{'注册表 µs/次':>14}{'加速':>10}")
+    for name, before, after, arg in cases:
+        b = _per_call_us(before, arg, args.number)
+        a = _per_call_us(after, arg, args.number)
+        print(f"{name:<34}{b:>14.3f}{a:>14.3f}{b / a:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
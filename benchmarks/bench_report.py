@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+批量报告吞吐：生成 N 条合成事件，分别用单进程与进程池生成报告，比较每秒份数；
+最后模拟一次中断（只生成一部分后停止）再续跑，确认续跑后的输出与一次跑完的完全一致。
+
+运行：python benchmarks/bench_report.py [--incidents N] [--jobs N]
+"""
+
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, ROOT]
+
+import npd_report  # noqa: E402
+from _synthetic import synthetic_incidents  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=50000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "incidents.jsonl")
+        with open(source, "w", encoding="utf-8") as f:
+            for incident in synthetic_incidents(args.incidents):
+                f.write(incident.to_json() + "\n")
+
+        single = os.path.join(tmp, "single.txt")
+        run1 = npd_report.generate_reports(source, single, jobs=1, log=None)
+        print(f"单进程：      {run1.rate:>10,.0f} 份/秒（{run1.elapsed:.2f} s，{run1.bytes_written / 1e6:.1f} MB）")
+
+        pooled = os.path.join(tmp, "pooled.txt")
+        runp = npd_report.generate_reports(source, pooled, jobs=args.jobs, log=None)
+        print(f"{args.jobs} 个进程：  {runp.rate:>10,.0f} 份/秒（{runp.elapsed:.2f} s，加速 {run1.elapsed / runp.elapsed:.2f}x）")
+        print(f"输出一致：{'是' if filecmp.cmp(single, pooled, shallow=False) else '否'}")
+
+        # 中断：写完一半的块后模拟 Ctrl+C，并在输出末尾留一段未记录进度的残片，然后续跑
+        resumed = os.path.join(tmp, "resumed.txt")
+        save = npd_report._save_progress
+        calls = [0]
+        stop_after = max(1, args.incidents // npd_report.DEFAULT_CHUNK_SIZE // 2)
+
+        def interrupting_save(*a):
+            save(*a)
+            calls[0] += 1
+            if calls[0] >= stop_after:
+                raise KeyboardInterrupt
+
+        npd_report._save_progress = interrupting_save
+        try:
+            npd_report.generate_reports(source, resumed, jobs=args.jobs, log=None)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            npd_report._save_progress = save
+        with open(resumed, "ab") as f:
+            f.write("（写到一半的残片）".encode("utf-8"))
+        runr = npd_report.generate_reports(source, resumed, jobs=args.jobs, log=None)
+        print(f"续跑：跳过 {runr.resumed_from:,} 份，补生成 {runr.generated:,} 份；"
+              f"与一次跑完一致：{'是' if filecmp.cmp(single, resumed, shallow=False) else '否'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+全文检索基准：在合成库上测量建索引耗时、追加一张卡片的增量耗时，以及单次查询延迟。
+
+运行：python benchmarks/bench_search.py [--cards N] [--queries N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from _synthetic import make_registry  # noqa: E402
+from npd import CoreNeed, PatternCard  # noqa: E402
+from npd_library import LibraryKey  # noqa: E402
+from npd_search import SearchIndex  # noqa: E402
+
+QUERIES = ["你想多了", "我为你付出那么多", "边界", "扮演受害者", "冷漠 吼叫", "gaslighting", "比较 嫉妒 夸奖"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=10000, help="合成库卡片数")
+    parser.add_argument("--queries", type=int, default=2000, help="计时的查询次数")
+    args = parser.parse_args(argv)
+
+    registry = make_registry(args.cards)
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.sync(registry)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    for q in QUERIES:  # 预热：每个词的 BM25 得分首次查询时计算
+        index.search(q)
+    samples = []
+    for i in range(args.queries):
+        q = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        index.search(q)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+
+    card = PatternCard(LibraryKey("pattern", "冷暴力", "silent"), CoreNeed.控制血包在身边, "长时间不说话", "沉默也是惩罚")
+    extended = registry.with_cards([card])
+    start = time.perf_counter()
+    index.sync(extended)
+    add_ms = (time.perf_counter() - start) * 1000
+
+    print(f"文档数：{len(index)}  建索引：{build_ms:.1f} ms  追加一张卡片：{add_ms:.2f} ms")
+    print(f"查询延迟：中位数 {statistics.median(samples):.0f} µs，p99 {samples[int(len(samples) * 0.99)]:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+npd_server 的本机压测：C 条 keep-alive 连接在回环地址上持续发送 GET，报告每秒请求数与延迟分位数。
+
+    python benchmarks/bench_server.py                          # 自动在子进程里启动服务（系统分配端口）
+    python benchmarks/bench_server.py --url http://127.0.0.1:8765 --connections 64 --duration 10
+    python benchmarks/bench_server.py --etag                   # 带 If-None-Match，测 304 路径
+
+请求路径在 /triggers/{value}、/needs/{value}、/patterns/{value}、/escalation 之间轮换。纯标准库。
+压测前先在合成的 1 万张卡片库上建一次响应表，超过时限即失败（--table-cards 0 跳过）。
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SERVER = os.path.join(ROOT, "npd_server.py")
+sys.path[:0] = [HERE, ROOT]
+
+from npd import get_registry, set_registry  # noqa: E402
+from _synthetic import make_registry  # noqa: E402
+
+
+def check_table_build(n_cards: int, limit: float) -> float:
+    """在 n_cards 张卡片的合成库上建响应表，返回秒数；超过 limit 秒即失败（模式记录反查触发曾是平方级的）。"""
+    from npd_server import ResponseTable
+    registry = make_registry(n_cards)
+    previous = get_registry()
+    set_registry(registry)
+    try:
+        start = time.perf_counter()
+        table = ResponseTable(registry)
+        elapsed = time.perf_counter() - start
+    finally:
+        set_registry(previous)
+    assert len(table.routes) >= 2 * len(registry.patterns)
+    assert elapsed < limit, f"{n_cards:,} 张卡片的响应表用了 {elapsed:.1f} s（上限 {limit:.0f} s）"
+    return elapsed
+
+
+def _paths():
+    registry = get_registry()
+    paths = [f"/triggers/{t.value}" for t in registry.triggers]
+    paths += [f"/needs/{n.value}" for n in registry.needs]
+    paths += [f"/patterns/{p.value}" for p in registry.patterns]
+    paths.append("/escalation")
+    return paths
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    etag = None
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"etag":
+            etag = value.strip().decode("ascii")
+    if length and status != 304:
+        await reader.readexactly(length)
+    return status, etag
+
+
+async def _client(host, port, paths, deadline, use_etag, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    clock = time.perf_counter
+    try:
+        for path in paths:
+            if clock() >= deadline:
+                break
+            extra = f"If-None-Match: {etags[path]}\r\n" if use_etag and path in etags else ""
+            start = clock()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode("ascii"))
+            status, etag = await _read_response(reader)
+            latencies.append(clock() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag:
+                etags[path] = etag
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def _run(host, port, connections, duration, use_etag):
+    paths = _paths()
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, itertools.islice(itertools.cycle(paths), i, None), deadline, use_etag, latencies, statuses)
+        for i in range(connections)
+    ))
+    return time.perf_counter() - start, latencies, statuses
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def _start_server():
+    proc = subprocess.Popen([sys.executable, SERVER, "--port", "0"], stdout=subprocess.PIPE, text=True, encoding="utf-8")
+    line = proc.stdout.readline()
+    url = line[line.index("http://"):].split("/（", 1)[0]
+    return proc, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="已在运行的服务地址（默认自动启动一个）")
+    parser.add_argument("--connections", "-c", type=int, default=32, help="并发连接数")
+    parser.add_argument("--duration", "-d", type=float, default=5.0, help="压测秒数")
+    parser.add_argument("--etag", action="store_true", help="重复请求时带 If-None-Match")
+    parser.add_argument("--table-cards", type=int, default=10000, help="建表检查用的合成库卡片数（0 为跳过）")
+    parser.add_argument("--table-limit", type=float, default=5.0, help="建表检查的时限（秒）")
+    args = parser.parse_args(argv)
+
+    if args.table_cards:
+        elapsed = check_table_build(args.table_cards, args.table_limit)
+        print(f"响应表：{args.table_cards:,} 张卡片 {elapsed * 1000:.0f} ms")
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = _start_server()
+    parts = urlsplit(url)
+    try:
+        elapsed, latencies, statuses = asyncio.run(
+            _run(parts.hostname, parts.port, args.connections, args.duration, args.etag))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    latencies.sort()
+    n = len(latencies)
+    print(f"目标：{url}  连接数：{args.connections}  时长：{elapsed:.1f} s  ETag：{'是' if args.etag else '否'}")
+    print(f"请求数：{n:,}  状态码：{', '.join(f'{k}×{v:,}' for k, v in sorted(statuses.items()))}")
+    if n:
+        print(f"吞吐：{n / elapsed:,.0f} 请求/秒")
+        print("延迟：" + "  ".join(f"p{p}={_percentile(latencies, p) * 1000:.2f} ms" for p in (50, 90, 99))
+              + f"  最大={latencies[-1] * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+升级模拟基准（固定 seed，可复现）：对几种「如果我坚持边界」情境各模拟 N 次冲突，
+报告吞吐（次/秒）以及模拟分布与精确分布的最大偏差。
+
+运行：python benchmarks/bench_simulate.py [--episodes N] [--seed S]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import npd_simulate  # noqa: E402
+from npd import TriggerType  # noqa: E402
+
+SCENARIOS = [
+    ("设立边界，仍然顺从", [TriggerType.设立边界], 0.6),
+    ("设立边界并坚持", [TriggerType.设立边界], 0.1),
+    ("边界 + 独立 + 他人关注，坚持", [TriggerType.设立边界, TriggerType.孩子独立或疏远, TriggerType.孩子获得他人关注], 0.1),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--episodes", type=int, default=1_000_000, help="每个情境模拟的冲突数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    backend = "NumPy" if npd_simulate.np is not None else "纯 Python"
+    print(f"后端：{backend}，seed={args.seed}")
+    for name, triggers, supply_rate in SCENARIOS:
+        model = npd_simulate.build_model(triggers, supply_rate)
+        start = time.perf_counter()
+        result = npd_simulate.simulate(model, args.episodes, seed=args.seed)
+        elapsed = time.perf_counter() - start
+        exact = npd_simulate.exact_terminal_distribution(model)
+        err = max(abs(share - exact[state]) for state, share in result.terminal_distribution().items())
+        print(f"\n【{name}】供给概率 {supply_rate}")
+        print(f"  {args.episodes / elapsed:,.0f} 次/秒（{elapsed:.2f} s），与精确分布最大偏差 {err:.4f}")
+        for line in result.summary():
+            print("  " + line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+静态站点导出基准：在合成库上测量整站构建、无改动重建、冷启动（只读清单）重建，
+以及改一张卡片后同一构建器的增量重建（监视模式的情形）各要多久、写了几页。
+
+运行：python benchmarks/bench_site.py [--cards N [N ...]] [--format html|markdown]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from dataclasses import replace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from _synthetic import make_registry  # noqa: E402
+from npd import PatternRegistry  # noqa: E402
+from npd_site import SiteBuilder  # noqa: E402
+
+
+def _edit_one_card(registry):
+    """返回只改了一张卡片「表现」的新注册表（其余内容相同）。"""
+    cards = list(registry.cards)
+    cards[len(cards) // 2] = replace(cards[len(cards) // 2], description="（改过的表现）")
+    return PatternRegistry(cards, dict(registry.trigger_patterns),
+                           {t: registry.trigger_description(t) for t in registry.triggers},
+                           {n: registry.need_description(n) for n in registry.needs})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 20000], help="合成库的卡片数")
+    parser.add_argument("--format", choices=("html", "markdown"), default="html")
+    args = parser.parse_args(argv)
+
+    for n in args.cards:
+        registry = make_registry(n)
+        edited = _edit_one_card(registry)
+        with tempfile.TemporaryDirectory() as out:
+            builder = SiteBuilder(out, args.format)
+            rows = [
+                ("整站构建", builder.build(registry)),
+                ("无改动重建", builder.build(registry)),
+                ("改一张卡片（增量）", builder.build(edited)),
+                ("冷启动重建（读清单）", SiteBuilder(out, args.format).build(edited)),
+            ]
+        print(f"卡片数：{n:,}")
+        for label, r in rows:
+            print(f"  {label}：{r.elapsed * 1000:9.1f} ms  写入 {r.written:,} 页  未变 {r.unchanged:,} 页")
+
+
+if __name__ == "__main__":
+    main()
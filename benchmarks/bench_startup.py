@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+图形界面冷启动基准（无需显示器）：在子进程中按 npd_startup 的阶段计时——解释器启动、导入 npd_windows
+（连同 tkinter）、载入数据（prepare_startup_data：注册表与首屏数据）——内置库与合成的 1 千 / 1 万 / 5 万张卡片库
+（普通加载与 --compact 列式加载）各测多次取中位数；建窗口与首次绘制需要显示器，由 npd_windows --startup-log 在真机上记录。
+另测一次把延后导入的模块（npd_defense、npd_predict、multiprocessing）一并导入时的导入阶段作对照，
+并核对启动路径上确实没有导入它们。
+
+运行：python benchmarks/bench_startup.py [--cards N [N ...]] [--repeat R]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [HERE, ROOT]
+
+from _synthetic import make_library_dict  # noqa: E402
+
+DEFERRED = ("npd_defense", "npd_predict", "multiprocessing")
+
+# argv[1]：库文件（空串为内置库）；argv[2]：非空时先导入 DEFERRED（优化前的导入集合）；argv[3]：非空时列式加载
+_PROBE = f"""
+import sys
+from npd_startup import startup_timer
+if sys.argv[2]:
+    import {", ".join(DEFERRED)}
+import npd_windows
+startup_timer.mark("import")
+deferred = [m for m in {DEFERRED!r} if m in sys.modules]
+npd_windows.prepare_startup_data(sys.argv[1] or None, bool(sys.argv[3]))
+startup_timer.mark("data")
+import json
+print(json.dumps({{"phases": startup_timer.as_dict()["phases_ms"], "deferred": deferred}}))
+"""
+
+
+def _probe(library: str, eager: bool, env, compact: bool = False) -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE, library, "1" if eager else "", "1" if compact else ""],
+                         env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def _medians(library: str, eager: bool, env, repeat: int, compact: bool = False) -> dict:
+    runs = [_probe(library, eager, env, compact) for _ in range(repeat)]
+    if not eager:
+        assert not runs[0]["deferred"], f"启动路径上不应导入 {runs[0]['deferred']}"
+    return {phase: statistics.median(r["phases"].get(phase, 0.0) for r in runs) for phase in runs[0]["phases"]}
+
+
+def _line(label: str, phases: dict) -> str:
+    cells = "  ".join(f"{name} {phases.get(name, 0.0):6.1f}" for name in ("interpreter", "import", "data"))
+    return f"{label:<22}{cells}  共 {sum(phases.values()):6.1f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 10000, 50000], help="合成库的卡片数")
+    parser.add_argument("--repeat", type=int, default=9, help="每项启动几次（取中位数）")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, NPD_CACHE_DIR=tmp)  # 扩展包索引写到临时目录，不碰用户缓存
+        env.pop("PYTHONDONTWRITEBYTECODE", None)   # 否则每次启动都重新编译全部模块，测的不是真实冷启动
+        _probe("", False, env)                      # 先写好 __pycache__ 与扩展包索引
+        print("各阶段中位数（ms）：")
+        print(_line("内置库", _medians("", False, env, args.repeat)))
+        print(_line("内置库·不延后导入", _medians("", True, env, args.repeat)))
+        for n in args.cards:
+            path = os.path.join(tmp, f"library{n}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(make_library_dict(n), f, ensure_ascii=False)
+            first = _probe(path, False, env)["phases"]  # 首次：解析 JSON 并写 .npdlib 缓存
+            print(_line(f"{n:,} 张卡片·首次", first))
+            print(_line(f"{n:,} 张卡片", _medians(path, False, env, args.repeat)))
+            # 与普通加载共用同一个 .npdlib 缓存（上面已写好），只是按列式解码；先跑一次让 npd_compact 也编译进 __pycache__
+            _probe(path, False, env, compact=True)
+            print(_line(f"{n:,} 张卡片·--compact", _medians(path, False, env, args.repeat, compact=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+事件库（SQLite）基准：批量写入 N 条合成事件（约每 6 小时一条，默认 5 万条 ≈ 34 年），
+测量写入吞吐与几类仪表盘查询的耗时——最近 90 天的（触发, 模式）次数、每月主导需求、按周序列、
+带时间窗的排行，以及走索引的按模式取事件。
+
+运行：python benchmarks/bench_store.py [--incidents N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from _synthetic import synthetic_incidents  # noqa: E402
+from npd import BehaviorPattern, TriggerType  # noqa: E402
+from npd_store import IncidentStore  # noqa: E402
+
+
+def _timed_ms(func, repeats=20):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None or elapsed < best else best
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incidents", type=int, default=50000, help="事件数")
+    args = parser.parse_args(argv)
+
+    incidents = list(synthetic_incidents(args.incidents))
+    last = incidents[-1].timestamp.date()
+    since = last - timedelta(days=89)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "incidents.sqlite")
+        with IncidentStore(path) as store:
+            start = time.perf_counter()
+            for i in range(0, len(incidents), 5000):
+                store.extend(incidents[i:i + 5000])
+            insert_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for inc in incidents[:1000]:
+                store.append(inc)
+            append_rate = 1000 / (time.perf_counter() - start)
+
+            cases = [
+                ("最近 90 天「设立边界」→「爱的撤回」",
+                 lambda: store.pair_count(TriggerType.设立边界, BehaviorPattern.爱的撤回, since=since)),
+                ("每月主导的核心需求（全部年份）", lambda: len(store.dominant("need", "month"))),
+                ("「设立边界」按周序列（全部年份）",
+                 lambda: len(store.series("trigger", TriggerType.设立边界, "week"))),
+                ("最近 90 天行为模式排行", lambda: len(store.top("pattern", since=since))),
+                ("最近 90 天「煤气灯」事件（走索引）",
+                 lambda: len(list(store.query(since=since, pattern=BehaviorPattern.煤气灯)))),
+            ]
+            results = [(label, *_timed_ms(func)) for label, func in cases]
+        size_mb = os.path.getsize(path) / 1e6
+
+    years = (incidents[-1].timestamp - incidents[0].timestamp).days / 365.25
+    print(f"事件数：{args.incidents:,}（跨 {years:.1f} 年，库文件 {size_mb:.1f} MB）")
+    print(f"批量写入：{args.incidents / insert_s:,.0f} 条/秒；逐条写入（每条一个事务）：{append_rate:,.0f} 条/秒")
+    for label, ms, result in results:
+        print(f"{label}：{ms:.2f} ms（结果 {result}）")
+
+
+if __name__ == "__main__":
+    main()
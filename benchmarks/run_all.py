@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+基准套件：对 npd.py 的每个公开函数按实际调用量计时，并在合成的 1 万 / 10 万张卡片库上重复同样的测量。
+
+    python benchmarks/run_all.py                              # 跑全部，结果写入 benchmarks/results.json
+    python benchmarks/run_all.py --sizes 10000 -o new.json    # 只跑内置库与 1 万张卡片库
+    python benchmarks/run_all.py --compare baseline.json      # 与基线对比，变慢超过阈值的标为回归（退出码 1）
+
+结果文件是 JSON：{"meta": {...}, "results": {"<库>/<函数>": {"us_per_call": ..., "calls": ...}}}。
+任何一次结果都可以直接拿来当之后 --compare 的基线。纯标准库，离线运行。
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path[:0] = [HERE, ROOT]
+
+import npd  # noqa: E402
+from _synthetic import make_registry  # noqa: E402
+
+
+# 函数名 → (每轮调用次数, 参数来源)；参数来源 "trigger" / "need" 表示轮流取库中的触发/需求
+CASES = [
+    ("get_pattern_cards", 100000, None),
+    ("get_cards_for_trigger", 100000, "trigger"),
+    ("find_patterns_by_need", 100000, "need"),
+    ("describe_trigger_and_patterns", 20000, "trigger"),
+    ("print_cards_for_trigger", 5000, "trigger"),
+    ("list_all_patterns_with_healing_notes", 1000, None),
+]
+DEFAULT_SIZES = (10000, 100000)
+TIME_BUDGET = 0.5  # 每项每轮最多计时的秒数；大库上的 O(n) 函数会因此少调用几次
+REPEATS = 3
+
+
+def _measure(func, args, calls):
+    """调用 func 至多 calls 次或 TIME_BUDGET 秒，返回 (µs/次, 实际调用次数)；重复 REPEATS 轮取最快。"""
+    best = None
+    done = 0
+    func(*(args[:1] if args else ()))  # 预热：首次调用可能要构建索引或缓存
+    for _ in range(REPEATS):
+        source = itertools.cycle(args) if args else None
+        n = 0
+        start = time.perf_counter()
+        deadline = start + TIME_BUDGET
+        while n < calls:
+            batch = min(100, calls - n)
+            if source is None:
+                for _ in range(batch):
+                    func()
+            else:
+                for a in itertools.islice(source, batch):
+                    func(a)
+            n += batch
+            if time.perf_counter() > deadline:
+                break
+        per_call = (time.perf_counter() - start) / n * 1e6
+        if best is None or per_call < best:
+            best, done = per_call, n
+    return best, done
+
+
+def _import_time_us(runs=7):
+    """用 -X importtime 测 `import npd` 的累计耗时（µs，取中位数）。"""
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import npd"],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+        )
+        for line in proc.stderr.splitlines():
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and parts[2] == "npd":
+                samples.append(int(parts[1]))
+    return statistics.median(samples)
+
+
+def run(sizes, log=print):
+    results = {}
+    libraries = [("builtin", npd.build_builtin_registry)]
+    libraries += [(f"synthetic_{n}", lambda n=n: make_registry(n)) for n in sizes]
+    try:
+        for label, build in libraries:
+            registry = build()
+            npd.set_registry(registry)
+            sources = {"trigger": registry.triggers, "need": registry.needs}
+            log(f"\n[{label}] {len(registry.cards)} 张卡片，{len(registry.triggers)} 个触发")
+            for name, calls, arg in CASES:
+                func = getattr(npd, name)
+                us, n = _measure(func, sources.get(arg), calls)
+                results[f"{label}/{name}"] = {"us_per_call": round(us, 4), "calls": n}
+                log(f"  {name:<40}{us:>12.3f} µs/次  （{n} 次）")
+    finally:
+        npd.set_registry(None)
+    us = _import_time_us()
+    results["import/npd"] = {"us_per_call": us, "calls": 1}
+    log(f"\nimport npd：{us / 1000:.2f} ms")
+    return results
+
+
+def compare(results, baseline, threshold, log=print):
+    """返回回归项列表：比基线慢超过 threshold（比例）的项。"""
+    regressions = []
+    log(f"\n与基线对比（阈值 +{threshold:.0%}）：")
+    for key, base in sorted(baseline.items()):
+        cur = results.get(key)
+        if cur is None:
+            continue
+        ratio = cur["us_per_call"] / base["us_per_call"] if base["us_per_call"] else 1.0
+        flag = "回归" if ratio > 1 + threshold else ("改进" if ratio < 1 - threshold else "")
+        if flag == "回归":
+            regressions.append(key)
+        log(f"  {key:<52}{base['us_per_call']:>12.3f} → {cur['us_per_call']:>12.3f}  {ratio:6.2f}x  {flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES), help="合成库的卡片数")
+    parser.add_argument("-o", "--output", default=os.path.join(HERE, "results.json"), help="结果 JSON 路径")
+    parser.add_argument("--compare", metavar="BASELINE", help="与之对比的基线结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="判定为回归的变慢比例（默认 0.25）")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes)
+    payload = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项回归。")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,12 +3,23 @@ chcp 65001 >nul
 echo 正在安装 PyInstaller（若未安装）...
 pip install pyinstaller -q
 echo.
-echo 正在打包 npd_windows.py 为单文件 exe（无控制台窗口）...
-pyinstaller --onefile --windowed --name "NPD_Model" --hidden-import=npd --clean npd_windows.py
+if "%NPD_ONEFILE%"=="1" (
+    echo 正在按 NPD_Model.spec 打包为单文件 exe（无控制台窗口，启动时需先解压，较慢）...
+) else (
+    echo 正在按 NPD_Model.spec 打包为目录版 exe（无控制台窗口，启动最快）...
+)
+pyinstaller --clean --noconfirm NPD_Model.spec
 echo.
-if exist "dist\NPD_Model.exe" (
-    echo 成功。exe 位置: dist\NPD_Model.exe
+if "%NPD_ONEFILE%"=="1" (
+    set "NPD_EXE=dist\NPD_Model.exe"
+) else (
+    set "NPD_EXE=dist\NPD_Model\NPD_Model.exe"
+)
+if exist "%NPD_EXE%" (
+    echo 成功。exe 位置: %NPD_EXE%
+    if not "%NPD_ONEFILE%"=="1" echo 分发时请连同整个 dist\NPD_Model 目录一起复制。
     echo 如需中文名，可手动改名为 NPD模型.exe
+    echo 启动计时：%NPD_EXE% --startup-log startup.jsonl
 ) else (
     echo 打包可能失败，请查看上方输出。
 )
@@ -1,9 +1,6 @@
 # -*- coding: utf-8 -*-
 # @Time    : 2026/02/15 10:00:00
 
-# 【下一步】 增加 “我的防御策略” 模块
-
-
 """
 隐性自恋型人格障碍（Covert / Vulnerable NPD）母亲 — 内在程序模型
 
@@ -28,8 +25,9 @@
 """
 
 from enum import Enum
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 from dataclasses import dataclass, field
+from types import MappingProxyType
 
 
 # ---------------------------------------------------------------------------
@@ -70,9 +68,9 @@ class CoreNeed(Enum):
     避免羞耻与暴露 = "avoid_shame_exposure"
 
 
-def get_core_need_description(need: CoreNeed) -> str:
-    """返回该核心需求在行为上的表现简述（用于自我觉察与命名）。"""
-    descriptions = {
+def _builtin_core_need_descriptions() -> Dict[CoreNeed, str]:
+    """内置核心需求说明（只在构建注册表时调用一次）。"""
+    return {
         CoreNeed.维护自恋与优越感: (
             "表现：打压、贬低、挑剔、否认你的感受、颠倒黑白、必须她最好/最对、比较与嫉妒、三角化以维持中心；"
             "本质：扩张需求——让自己看起来像神，永远正确，高人一等（含地位与重要性）。"
@@ -86,7 +84,11 @@ def get_core_need_description(need: CoreNeed) -> str:
             "本质：防御需求——不能承受羞耻与负面评价，绝不认错，用否认与攻击维持完美体面。"
         ),
     }
-    return descriptions.get(need, "")
+
+
+def get_core_need_description(need: CoreNeed) -> str:
+    """返回该核心需求在行为上的表现简述（用于自我觉察与命名）。"""
+    return get_registry().need_description(need)
 
 
 # ---------------------------------------------------------------------------
@@ -105,9 +107,9 @@ class TriggerType(Enum):
     暴露缺点或失败 = "exposed_flaw"
 
 
-def get_trigger_description(trigger: TriggerType) -> str:
-    """返回该触发类型的简要说明。"""
-    descriptions = {
+def _builtin_trigger_descriptions() -> Dict[TriggerType, str]:
+    """内置触发说明（只在构建注册表时调用一次）。"""
+    return {
         TriggerType.被批评或否定: "任何暗示她不够好、错了、不如人的信号",
         TriggerType.孩子独立或疏远: "你减少联系、自己做决定、不依赖她",
         TriggerType.设立边界: "你说不、要求隐私、拒绝被控制",
@@ -117,7 +119,11 @@ def get_trigger_description(trigger: TriggerType) -> str:
         TriggerType.孩子获得他人关注: "别人被夸奖、被爱，她不是中心",
         TriggerType.暴露缺点或失败: "她的错误、无能、不堪被看见",
     }
-    return descriptions.get(trigger, "")
+
+
+def get_trigger_description(trigger: TriggerType) -> str:
+    """返回该触发类型的简要说明。"""
+    return get_registry().trigger_description(trigger)
 
 
 # ---------------------------------------------------------------------------
@@ -140,18 +146,24 @@ class BehaviorPattern(Enum):
     三角化 = "triangulation"           # 拉第三方进来比较、传话、站队
 
 
-@dataclass
+@dataclass(frozen=True)
 class PatternCard:
-    """单条行为模式的卡片：名称、属于哪个核心需求、典型表现、疗愈提示。"""
+    """单条行为模式的卡片：名称、属于哪个核心需求、典型表现、疗愈提示。（不可变，可被多处共享）"""
+    __slots__ = ("pattern", "serves_need", "description", "healing_note")  # 大库时每张卡片省下一个 __dict__
+
     pattern: BehaviorPattern
     serves_need: CoreNeed
     description: str
     healing_note: str
 
+    def __reduce__(self):
+        # 冻结 + __slots__ 时默认的 pickle 会逐个 setattr 而报错，改为按构造参数重建
+        return (type(self), (self.pattern, self.serves_need, self.description, self.healing_note))
 
-def get_pattern_cards() -> List[PatternCard]:
-    """返回所有行为模式的疗愈用说明卡片。"""
-    return [
+
+def _builtin_pattern_cards() -> Tuple[PatternCard, ...]:
+    """内置卡片数据（只在构建注册表时调用一次）。"""
+    return (
         PatternCard(
             BehaviorPattern.贬低与挑剔,
             CoreNeed.维护自恋与优越感,
@@ -224,19 +236,16 @@ def get_pattern_cards() -> List[PatternCard]:
             "拉兄弟姐妹、亲戚、外人进来比较、传话、站队，制造分裂与竞争。",
             "三角化是为了分而治之、维持中心地位；看清结构有助于不卷入。",
         ),
-    ]
+    )
 
 
 # ---------------------------------------------------------------------------
 # 五、程序逻辑：触发 → 可能的行为模式（可预测性）
 # ---------------------------------------------------------------------------
 
-def get_likely_patterns_for_trigger(trigger: TriggerType) -> List[BehaviorPattern]:
-    """
-    根据触发类型，返回该「程序」可能激活的行为模式列表。
-    用于：当某情境出现时，提前知道可能发生什么，减少「不知道会发生什么」的焦虑。
-    """
-    mapping = {
+def _builtin_trigger_patterns() -> Dict[TriggerType, List[BehaviorPattern]]:
+    """内置「触发 → 可能的行为模式」映射（只在构建注册表时调用一次）。"""
+    return {
         TriggerType.被批评或否定: [
             BehaviorPattern.DARVO,
             BehaviorPattern.煤气灯,
@@ -284,7 +293,15 @@ def get_likely_patterns_for_trigger(trigger: TriggerType) -> List[BehaviorPatter
             BehaviorPattern.被动攻击,
         ],
     }
-    return mapping.get(trigger, [])
+
+
+def get_likely_patterns_for_trigger(trigger: TriggerType) -> Tuple[BehaviorPattern, ...]:
+    """
+    根据触发类型，返回该「程序」可能激活的行为模式列表。
+    用于：当某情境出现时，提前知道可能发生什么，减少「不知道会发生什么」的焦虑。
+    这是固定映射；按自己的事件日志、结合刚出现的模式预测下一步，见 npd_predict.py。
+    """
+    return get_registry().patterns_for_trigger(trigger)
 
 
 def get_escalation_path(current_supply_failing: bool) -> List[SupplyType]:
@@ -298,19 +315,216 @@ def get_escalation_path(current_supply_failing: bool) -> List[SupplyType]:
 
 
 # ---------------------------------------------------------------------------
-# 六、疗愈向工具：按名称查模式、列出所有模式等
+# 六、卡片注册表（一次构建、预建索引，所有查询都是 O(1) 查表）
 # ---------------------------------------------------------------------------
 
-def find_patterns_by_need(need: CoreNeed) -> List[PatternCard]:
+class PatternRegistry:
+    """
+    不可变的卡片注册表：卡片、「触发 → 模式」映射与各项说明只构建一次，
+    并预先建立按 BehaviorPattern / CoreNeed / TriggerType 的索引。
+    所有查询返回共享的元组与不可变卡片，调用方不应（也无法）修改它们。
+
+    自定义库（见 npd_library.py）可以带来内置枚举之外的触发/模式/需求，
+    它们与枚举成员一样具有 name 与 value 属性，可与枚举成员混用作为键。
+    """
+
+    __slots__ = (
+        "_cards",
+        "_card_by_pattern",
+        "_cards_by_need",
+        "_patterns_by_trigger",
+        "_cards_by_trigger",
+        "_trigger_descriptions",
+        "_need_descriptions",
+        "_triggers",
+        "_needs",
+        "_patterns",
+        "_by_name_or_value",
+    )
+
+    def __init__(
+        self,
+        cards: Iterable[PatternCard],
+        trigger_patterns: Mapping[TriggerType, Sequence[BehaviorPattern]],
+        trigger_descriptions: Optional[Mapping[TriggerType, str]] = None,
+        need_descriptions: Optional[Mapping[CoreNeed, str]] = None,
+    ):
+        self._cards: Tuple[PatternCard, ...] = tuple(cards)
+        self._card_by_pattern: Dict[BehaviorPattern, PatternCard] = {
+            c.pattern: c for c in self._cards
+        }
+        by_need: Dict[CoreNeed, List[PatternCard]] = {}
+        for c in self._cards:
+            by_need.setdefault(c.serves_need, []).append(c)
+        self._cards_by_need: Dict[CoreNeed, Tuple[PatternCard, ...]] = {
+            need: tuple(cs) for need, cs in by_need.items()
+        }
+        self._patterns_by_trigger: Dict[TriggerType, Tuple[BehaviorPattern, ...]] = {
+            t: tuple(ps) for t, ps in trigger_patterns.items()
+        }
+        # 卡片顺序与「可能出现的模式」一致；没有卡片的模式直接跳过
+        self._cards_by_trigger: Dict[TriggerType, Tuple[PatternCard, ...]] = {
+            t: tuple(self._card_by_pattern[p] for p in ps if p in self._card_by_pattern)
+            for t, ps in self._patterns_by_trigger.items()
+        }
+        self._trigger_descriptions: Dict[TriggerType, str] = dict(trigger_descriptions or {})
+        self._need_descriptions: Dict[CoreNeed, str] = dict(need_descriptions or {})
+        # 触发与需求的展示顺序：先按说明的顺序，再补上只出现在映射/卡片里的
+        self._triggers: Tuple[TriggerType, ...] = tuple(
+            dict.fromkeys([*self._trigger_descriptions, *self._patterns_by_trigger])
+        )
+        self._needs: Tuple[CoreNeed, ...] = tuple(
+            dict.fromkeys([*self._need_descriptions, *(c.serves_need for c in self._cards)])
+        )
+        self._patterns: Tuple[BehaviorPattern, ...] = tuple(dict.fromkeys(
+            [*self._card_by_pattern, *(p for ps in self._patterns_by_trigger.values() for p in ps)]
+        ))
+        # 按 name 或 value 反查（命令行、日志文件等只拿得到字符串时使用）
+        self._by_name_or_value: Dict[Tuple[str, str], object] = {}
+        for kind, keys in (("need", self._needs), ("trigger", self._triggers), ("pattern", self._patterns)):
+            for k in keys:
+                self._by_name_or_value.setdefault((kind, k.value), k)
+                self._by_name_or_value.setdefault((kind, k.name), k)
+
+    @property
+    def cards(self) -> Tuple[PatternCard, ...]:
+        """全部卡片（按注册顺序）。"""
+        return self._cards
+
+    @property
+    def triggers(self) -> Tuple[TriggerType, ...]:
+        """库中所有触发（内置库即 TriggerType 的全部成员）。"""
+        return self._triggers
+
+    @property
+    def needs(self) -> Tuple[CoreNeed, ...]:
+        """库中所有核心需求（内置库即 CoreNeed 的全部成员）。"""
+        return self._needs
+
+    @property
+    def patterns(self) -> Tuple[BehaviorPattern, ...]:
+        """库中所有行为模式（有卡片的在前，再补上只出现在触发映射里的）。"""
+        return self._patterns
+
+    @property
+    def trigger_patterns(self) -> Mapping[TriggerType, Tuple[BehaviorPattern, ...]]:
+        """「触发 → 可能的行为模式」映射（只读视图）。"""
+        return MappingProxyType(self._patterns_by_trigger)
+
+    def card_for_pattern(self, pattern: BehaviorPattern) -> Optional[PatternCard]:
+        return self._card_by_pattern.get(pattern)
+
+    def cards_for_need(self, need: CoreNeed) -> Tuple[PatternCard, ...]:
+        return self._cards_by_need.get(need, ())
+
+    def patterns_for_trigger(self, trigger: TriggerType) -> Tuple[BehaviorPattern, ...]:
+        return self._patterns_by_trigger.get(trigger, ())
+
+    def cards_for_trigger(self, trigger: TriggerType) -> Tuple[PatternCard, ...]:
+        return self._cards_by_trigger.get(trigger, ())
+
+    def with_cards(
+        self,
+        cards: Iterable[PatternCard],
+        trigger_patterns: Optional[Mapping[TriggerType, Sequence[BehaviorPattern]]] = None,
+        trigger_descriptions: Optional[Mapping[TriggerType, str]] = None,
+    ) -> "PatternRegistry":
+        """
+        返回追加了新卡片（及新的触发映射/说明）的新注册表，本注册表不变。
+        已有触发的映射会在末尾追加新模式；原有卡片保持原顺序位于最前，便于下游索引增量更新。
+        """
+        merged: Dict[TriggerType, List[BehaviorPattern]] = {
+            t: list(ps) for t, ps in self._patterns_by_trigger.items()
+        }
+        for t, ps in (trigger_patterns or {}).items():
+            row = merged.setdefault(t, [])
+            row.extend(p for p in ps if p not in row)
+        return PatternRegistry(
+            (*self._cards, *cards),
+            merged,
+            {**self._trigger_descriptions, **(trigger_descriptions or {})},
+            self._need_descriptions,
+        )
+
+    def lookup(self, kind: str, name_or_value: str):
+        """按名称或 value 查找 kind（"trigger" / "pattern" / "need"）对应的键；找不到返回 None。"""
+        return self._by_name_or_value.get((kind, name_or_value))
+
+    def trigger_description(self, trigger: TriggerType) -> str:
+        return self._trigger_descriptions.get(trigger, "")
+
+    def need_description(self, need: CoreNeed) -> str:
+        return self._need_descriptions.get(need, "")
+
+
+_registry: Optional[PatternRegistry] = None
+
+
+def build_builtin_registry() -> PatternRegistry:
+    """由内置数据构建一个新的注册表（默认库）。"""
+    return PatternRegistry(
+        _builtin_pattern_cards(),
+        _builtin_trigger_patterns(),
+        _builtin_trigger_descriptions(),
+        _builtin_core_need_descriptions(),
+    )
+
+
+def _default_registry() -> PatternRegistry:
+    """默认库：内置数据 + 已安装的扩展包（见 npd_plugins.py；单独拷走 npd.py 时只有内置数据）。"""
+    try:
+        from npd_plugins import registry_with_packs
+    except ImportError:
+        return build_builtin_registry()
+    return registry_with_packs(build_builtin_registry)
+
+
+def get_registry() -> PatternRegistry:
+    """返回当前使用的卡片注册表；首次调用时由内置数据（及已安装的扩展包）构建。"""
+    global _registry
+    if _registry is None:
+        _registry = _default_registry()
+    return _registry
+
+
+def set_registry(registry: Optional[PatternRegistry]) -> None:
+    """
+    替换当前使用的注册表（例如换成自定义库）；传 None 则恢复为默认库（内置数据 + 扩展包）。
+    依赖注册表的缓存（查询引擎等）会在下次使用时发现注册表已变化并自动重建。
+    """
+    global _registry
+    _registry = registry
+
+
+def add_pattern_cards(
+    cards: Iterable[PatternCard],
+    trigger_patterns: Optional[Mapping[TriggerType, Sequence[BehaviorPattern]]] = None,
+    trigger_descriptions: Optional[Mapping[TriggerType, str]] = None,
+) -> PatternRegistry:
+    """向当前库追加卡片（及触发映射），并设为当前库；返回新的注册表。"""
+    registry = get_registry().with_cards(cards, trigger_patterns, trigger_descriptions)
+    set_registry(registry)
+    return registry
+
+
+def get_pattern_cards() -> Tuple[PatternCard, ...]:
+    """返回所有行为模式的疗愈用说明卡片。"""
+    return get_registry().cards
+
+
+# ---------------------------------------------------------------------------
+# 七、疗愈向工具：按名称查模式、列出所有模式等
+# ---------------------------------------------------------------------------
+
+def find_patterns_by_need(need: CoreNeed) -> Tuple[PatternCard, ...]:
     """按核心需求筛选行为模式，便于理解「这段行为是在满足哪个需求」。"""
-    cards = get_pattern_cards()
-    return [c for c in cards if c.serves_need == need]
+    return get_registry().cards_for_need(need)
 
 
 def format_core_need_summary() -> List[str]:
     """返回 CoreNeed 三条核心需求的摘要（多行），用于放在 trigger 输出前面。"""
     lines = []
-    for need in CoreNeed:
+    for need in get_registry().needs:
         lines.append(f"  · {need.name}")
         lines.append(f"    {get_core_need_description(need)}")
         lines.append("")
@@ -326,6 +540,27 @@ def format_escalation_level_summary() -> List[str]:
     ]
 
 
+_header_cache: Tuple[Optional[PatternRegistry], Tuple[str, ...]] = (None, ())
+
+
+def format_trigger_header() -> Tuple[str, ...]:
+    """
+    返回 print_cards_for_trigger 输出开头的 CoreNeed 与 EscalationLevel 总结（多行）。
+    这部分与触发无关，按当前库缓存，库被替换后重新生成。
+    """
+    global _header_cache
+    registry = get_registry()
+    if _header_cache[0] is not registry:
+        lines = ["【CoreNeed 三条核心需求】"]
+        lines.extend(format_core_need_summary())
+        lines.append("【EscalationLevel 供给升级路径】")
+        lines.extend(format_escalation_level_summary())
+        lines.append("---")
+        lines.append("")
+        _header_cache = (registry, tuple(lines))
+    return _header_cache[1]
+
+
 def describe_trigger_and_patterns(trigger: TriggerType) -> str:
     """返回一段可读的疗愈向描述：该触发是什么 + 可能出现的模式。"""
     desc = get_trigger_description(trigger)
@@ -339,14 +574,12 @@ def describe_trigger_and_patterns(trigger: TriggerType) -> str:
     )
 
 
-def get_cards_for_trigger(trigger: TriggerType) -> List[PatternCard]:
+def get_cards_for_trigger(trigger: TriggerType) -> Tuple[PatternCard, ...]:
     """
     根据触发类型，返回该触发可能激活的所有行为模式的完整卡片（含表现与疗愈提示），
     顺序与「可能出现的模式」一致，便于只查看与当前情境相关的部分。
     """
-    patterns = get_likely_patterns_for_trigger(trigger)
-    all_cards = {c.pattern: c for c in get_pattern_cards()}
-    return [all_cards[p] for p in patterns if p in all_cards]
+    return get_registry().cards_for_trigger(trigger)
 
 
 def print_cards_for_trigger(trigger: TriggerType) -> List[str]:
@@ -354,15 +587,8 @@ def print_cards_for_trigger(trigger: TriggerType) -> List[str]:
     根据触发类型，先总结 CoreNeed 与 EscalationLevel，再输出该触发对应的行为模式卡片（可读格式）。
     返回字符串列表，便于打印或保存；也可直接遍历打印。
     """
-    lines = []
-    # 1. CoreNeed 总结
-    lines.append("【CoreNeed 三条核心需求】")
-    lines.extend(format_core_need_summary())
-    # 2. EscalationLevel 总结
-    lines.append("【EscalationLevel 供给升级路径】")
-    lines.extend(format_escalation_level_summary())
-    lines.append("---")
-    lines.append("")
+    # 1~2. CoreNeed 与 EscalationLevel 总结（与触发无关，每个库只生成一次）
+    lines = list(format_trigger_header())
     # 3. 触发情境 + PatternCard 全部内容
     desc = describe_trigger_and_patterns(trigger)
     cards = get_cards_for_trigger(trigger)
@@ -385,10 +611,37 @@ def list_all_patterns_with_healing_notes() -> List[str]:
     ]
 
 
+def search(query: str, limit: int = 10) -> list:
+    """
+    在卡片表现、疗愈提示与触发/需求说明中全文检索（中文二元组分词 + BM25 排序），
+    例如 search("你想多了") 会把「否认感受」排在最前。返回 npd_search.SearchHit 列表。
+    """
+    from npd_search import search as _search  # 按需加载，不用检索时不建索引
+    return _search(query, limit)
+
+
+def get_defense_strategies(trigger=None, pattern=None, limit: Optional[int] = 3) -> list:
+    """
+    我的防御策略：某触发下、面对某行为模式时推荐的应对做法（按得分排序，结果已预计算）。
+    返回 npd_defense.RankedStrategy 列表，详见 npd_defense.py。
+    """
+    from npd_defense import recommend  # 按需加载
+    return list(recommend(trigger, pattern, limit))
+
+
 # ---------------------------------------------------------------------------
-# 七、执行示例
+# 八、执行示例
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
+    import sys
+
+    # 其余模块 import npd 时拿到的就是本模块：否则会再执行一遍 npd.py，
+    # 扩展包与命令行用的是那一份的 TriggerType 等，与这里的对不上，注册表也要多建一次
+    sys.modules.setdefault("npd", sys.modules[__name__])
+    if len(sys.argv) > 1:
+        # 带参数时交给完整的命令行（见 npd_cli.py）
+        from npd_cli import main
+        sys.exit(main())
     trigger = TriggerType.被质疑或要求负责
     for line in print_cards_for_trigger(trigger):
         print(line)
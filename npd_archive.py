@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+事件归档（.npda）：多年事件历史的列式压缩格式，给离线分析用。文本日志（.jsonl）逐行解析，
+几百万条要读很久；归档把同一列的值连续存放，分析只读用得到的那几列。
+
+  - 行分块：每 CHUNK_ROWS 条事件一块，每块的每一列单独用 zlib 压缩（压不小时原样存放）；
+  - 枚举列：触发、模式、核心需求存为小整数编码（编码表在文件目录里，内置库下即枚举顺序），
+    一条事件的多个触发 / 模式 / 需求用「每行个数 + 扁平编码」两列表示；
+    升级层级为 1 字节（0 表示未记录）；每列按本块最大值选 1 / 2 / 4 字节宽度；
+  - 时间：秒级时间戳（1970-01-01 起，与 npd_store 一致）做差分编码，压缩后每条约 1～2 字节；
+  - 目录：文件末尾的 JSON 目录记录每块的行数、时间范围与各列的偏移，
+    按时间窗分析时整块落在窗外的直接跳过，整块落在窗内的只读编码列、不解码时间；
+  - 读取：IncidentArchive 内存映射文件，column_chunks() 逐块给出 memoryview
+    （或 numpy=True 时的 ndarray）——压缩块解压后直接按类型解释，原样存放的块直接指向映射内存，都不逐项转换；
+  - 与事件日志互转：pack_journal() 流式读取 .jsonl 写归档，unpack_archive() 把归档追加回日志。
+
+    pack_journal("journal.jsonl", "history.npda")
+    with IncidentArchive("history.npda") as archive:
+        archive.counts("pattern", since="2023-01-01")
+
+命令行：python npd_archive.py pack journal.jsonl history.npda
+        python npd_archive.py stats history.npda [--since 2023-01-01] [--until 2023-12-31]
+        python npd_archive.py unpack history.npda journal.jsonl
+
+依赖：同目录下的 npd.py、npd_journal.py；NumPy 可选。
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from npd import EscalationLevel, PatternRegistry, get_registry
+from npd_journal import Incident, IncidentJournal, iter_incidents
+
+
+FORMAT_VERSION = 1
+ARCHIVE_SUFFIX = ".npda"
+CHUNK_ROWS = 65536
+KINDS = ("trigger", "pattern", "need")
+
+_MAGIC = b"NPDARCH\0"
+_HEADER = struct.Struct("<8sHH")       # magic, 格式版本, 保留
+_TRAILER = struct.Struct("<QI8s")      # 目录偏移, 目录长度, magic
+_ALIGN = 8                             # 每列起点按 8 字节对齐，原样存放的列可直接按类型解释
+_EPOCH = datetime(1970, 1, 1)
+
+Day = Union[date, datetime, str]
+
+
+def _seconds(ts: datetime) -> int:
+    return int((ts.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+
+def _bounds(since: Optional[Day], until: Optional[Day]) -> Tuple[Optional[int], Optional[int]]:
+    """按天（含首尾）的时间窗 → [lo, hi) 秒。"""
+    def day(value: Day) -> datetime:
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        if isinstance(value, datetime):
+            value = value.date()
+        return datetime(value.year, value.month, value.day)
+    lo = _seconds(day(since)) if since is not None else None
+    hi = _seconds(day(until) + timedelta(days=1)) if until is not None else None
+    return lo, hi
+
+
+def _narrow(values: List[int]) -> array:
+    """按最大值选最窄的无符号类型。"""
+    top = max(values, default=0)
+    return array("B" if top < 1 << 8 else "H" if top < 1 << 16 else "I", values)
+
+
+# ---------------------------------------------------------------------------
+# 一、写入
+# ---------------------------------------------------------------------------
+
+class ArchiveWriter:
+    """
+    流式写入归档：攒满一块就压缩落盘，内存里最多一块的数据。先写临时文件，close() 时原子替换。
+
+        with ArchiveWriter("history.npda") as writer:
+            for incident in iter_incidents("journal.jsonl"):
+                writer.append(incident)
+    """
+
+    def __init__(self, path: str, registry: Optional[PatternRegistry] = None,
+                 chunk_rows: int = CHUNK_ROWS, level: int = 6):
+        self.path = path
+        self.registry = registry or get_registry()
+        self.chunk_rows = chunk_rows
+        self.level = level
+        self.rows = 0
+        registry = self.registry
+        # 编码表：先按当前库的顺序登记，日志里出现库外的 value 时追加
+        self._values: Dict[str, List[str]] = {
+            "trigger": [t.value for t in registry.triggers],
+            "pattern": [p.value for p in registry.patterns],
+            "need": [n.value for n in registry.needs],
+        }
+        self._codes: Dict[str, Dict[str, int]] = {k: {v: i for i, v in enumerate(vs)} for k, vs in self._values.items()}
+        need_codes = self._codes["need"]
+        self._need_of: Dict[str, int] = {
+            c.pattern.value: need_codes[c.serves_need.value] for c in registry.cards if c.serves_need.value in need_codes
+        }
+        self._chunks: List[Dict[str, Any]] = []
+        self._pending: List[Incident] = []
+        self._tmp = path + ".tmp"
+        self._file = open(self._tmp, "wb")
+        self._file.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, 0))
+        self._pad()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _code(self, kind: str, value: str) -> int:
+        codes = self._codes[kind]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self._values[kind])
+            self._values[kind].append(value)
+        return code
+
+    def _pad(self) -> None:
+        extra = -self._file.tell() % _ALIGN
+        if extra:
+            self._file.write(b"\0" * extra)
+
+    def append(self, incident: Incident) -> None:
+        self._pending.append(incident)
+        if len(self._pending) >= self.chunk_rows:
+            self._flush()
+
+    def extend(self, incidents: Iterable[Incident]) -> None:
+        for incident in incidents:
+            self.append(incident)
+
+    def _flush(self) -> None:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        ts = [_seconds(inc.timestamp) for inc in rows]
+        deltas = array("q", [ts[0]] + [b - a for a, b in zip(ts, ts[1:])])
+        cols: Dict[str, array] = {"ts": deltas}
+        cols["stage"] = array("B", [inc.stage.value if inc.stage is not None else 0 for inc in rows])
+        code, need_of = self._code, self._need_of
+        triggers: List[int] = []
+        patterns: List[int] = []
+        needs: List[int] = []
+        counts: Dict[str, List[int]] = {"trigger": [], "pattern": [], "need": []}
+        notes: List[bytes] = []
+        for inc in rows:
+            triggers.extend(code("trigger", t.value) for t in inc.triggers)
+            counts["trigger"].append(len(inc.triggers))
+            values = [p.value for p in inc.patterns]
+            patterns.extend(code("pattern", v) for v in values)
+            counts["pattern"].append(len(values))
+            # 同一事件里服务同一需求的多个模式只计一次（与 JournalStats 一致）
+            row_needs = list(dict.fromkeys(need_of[v] for v in values if v in need_of))
+            needs.extend(row_needs)
+            counts["need"].append(len(row_needs))
+            notes.append(inc.note.encode("utf-8"))
+        for kind, flat in (("trigger", triggers), ("pattern", patterns), ("need", needs)):
+            cols[kind + "_count"] = _narrow(counts[kind])
+            cols[kind] = _narrow(flat)
+        cols["note_len"] = array("I", [len(b) for b in notes])
+        cols["note"] = array("B", b"".join(notes))
+
+        directory: Dict[str, Any] = {}
+        for name, values in cols.items():
+            if sys.byteorder != "little":
+                values.byteswap()
+            raw = values.tobytes()
+            packed = zlib.compress(raw, self.level) if self.level else raw
+            codec = "zlib" if len(packed) < len(raw) else "raw"
+            data = packed if codec == "zlib" else raw
+            offset = self._file.tell()
+            self._file.write(data)
+            self._pad()
+            directory[name] = [offset, len(data), len(raw), values.typecode, codec]
+        self._chunks.append({"rows": len(rows), "ts_min": min(ts), "ts_max": max(ts), "columns": directory})
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """写完最后一块、目录与尾部，并原子替换目标文件。"""
+        if self._file.closed:
+            return
+        self._flush()
+        directory = json.dumps({
+            "version": FORMAT_VERSION, "rows": self.rows,
+            "dictionaries": self._values, "chunks": self._chunks,
+        }, ensure_ascii=False).encode("utf-8")
+        offset = self._file.tell()
+        self._file.write(directory)
+        self._file.write(_TRAILER.pack(offset, len(directory), _MAGIC))
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        """放弃写入，删除临时文件（目标文件不变）。"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+def write_archive(path: str, incidents: Iterable[Incident], registry: Optional[PatternRegistry] = None,
+                  chunk_rows: int = CHUNK_ROWS, level: int = 6) -> int:
+    """把事件流写成归档，返回事件数。level 为 zlib 压缩级别（0 表示不压缩、读取全程零拷贝）。"""
+    with ArchiveWriter(path, registry, chunk_rows, level) as writer:
+        writer.extend(incidents)
+    return writer.rows
+
+
+# ---------------------------------------------------------------------------
+# 二、读取
+# ---------------------------------------------------------------------------
+
+class ArchiveError(ValueError):
+    """不是归档文件，或文件已损坏 / 版本不符。"""
+
+
+class IncidentArchive:
+    """
+    只读打开归档（内存映射）。列名：ts（差分后的秒）、stage、trigger_count / trigger、
+    pattern_count / pattern、need_count / need（编码见 dictionaries）、note_len / note（UTF-8 字节）。
+    返回的 memoryview / ndarray 可能指向映射内存，close() 之前请先释放。
+    """
+
+    def __init__(self, path: str, registry: Optional[PatternRegistry] = None):
+        self.path = path
+        self.registry = registry or get_registry()
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            self._read_directory()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_directory(self) -> None:
+        buf = self._view
+        if len(buf) < _HEADER.size + _TRAILER.size:
+            raise ArchiveError(f"不是事件归档：{self.path}")
+        magic, version, _ = _HEADER.unpack_from(buf)
+        offset, length, tail = _TRAILER.unpack_from(buf, len(buf) - _TRAILER.size)
+        if magic != _MAGIC or tail != _MAGIC:
+            raise ArchiveError(f"不是事件归档：{self.path}")
+        if version != FORMAT_VERSION:
+            raise ArchiveError(f"不支持的归档版本 {version}：{self.path}")
+        d = json.loads(bytes(buf[offset:offset + length]).decode("utf-8"))
+        self.rows: int = d["rows"]
+        self.chunks: List[Dict[str, Any]] = d["chunks"]
+        self.dictionaries: Dict[str, List[str]] = d["dictionaries"]
+        # 编码 → 当前库中的键；库里已没有的为 None（统计时仍按 value 计数）
+        lookup = self.registry.lookup
+        self._keys = {kind: [lookup(kind, v) for v in values] for kind, values in self.dictionaries.items()}
+
+    def close(self) -> None:
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # 调用方仍持有列视图：映射随其释放
+
+    def __enter__(self) -> "IncidentArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mmap)
+
+    def column_nbytes(self) -> Dict[str, Tuple[int, int]]:
+        """各列（压缩后, 原始）字节数，所有块合计。"""
+        sizes: Dict[str, List[int]] = {}
+        for chunk in self.chunks:
+            for name, (_, length, raw, _tc, _codec) in chunk["columns"].items():
+                s = sizes.setdefault(name, [0, 0])
+                s[0] += length
+                s[1] += raw
+        return {name: (a, b) for name, (a, b) in sizes.items()}
+
+    # -- 列 ----------------------------------------------------------------
+
+    def _chunk_column(self, chunk: Dict[str, Any], name: str, numpy: bool = False):
+        offset, length, _raw, typecode, codec = chunk["columns"][name]
+        data: Any = self._view[offset:offset + length]
+        if codec == "zlib":
+            data = zlib.decompress(data)
+        if sys.byteorder != "little":
+            values = array(typecode, bytes(data))
+            values.byteswap()
+            data = values.tobytes()  # 大端机器上只能复制一份
+        if numpy:
+            import numpy as np
+            return np.frombuffer(data, dtype=np.dtype(typecode))
+        return memoryview(data).cast(typecode)
+
+    def _select(self, since: Optional[Day], until: Optional[Day]) -> Iterator[Tuple[Dict[str, Any], bool]]:
+        """与时间窗相交的块，以及该块是否整块落在窗内。"""
+        lo, hi = _bounds(since, until)
+        for chunk in self.chunks:
+            if (lo is not None and chunk["ts_max"] < lo) or (hi is not None and chunk["ts_min"] >= hi):
+                continue
+            inside = (lo is None or chunk["ts_min"] >= lo) and (hi is None or chunk["ts_max"] < hi)
+            yield chunk, inside
+
+    def column_chunks(self, name: str, numpy: bool = False,
+                      since: Optional[Day] = None, until: Optional[Day] = None) -> Iterator[Any]:
+        """逐块给出某列（与时间窗相交的块；块内不再按时间过滤）。ts 为差分值，绝对时间见 timestamps()。"""
+        for chunk, _ in self._select(since, until):
+            yield self._chunk_column(chunk, name, numpy)
+
+    def column(self, name: str, numpy: bool = False) -> Any:
+        """
+        整列：只有一块时即该块的视图（零拷贝），多块时拼接为一个 array / ndarray。
+        计数与编码列按块收窄，各块宽度可能不同（B / H / I）：拼接时统一为最宽的那种。
+        """
+        parts = list(self.column_chunks(name, numpy))
+        if len(parts) == 1:
+            return parts[0]
+        if numpy:
+            import numpy as np
+            return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+        out = array(max((part.format for part in parts), key=lambda tc: array(tc).itemsize, default="B"))
+        for part in parts:
+            if part.format == out.typecode:
+                out.frombytes(part.tobytes())
+            else:
+                out.extend(part)
+        return out
+
+    def _chunk_timestamps(self, chunk: Dict[str, Any], numpy: bool = False):
+        deltas = self._chunk_column(chunk, "ts", numpy)
+        if numpy:
+            return deltas.cumsum()
+        return array("q", accumulate(deltas))
+
+    def timestamps(self, numpy: bool = False) -> Any:
+        """全部事件的秒级时间戳（1970-01-01 起），由差分还原。"""
+        parts = [self._chunk_timestamps(chunk, numpy) for chunk in self.chunks]
+        if numpy:
+            import numpy as np
+            return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        out = array("q")
+        for part in parts:
+            out.extend(part)
+        return out
+
+    # -- 统计 --------------------------------------------------------------
+
+    def code_counts(self, kind: str, since: Optional[Day] = None, until: Optional[Day] = None,
+                    numpy: bool = False) -> Counter:
+        """
+        某类（trigger / pattern / need）各编码出现的事件数。整块在窗内时只读该类的编码列；
+        与窗部分相交的块再读时间列与每行个数列，挑出窗内的行。
+        """
+        lo, hi = _bounds(since, until)
+        total: Counter = Counter()
+        for chunk, inside in self._select(since, until):
+            codes = self._chunk_column(chunk, kind, numpy)
+            if not inside:
+                ts = self._chunk_timestamps(chunk, numpy)
+                per_row = self._chunk_column(chunk, kind + "_count", numpy)
+                if numpy:
+                    import numpy as np
+                    keep = np.ones(len(ts), dtype=bool)
+                    if lo is not None:
+                        keep &= ts >= lo
+                    if hi is not None:
+                        keep &= ts < hi
+                    codes = codes[np.repeat(keep, per_row)]
+                else:
+                    picked: List[int] = []
+                    pos = 0
+                    for t, n in zip(ts, per_row):
+                        if (lo is None or t >= lo) and (hi is None or t < hi):
+                            picked.extend(codes[pos:pos + n])
+                        pos += n
+                    codes = picked
+            if numpy:
+                import numpy as np
+                for code, n in enumerate(np.bincount(codes).tolist()):
+                    if n:
+                        total[code] += n
+            else:
+                total.update(codes)
+        return total
+
+    def counts(self, kind: str, since: Optional[Day] = None, until: Optional[Day] = None,
+               numpy: bool = False) -> Dict[Any, int]:
+        """某类各键的事件数（降序）；当前库里没有的键以 value 字符串给出。"""
+        keys, values = self._keys[kind], self.dictionaries[kind]
+        return {
+            keys[code] if keys[code] is not None else values[code]: n
+            for code, n in self.code_counts(kind, since, until, numpy).most_common()
+        }
+
+    def stage_counts(self, since: Optional[Day] = None, until: Optional[Day] = None) -> Dict[EscalationLevel, int]:
+        lo, hi = _bounds(since, until)
+        total: Counter = Counter()
+        for chunk, inside in self._select(since, until):
+            stages = self._chunk_column(chunk, "stage")
+            if inside:
+                total.update(stages)
+            else:
+                ts = self._chunk_timestamps(chunk)
+                total.update(s for t, s in zip(ts, stages) if (lo is None or t >= lo) and (hi is None or t < hi))
+        total.pop(0, None)
+        return {EscalationLevel(s): n for s, n in total.most_common()}
+
+    # -- 逐行还原 ----------------------------------------------------------
+
+    def iter_incidents(self, since: Optional[Day] = None, until: Optional[Day] = None) -> Iterator[Incident]:
+        """按写入顺序还原事件（生成器）；库里已没有的触发 / 模式被跳过，与 Incident.from_json 一致。"""
+        lo, hi = _bounds(since, until)
+        trigger_keys, pattern_keys = self._keys["trigger"], self._keys["pattern"]
+        for chunk, inside in self._select(since, until):
+            col = self._chunk_column
+            ts = self._chunk_timestamps(chunk)
+            stages = col(chunk, "stage")
+            t_count, t_codes = col(chunk, "trigger_count"), col(chunk, "trigger")
+            p_count, p_codes = col(chunk, "pattern_count"), col(chunk, "pattern")
+            note_len, notes = col(chunk, "note_len"), col(chunk, "note")
+            t_pos = p_pos = n_pos = 0
+            for i in range(chunk["rows"]):
+                t_end, p_end, n_end = t_pos + t_count[i], p_pos + p_count[i], n_pos + note_len[i]
+                seconds = ts[i]
+                if inside or ((lo is None or seconds >= lo) and (hi is None or seconds < hi)):
+                    stage = stages[i]
+                    yield Incident(
+                        _EPOCH + timedelta(seconds=seconds),
+                        tuple(k for k in (trigger_keys[c] for c in t_codes[t_pos:t_end]) if k is not None),
+                        tuple(k for k in (pattern_keys[c] for c in p_codes[p_pos:p_end]) if k is not None),
+                        EscalationLevel(stage) if stage else None,
+                        str(notes[n_pos:n_end], "utf-8") if n_end > n_pos else "",
+                    )
+                t_pos, p_pos, n_pos = t_end, p_end, n_end
+
+    def __iter__(self) -> Iterator[Incident]:
+        return self.iter_incidents()
+
+
+# ---------------------------------------------------------------------------
+# 三、与事件日志互转
+# ---------------------------------------------------------------------------
+
+def pack_journal(journal_path: str, archive_path: str, registry: Optional[PatternRegistry] = None,
+                 chunk_rows: int = CHUNK_ROWS, level: int = 6) -> int:
+    """把 .jsonl 事件日志流式写成归档，返回事件数。"""
+    registry = registry or get_registry()
+    return write_archive(archive_path, iter_incidents(journal_path, 0, registry), registry, chunk_rows, level)
+
+
+def unpack_archive(archive_path: str, journal_path: str, registry: Optional[PatternRegistry] = None) -> int:
+    """把归档中的事件追加到 .jsonl 事件日志（日志的汇总随之更新），返回事件数。"""
+    n = 0
+    with IncidentArchive(archive_path, registry) as archive, IncidentJournal(journal_path, archive.registry) as journal:
+        for incident in archive:
+            journal.append(incident)
+            n += 1
+    return n
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="npd_archive", description="事件归档：列式压缩的多年事件历史")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("pack", help="把 .jsonl 事件日志写成归档")
+    p.add_argument("journal")
+    p.add_argument("archive")
+    p.add_argument("--level", type=int, default=6, help="zlib 压缩级别（0 为不压缩）")
+    p = sub.add_parser("unpack", help="把归档中的事件追加到 .jsonl 事件日志")
+    p.add_argument("archive")
+    p.add_argument("journal")
+    p = sub.add_parser("stats", help="归档大小与时间窗内的触发、模式、需求排行")
+    p.add_argument("archive")
+    p.add_argument("--since", help="起始日期（含），如 2023-01-01")
+    p.add_argument("--until", help="结束日期（含）")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        n = pack_journal(args.journal, args.archive, level=args.level)
+        size = os.path.getsize(args.archive)
+        print(f"已写入 {n:,} 条事件，{size / 1e6:.2f} MB（原日志 {os.path.getsize(args.journal) / 1e6:.2f} MB）")
+        return 0
+    if args.command == "unpack":
+        print(f"已追加 {unpack_archive(args.archive, args.journal):,} 条事件")
+        return 0
+    with IncidentArchive(args.archive) as archive:
+        print(f"事件数：{len(archive):,}（{len(archive.chunks)} 块，{archive.nbytes / 1e6:.2f} MB）")
+        for kind, label in (("trigger", "触发"), ("pattern", "行为模式"), ("need", "核心需求")):
+            ranked = list(archive.counts(kind, args.since, args.until).items())[:5]
+            print(f"{label}：" + "、".join(f"{getattr(k, 'name', k)}×{n}" for k, n in ranked))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
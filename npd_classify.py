@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+短语分类：把粘贴进来的原话（「我为你付出那么多」「你想多了」）对应到行为模式与可能的触发。
+
+  - 词表：每个行为模式 / 触发各有一组常见说法（PATTERN_PHRASES / TRIGGER_PHRASES），
+    另外自动收录卡片「表现」里用‘’引出的原话，所以自定义库的卡片也能被识别；
+  - 自动机：全部短语编译为一个 Aho–Corasick 自动机，整段文字只扫描一遍，与短语数量无关；
+  - 置信度：同一标签命中的不同短语按 1 - Π(1 - w) 合并（w 为短语权重，越短越弱）；
+    触发除了直接命中的短语，也从命中的模式按「触发 → 模式」映射间接推断（权重减半）。
+
+整份聊天记录（数 MB）可以用 classify_lines() 逐行（逐条消息）分类，或直接 classify() 得到全篇汇总。
+比对前会把全角字母数字转为半角并转小写，命中位置仍对应原文。
+
+依赖：同目录下的 npd.py。
+"""
+
+import math
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from npd import BehaviorPattern, PatternRegistry, TriggerType, get_registry
+
+
+# 各行为模式的常见说法（示意性词表，可按需增补）
+PATTERN_PHRASES: Dict[BehaviorPattern, Tuple[str, ...]] = {
+    BehaviorPattern.贬低与挑剔: ("你怎么这么笨", "没出息", "一无是处", "丢人现眼", "就你这样", "你能干什么", "看看你穿的"),
+    BehaviorPattern.否认感受: ("你想多了", "你没那么难受", "太敏感", "小题大做", "至于吗", "矫情", "有什么好哭的", "玻璃心"),
+    BehaviorPattern.煤气灯: ("我从来没说过", "你记错了", "根本没这回事", "你在胡说", "你脑子有问题", "是你自己编的", "你疯了"),
+    BehaviorPattern.DARVO: ("你怎么能这么说我", "我才是受害者", "你这是在攻击我", "都是你逼的", "你还有脸说我", "我哪里对不起你"),
+    BehaviorPattern.道德绑架: ("我为你付出那么多", "你不孝", "白养你了", "养你这么大", "没良心", "白眼狼", "我都是为了你"),
+    BehaviorPattern.惩罚与虐待: ("滚出去", "给我跪下", "不许吃饭", "看我怎么收拾你", "给我闭嘴", "打死你"),
+    BehaviorPattern.过度控制: ("必须听我的", "你不准", "手机给我", "跟谁出去", "几点回来", "我说了算", "不许你"),
+    BehaviorPattern.被动攻击: ("你开心就好", "随便你吧", "我哪敢说你", "您厉害", "反正我说什么都没用", "你高兴就行"),
+    BehaviorPattern.扮演受害者: ("我命苦", "活着还有什么意思", "我这么可怜", "被你气死了", "我还不如死了", "心脏病都要犯了"),
+    BehaviorPattern.比较与嫉妒: ("别人家的孩子", "你看看人家", "怎么不学学", "有什么了不起", "得意什么", "你看看别人"),
+    BehaviorPattern.爱的撤回: ("我没你这个女儿", "我没你这个儿子", "就当没生过你", "以后别叫我妈", "断绝关系", "不认你"),
+    BehaviorPattern.三角化: ("你姐都说", "大家都说你", "亲戚都知道", "你爸也觉得", "别人都说你", "你看你妹妹"),
+}
+
+# 各触发情境的常见说法（多是孩子这一方说的话或发生的事）
+TRIGGER_PHRASES: Dict[TriggerType, Tuple[str, ...]] = {
+    TriggerType.被批评或否定: ("你做得不对", "你这样不好", "我不同意", "你说的不对"),
+    TriggerType.孩子独立或疏远: ("我要搬出去", "我自己决定", "我不回家", "我想自己住", "少联系"),
+    TriggerType.设立边界: ("我不想", "请不要", "不要再", "我拒绝", "这是我的隐私", "别翻我"),
+    TriggerType.孩子成就超过或脱离: ("升职", "考上了", "被录取", "获奖", "加薪", "找到工作"),
+    TriggerType.未被关注或忽视: ("你都不关心我", "没给我打电话", "都不理我", "没人管我", "想不起我"),
+    TriggerType.被质疑或要求负责: ("你伤害了我", "你要道歉", "请你道歉", "你小时候对我", "你为什么要这样"),
+    TriggerType.孩子获得他人关注: ("他们夸我", "老师表扬", "男朋友", "女朋友", "婆婆对我"),
+    TriggerType.暴露缺点或失败: ("你也有错", "你做错了", "被骗了", "亏了钱", "你搞砸了"),
+}
+
+CURATED_WEIGHT = 0.6
+QUOTED_WEIGHT = 0.5   # 从卡片描述里收录的原话
+INDIRECT_FACTOR = 0.5  # 由模式推断触发时的折扣
+
+_QUOTE_RE = re.compile(r"‘([^’]{2,20})’")
+# 与长度无关的归一化：全角 ASCII → 半角，大写 → 小写（命中位置仍与原文一一对应）
+_FOLD = {full: full - 0xFEE0 for full in range(0xFF01, 0xFF5F)}
+_FOLD.update({c: c + 32 for c in range(0x41, 0x5B)})
+_FOLD.update({c: c - 0xFEE0 + 32 for c in range(0xFF21, 0xFF3B)})
+_FOLD[0x3000] = 0x20
+
+
+def normalize(text: str) -> str:
+    return text.translate(_FOLD)
+
+
+def _weight(phrase: str, base: float) -> float:
+    """两个字以内的短语太常见，权重减半。"""
+    return base if len(phrase) > 2 else base / 2
+
+
+@dataclass(frozen=True)
+class Phrase:
+    text: str
+    kind: str          # "pattern" / "trigger"
+    key: object        # BehaviorPattern / TriggerType（或自定义库的 LibraryKey）
+    weight: float
+
+
+@dataclass(frozen=True)
+class LabelScore:
+    """一个标签（模式或触发）的置信度、命中的短语与命中次数。"""
+    kind: str
+    key: object
+    confidence: float
+    phrases: Tuple[str, ...]
+    count: int
+
+
+@dataclass(frozen=True)
+class Classification:
+    patterns: Tuple[LabelScore, ...]
+    triggers: Tuple[LabelScore, ...]
+    # (起始下标, 结束下标, 短语)，按出现顺序
+    spans: Tuple[Tuple[int, int, Phrase], ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns or self.triggers)
+
+    @property
+    def top_pattern(self) -> Optional[LabelScore]:
+        return self.patterns[0] if self.patterns else None
+
+    @property
+    def top_trigger(self) -> Optional[LabelScore]:
+        return self.triggers[0] if self.triggers else None
+
+
+# ---------------------------------------------------------------------------
+# 一、Aho–Corasick 自动机
+# ---------------------------------------------------------------------------
+
+class PhraseAutomaton:
+    """
+    多模式串匹配：goto 为每个状态一个 {字符: 下一状态} 字典，fail 为失配链接，
+    out[s] 为到达状态 s 时结束的全部短语编号（已沿失配链合并）。
+    """
+
+    __slots__ = ("phrases", "_goto", "_fail", "_out", "_alphabet")
+
+    def __init__(self, phrases: Sequence[Phrase]):
+        self.phrases: Tuple[Phrase, ...] = tuple(phrases)
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Tuple[int, ...]] = [()]
+        for pid, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in normalize(phrase.text):
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (pid,)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self._alphabet = frozenset(ch for edges in goto for ch in edges)
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """逐个产出 (结束下标 + 1, 短语编号)，只扫描一遍 text。"""
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        state = 0
+        for i, ch in enumerate(normalize(text)):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pid in out[state]:
+                    yield i + 1, pid
+
+
+# ---------------------------------------------------------------------------
+# 二、分类器
+# ---------------------------------------------------------------------------
+
+def build_lexicon(registry: PatternRegistry) -> List[Phrase]:
+    """当前库的全部短语：内置词表（只收库中存在的键）与卡片描述中的‘原话’。"""
+    phrases: Dict[Tuple[str, object, str], Phrase] = {}
+
+    def add(text: str, kind: str, key: object, base: float) -> None:
+        text = text.strip()
+        if len(text) >= 2:
+            phrases.setdefault((kind, key, normalize(text)), Phrase(text, kind, key, _weight(text, base)))
+
+    patterns = set(registry.patterns)
+    for pattern, texts in PATTERN_PHRASES.items():
+        if pattern in patterns:
+            for text in texts:
+                add(text, "pattern", pattern, CURATED_WEIGHT)
+    for card in registry.cards:
+        for text in _QUOTE_RE.findall(card.description):
+            add(text, "pattern", card.pattern, QUOTED_WEIGHT)
+    triggers = set(registry.triggers)
+    for trigger, texts in TRIGGER_PHRASES.items():
+        if trigger in triggers:
+            for text in texts:
+                add(text, "trigger", trigger, CURATED_WEIGHT)
+    return list(phrases.values())
+
+
+class PhraseClassifier:
+    """由某个库的词表编译的分类器（不可变，可在线程间共享）。"""
+
+    def __init__(self, registry: Optional[PatternRegistry] = None, phrases: Optional[Sequence[Phrase]] = None):
+        self.registry = registry or get_registry()
+        self.automaton = PhraseAutomaton(build_lexicon(self.registry) if phrases is None else phrases)
+        # 模式 → [(触发, 位置权重)]，用于由模式间接推断触发
+        self._triggers_by_pattern: Dict[object, List[Tuple[object, float]]] = {}
+        for trigger, pats in self.registry.trigger_patterns.items():
+            for pos, pattern in enumerate(pats):
+                self._triggers_by_pattern.setdefault(pattern, []).append((trigger, (len(pats) - pos) / len(pats)))
+
+    def spans(self, text: str) -> List[Tuple[int, int, Phrase]]:
+        phrases = self.automaton.phrases
+        return [(end - len(phrases[pid].text), end, phrases[pid]) for end, pid in self.automaton.iter_matches(text)]
+
+    def classify(self, text: str, limit: Optional[int] = None, keep_spans: bool = False) -> Classification:
+        """分类一段文字；limit 限制每类返回的标签数。"""
+        return self._score(self.automaton.iter_matches(text), limit, text if keep_spans else None)
+
+    def classify_lines(self, lines: Iterable[str], limit: Optional[int] = None) -> Iterator[Tuple[str, Classification]]:
+        """逐行（每行一条消息）分类，产出 (行, 结果)；空行跳过。"""
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if line.strip():
+                yield line, self.classify(line, limit)
+
+    def _score(self, matches: Iterable[Tuple[int, int]], limit: Optional[int], text: Optional[str]) -> Classification:
+        phrases = self.automaton.phrases
+        hits: Dict[int, int] = {}
+        spans = []
+        for end, pid in matches:
+            hits[pid] = hits.get(pid, 0) + 1
+            if text is not None:
+                spans.append((end - len(phrases[pid].text), end, phrases[pid]))
+        # 每个标签：log Π(1 - w)、命中的短语、命中次数
+        acc: Dict[Tuple[str, object], List] = {}
+        for pid, n in hits.items():
+            p = phrases[pid]
+            entry = acc.setdefault((p.kind, p.key), [0.0, [], 0])
+            entry[0] += math.log1p(-p.weight)
+            entry[1].append(p.text)
+            entry[2] += n
+        pattern_conf = {key: 1.0 - math.exp(e[0]) for (kind, key), e in acc.items() if kind == "pattern"}
+        for pattern, conf in pattern_conf.items():
+            for trigger, pos_weight in self._triggers_by_pattern.get(pattern, ()):
+                entry = acc.setdefault(("trigger", trigger), [0.0, [], 0])
+                entry[0] += math.log1p(-conf * INDIRECT_FACTOR * pos_weight)
+        scores = {"pattern": [], "trigger": []}
+        for (kind, key), (log_miss, texts, count) in acc.items():
+            scores[kind].append(LabelScore(kind, key, 1.0 - math.exp(log_miss), tuple(texts), count))
+        for kind in scores:
+            scores[kind].sort(key=lambda s: (-s.confidence, -s.count))
+        return Classification(
+            tuple(scores["pattern"][:limit]),
+            tuple(scores["trigger"][:limit]),
+            tuple(spans),
+        )
+
+
+_classifier: Optional[PhraseClassifier] = None
+
+
+def get_classifier() -> PhraseClassifier:
+    """当前库对应的分类器（库被替换后重建）。"""
+    global _classifier
+    registry = get_registry()
+    if _classifier is None or _classifier.registry is not registry:
+        _classifier = PhraseClassifier(registry)
+    return _classifier
+
+
+def classify(text: str, limit: Optional[int] = None) -> Classification:
+    """用当前库的分类器分类一段文字。"""
+    return get_classifier().classify(text, limit)
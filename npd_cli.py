@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+命令行入口（无界面、启动快）：只导入 npd.py 与标准库，检索/渲染等模块用到时才加载，从不导入 tkinter。
+
+    python npd_cli.py trigger 设立边界 [--format text|markdown|html|json]
+    python npd_cli.py need control_supply [--format text|json]
+    python npd_cli.py pattern DARVO [--format text|json]
+    python npd_cli.py search 你想多了 [--limit 5]
+    python npd_cli.py classify 我为你付出那么多 [--format text|json]
+    python npd_cli.py classify --per-line < chat.txt      # 整份聊天记录逐行分类，输出 JSON Lines
+    python npd_cli.py defend --trigger 设立边界 --pattern 过度控制 [--limit 3] [--format text|json]
+    python npd_cli.py predict --journal journal.jsonl -t 被质疑或要求负责 -p DARVO [--limit 5] [--format text|json]
+    python npd_cli.py export --format markdown --output cards.md
+    python npd_cli.py packs [--format text|json]          # 已安装的扩展包（见 npd_plugins.py）
+    cat triggers.txt | python npd_cli.py batch [--kind trigger|pattern|need|search|classify]
+
+触发、模式、需求既可以写中文名，也可以写 value（如 boundary、gaslighting）。
+batch 从标准输入逐行读取、逐行向标准输出写 JSON Lines（每行一个对象，查不到时带 "error"），
+适合接到其他工具的管道里。--library 可指定自定义库文件（见 npd_library.py）；
+--profile / --profile-stats 见 npd_profile.py。
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from npd import PatternCard, get_registry
+
+
+KINDS = ("trigger", "pattern", "need")
+_KIND_LABELS = {"trigger": "触发", "pattern": "模式", "need": "核心需求"}
+
+
+# ---------------------------------------------------------------------------
+# 一、记录（JSON 输出用）
+# ---------------------------------------------------------------------------
+
+def card_record(card: PatternCard) -> Dict[str, Any]:
+    return {
+        "pattern": card.pattern.name,
+        "value": card.pattern.value,
+        "serves_need": card.serves_need.name,
+        "description": card.description,
+        "healing_note": card.healing_note,
+    }
+
+
+def trigger_record(trigger) -> Dict[str, Any]:
+    registry = get_registry()
+    return {
+        "kind": "trigger",
+        "name": trigger.name,
+        "value": trigger.value,
+        "description": registry.trigger_description(trigger),
+        "cards": [card_record(c) for c in registry.cards_for_trigger(trigger)],
+    }
+
+
+_triggers_by_pattern: Tuple[Any, Dict[Any, List[str]]] = (None, {})
+
+
+def triggers_by_pattern(registry) -> Dict[Any, List[str]]:
+    """
+    模式 → 包含它的各触发的中文名（按 registry.triggers 的顺序）。
+    每个库只建一次：逐个模式去翻所有触发在大库上是平方级的（1 万张卡片的响应表要半分钟）。
+    """
+    global _triggers_by_pattern
+    cached, index = _triggers_by_pattern
+    if cached is not registry:
+        index = {}
+        trigger_patterns = registry.trigger_patterns
+        for t in registry.triggers:
+            for p in dict.fromkeys(trigger_patterns.get(t, ())):
+                index.setdefault(p, []).append(t.name)
+        _triggers_by_pattern = (registry, index)
+    return index
+
+
+def pattern_record(pattern) -> Dict[str, Any]:
+    registry = get_registry()
+    card = registry.card_for_pattern(pattern)
+    return {
+        "kind": "pattern",
+        "name": pattern.name,
+        "value": pattern.value,
+        "card": card_record(card) if card is not None else None,
+        "triggers": list(triggers_by_pattern(registry).get(pattern, ())),
+    }
+
+
+def need_record(need) -> Dict[str, Any]:
+    registry = get_registry()
+    return {
+        "kind": "need",
+        "name": need.name,
+        "value": need.value,
+        "description": registry.need_description(need),
+        "cards": [card_record(c) for c in registry.cards_for_need(need)],
+    }
+
+
+_RECORDS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    "trigger": trigger_record,
+    "pattern": pattern_record,
+    "need": need_record,
+}
+
+
+def _resolve(kind: str, text: str):
+    key = get_registry().lookup(kind, text.strip())
+    if key is None:
+        raise SystemExit(f"npd: 找不到{_KIND_LABELS[kind]}：{text}")
+    return key
+
+
+def _dump(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------------------
+# 二、子命令
+# ---------------------------------------------------------------------------
+
+def _cmd_trigger(args, out: TextIO) -> None:
+    from npd_render import write_render
+    for name in args.names:
+        write_render(out, _resolve("trigger", name), args.format)
+
+
+def _print_card(card: PatternCard, out: TextIO) -> None:
+    out.write(f"【{card.pattern.name}】\n  表现：{card.description}\n  疗愈提示：{card.healing_note}\n\n")
+
+
+def _cmd_need(args, out: TextIO) -> None:
+    registry = get_registry()
+    for name in args.names:
+        need = _resolve("need", name)
+        if args.format == "json":
+            out.write(_dump(need_record(need)) + "\n")
+            continue
+        out.write(f"【{need.name}】\n{registry.need_description(need)}\n\n")
+        for card in registry.cards_for_need(need):
+            _print_card(card, out)
+
+
+def _cmd_pattern(args, out: TextIO) -> None:
+    registry = get_registry()
+    for name in args.names:
+        pattern = _resolve("pattern", name)
+        if args.format == "json":
+            out.write(_dump(pattern_record(pattern)) + "\n")
+            continue
+        card = registry.card_for_pattern(pattern)
+        if card is not None:
+            _print_card(card, out)
+        triggers = pattern_record(pattern)["triggers"]
+        out.write(f"常见触发：{'、'.join(triggers) or '（无）'}\n\n")
+
+
+def _cmd_search(args, out: TextIO) -> None:
+    from npd_search import search
+    hits = search(" ".join(args.query), args.limit)
+    for hit in hits:
+        if args.format == "json":
+            out.write(_dump({"kind": hit.kind, "name": hit.key.name, "value": hit.key.value, "score": hit.score}) + "\n")
+        else:
+            out.write(f"{hit.score:8.3f}  [{hit.kind}] {hit.key.name}\n")
+
+
+def classification_record(result, limit: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        kind: [{"name": s.key.name, "value": s.key.value, "confidence": round(s.confidence, 4),
+                "phrases": list(s.phrases)} for s in scores[:limit]]
+        for kind, scores in (("patterns", result.patterns), ("triggers", result.triggers))
+    }
+
+
+def _cmd_classify(args, out: TextIO) -> None:
+    from npd_classify import get_classifier
+    classifier = get_classifier()
+    if args.per_line:
+        for line, result in classifier.classify_lines(sys.stdin, args.limit):
+            out.write(_dump({"input": line, **classification_record(result)}) + "\n")
+        return
+    result = classifier.classify(" ".join(args.text) if args.text else sys.stdin.read(), args.limit)
+    if args.format == "json":
+        out.write(_dump(classification_record(result)) + "\n")
+        return
+    if not result:
+        out.write("没有识别出已知的说法。\n")
+        return
+    for title, scores in (("行为模式", result.patterns), ("可能的触发", result.triggers)):
+        if scores:
+            out.write(f"{title}：\n")
+            for s in scores:
+                out.write(f"  {s.confidence:6.1%}  {s.key.name}" + (f"（{'、'.join(s.phrases)}）" if s.phrases else "") + "\n")
+
+
+def strategy_record(ranked) -> Dict[str, Any]:
+    s = ranked.strategy
+    return {"name": s.name, "value": s.value, "score": ranked.score, "summary": s.summary, "steps": list(s.steps)}
+
+
+def _cmd_defend(args, out: TextIO) -> None:
+    from npd_defense import get_strategies, get_strategy_table
+    triggers = [_resolve("trigger", t) for t in args.trigger]
+    patterns = [_resolve("pattern", p) for p in args.pattern]
+    table = get_strategy_table()
+    if not triggers and not patterns:
+        for s in get_strategies():
+            out.write(f"【{s.name}】{s.summary}\n")
+        return
+    if len(triggers) <= 1 and len(patterns) <= 1:
+        ranked = table.get(triggers[0] if triggers else None, patterns[0] if patterns else None)[:args.limit]
+    else:
+        ranked = table.recommend_for_situation(triggers, patterns, args.limit)
+    if args.format == "json":
+        out.write(_dump({"strategies": [strategy_record(r) for r in ranked]}) + "\n")
+        return
+    if not ranked:
+        out.write("没有针对这一情境标注的策略。\n")
+    for r in ranked:
+        out.write(f"【{r.strategy.name}】（{r.score:.2f}）{r.strategy.summary}\n")
+        for step in r.strategy.steps:
+            out.write(f"  - {step}\n")
+        out.write("\n")
+
+
+def _cmd_predict(args, out: TextIO) -> None:
+    from npd_predict import SequencePredictor
+    trigger = _resolve("trigger", args.trigger) if args.trigger else None
+    recent = [_resolve("pattern", p) for p in args.pattern]
+    if args.journal:
+        if not os.path.exists(args.journal):
+            raise SystemExit(f"npd: 找不到事件日志：{args.journal}")
+        predictor = SequencePredictor.for_journal(args.journal)
+        predictor.checkpoint()
+    else:
+        predictor = SequencePredictor()
+    if trigger is None and not recent and args.journal:
+        predictions = predictor.predict_next(args.limit)
+    else:
+        predictions = predictor.predict(trigger, recent, args.limit)
+    if args.format == "json":
+        out.write(_dump({
+            "incidents": predictor.count,
+            "predictions": [{"pattern": p.pattern.name, "value": p.pattern.value, "probability": p.probability,
+                             "evidence": p.evidence} for p in predictions],
+        }) + "\n")
+        return
+    if not predictions:
+        out.write("数据不足：请指定触发，或用 --journal 提供事件日志。\n")
+    for p in predictions:
+        out.write(f"  {p.probability:6.1%}  {p.pattern.name}" + (f"（依据 {p.evidence:,} 次）" if p.evidence else "（内置映射）") + "\n")
+
+
+def _cmd_packs(args, out: TextIO) -> None:
+    from npd import build_builtin_registry
+    from npd_plugins import installed_packs
+    packs = installed_packs(build_builtin_registry)
+    if args.format == "json":
+        out.write(_dump([{"name": info.name, "target": info.target, "dist": info.dist, "version": info.version,
+                          "ok": ok} for info, ok in packs]) + "\n")
+        return
+    if not packs:
+        out.write("没有安装扩展包。\n")
+    for info, ok in packs:
+        dist = f"{info.dist} {info.version}".strip()
+        out.write(f"  {'✓' if ok else '✗'} {info.name:<16} {info.target}" + (f"（{dist}）" if dist else "") + "\n")
+
+
+def _cmd_export(args, out: TextIO) -> None:
+    from npd_render import export_all
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            export_all(f, args.format)
+    else:
+        export_all(out, args.format)
+
+
+def iter_batch(lines: Iterable[str], kind: str = "trigger", limit: int = 5) -> Iterable[str]:
+    """把每行输入转成一行 JSON（生成器，逐行处理）；重复的输入直接复用上次的结果。"""
+    cache: Dict[str, str] = {}
+    registry = get_registry()
+    for raw in lines:
+        text = raw.strip()
+        if not text:
+            continue
+        line = cache.get(text)
+        if line is None:
+            if kind == "search":
+                from npd_search import search
+                record: Dict[str, Any] = {
+                    "hits": [{"kind": h.kind, "name": h.key.name, "value": h.key.value, "score": h.score}
+                             for h in search(text, limit)],
+                }
+            elif kind == "classify":
+                from npd_classify import classify
+                record = classification_record(classify(text, limit))
+            else:
+                key = registry.lookup(kind, text)
+                record = _RECORDS[kind](key) if key is not None else {"error": f"unknown {kind}"}
+            line = _dump({"input": text, **record}) + "\n"
+            if len(cache) < 65536:
+                cache[text] = line
+        yield line
+
+
+def _cmd_batch(args, out: TextIO) -> None:
+    write = out.write
+    for line in iter_batch(sys.stdin, args.kind, args.limit):
+        write(line)
+
+
+# ---------------------------------------------------------------------------
+# 三、参数解析
+# ---------------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="npd", description="隐性 NPD 母亲内在程序模型 — 命令行")
+    parser.add_argument("--library", metavar="PATH", help="使用自定义库文件（JSON / TOML）")
+    parser.add_argument("--compact", action="store_true", help="以列式紧凑形式加载 --library（十万张以上卡片的大库）")
+    parser.add_argument("--profile", action="store_true", help="退出时向 stderr 输出各函数的调用次数与耗时")
+    parser.add_argument("--profile-stats", metavar="FILE", help="同 --profile，并用 cProfile 记录、写入 FILE")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("trigger", help="某触发的核心需求、升级路径与行为模式卡片")
+    p.add_argument("names", nargs="+", help="触发名称或 value")
+    p.add_argument("--format", choices=("text", "markdown", "html", "json"), default="text")
+    p.set_defaults(func=_cmd_trigger)
+
+    p = sub.add_parser("need", help="服务于某核心需求的行为模式")
+    p.add_argument("names", nargs="+", help="核心需求名称或 value")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_need)
+
+    p = sub.add_parser("pattern", help="某行为模式的卡片与常见触发")
+    p.add_argument("names", nargs="+", help="模式名称或 value")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_pattern)
+
+    p = sub.add_parser("search", help="全文检索卡片与说明")
+    p.add_argument("query", nargs="+")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_search)
+
+    p = sub.add_parser("classify", help="识别原话对应的行为模式与可能的触发")
+    p.add_argument("text", nargs="*", help="要识别的文字（省略时从标准输入读取）")
+    p.add_argument("--per-line", action="store_true", help="从标准输入逐行分类，输出 JSON Lines")
+    p.add_argument("--limit", type=int, default=5, help="每类最多返回的条数")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_classify)
+
+    p = sub.add_parser("defend", help="某触发 / 行为模式下推荐的防御策略（都省略时列出全部策略）")
+    p.add_argument("--trigger", "-t", action="append", default=[], help="触发名称或 value（可重复）")
+    p.add_argument("--pattern", "-p", action="append", default=[], help="模式名称或 value（可重复）")
+    p.add_argument("--limit", type=int, default=3, help="最多返回的策略数")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_defend)
+
+    p = sub.add_parser("predict", help="刚出现某些行为模式之后，接下来最可能的模式（按事件日志学习）")
+    p.add_argument("--journal", "-j", metavar="PATH", help="事件日志 .jsonl（省略时只用内置映射）")
+    p.add_argument("--trigger", "-t", help="触发名称或 value")
+    p.add_argument("--pattern", "-p", action="append", default=[], help="刚出现的模式，按时间顺序（可重复）")
+    p.add_argument("--limit", type=int, default=5, help="最多返回的模式数")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_predict)
+
+    p = sub.add_parser("packs", help="列出已安装的扩展包及能否正常加载")
+    p.add_argument("--format", choices=("text", "json"), default="text")
+    p.set_defaults(func=_cmd_packs)
+
+    p = sub.add_parser("export", help="导出全部触发")
+    p.add_argument("--format", choices=("text", "markdown", "html", "json"), default="text")
+    p.add_argument("--output", "-o", metavar="FILE", help="输出文件（默认标准输出）")
+    p.set_defaults(func=_cmd_export)
+
+    p = sub.add_parser("batch", help="从标准输入逐行读取，输出 JSON Lines")
+    p.add_argument("--kind", choices=KINDS + ("search", "classify"), default="trigger")
+    p.add_argument("--limit", type=int, default=5, help="search / classify 时每行返回的结果数")
+    p.set_defaults(func=_cmd_batch)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.compact and not args.library:
+        parser.error("--compact 需要同时指定 --library")
+    if args.library:
+        from npd_library import use_library
+        try:
+            use_library(args.library, compact=args.compact)
+        except (OSError, ValueError, KeyError) as e:  # LibraryError 是 ValueError
+            raise SystemExit(f"npd: 无法加载库文件 {args.library}：{e}")
+    # 管道两端统一用 UTF-8（Windows 控制台/管道默认编码可能不是）
+    for stream in (sys.stdin, sys.stdout):
+        if hasattr(stream, "reconfigure"):
+            stream.reconfigure(encoding="utf-8")
+    out = sys.stdout
+    try:
+        if args.profile or args.profile_stats:
+            from npd_profile import profiling
+            with profiling(args.profile_stats):
+                args.func(args, out)
+        else:
+            args.func(args, out)
+        out.flush()
+    except BrokenPipeError:
+        # 下游（如 head）提前关闭了管道：把剩余输出导向空设备，安静退出
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
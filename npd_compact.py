@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+紧凑存储：给十万张以上卡片（及多语言变体）的大型自定义库用的列式注册表。
+
+普通的 PatternRegistry 为每张卡片、每个自定义键、每段文字都保留一个 Python 对象；
+CompactRegistry 则只保留：
+
+  - 一张共享字符串表（StringTable）：相同文字只存一份，UTF-8 连续存放，按编号取出时才解码；
+    同一批库的多个语言变体可以共用一张表；
+  - 整数编码的列（array('I')）：需求 / 触发 / 模式各自的名称、value、说明编号，
+    卡片的模式、核心需求、表现、疗愈提示编号，「触发 → 模式」与「需求 → 卡片」用
+    偏移 + 扁平数组（CSR）表示；装有 NumPy 时 columns(numpy=True) 给出零拷贝视图。
+
+它是 PatternRegistry 的子类，公开接口与返回值保持兼容：卡片仍是 PatternCard，
+内置枚举之内的键仍解码为枚举成员（身份比较照常成立），其余为 npd_library.LibraryKey；
+cards / triggers / needs / patterns 是按需解码的只读序列（支持 len、下标、切片、in）。
+代价是每次查询都要现场解码，最近用到的卡片有一个小缓存。
+
+    from npd_compact import CompactRegistry, compact_registry
+    set_registry(compact_registry(get_registry()))
+    npd_library.use_library("big.json", compact=True)   # 直接从 .npdlib 缓存解码为紧凑形式
+
+内存对比见 benchmarks/bench_memory.py。
+
+依赖：同目录下的 npd.py、npd_library.py；NumPy 可选。
+"""
+
+from array import array
+from collections.abc import Mapping as MappingABC, Sequence as SequenceABC
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from npd import (
+    BehaviorPattern,
+    CoreNeed,
+    PatternCard,
+    PatternRegistry,
+    TriggerType,
+)
+from npd_library import LibraryKey
+
+
+KINDS: Tuple[str, ...] = ("need", "trigger", "pattern")
+_ENUMS = {"need": CoreNeed, "trigger": TriggerType, "pattern": BehaviorPattern}
+_MEMBERS = {kind: {m.value: m for m in enum_cls} for kind, enum_cls in _ENUMS.items()}
+CARD_CACHE_SIZE = 4096  # 最近解码的卡片与键→编号的缓存上限
+
+
+# ---------------------------------------------------------------------------
+# 一、共享字符串表
+# ---------------------------------------------------------------------------
+
+class StringTable:
+    """
+    只追加的字符串表：intern() 返回编号，相同字符串得到同一编号；table[i] 解码出字符串。
+    去重索引只保存字符串的哈希，freeze() 后释放（再次 intern 时按需重建）。
+    """
+
+    __slots__ = ("_blob", "_offsets", "_index")
+
+    def __init__(self, blob: bytes = b"", offsets: Optional[Sequence[int]] = None):
+        self._blob = bytearray(blob)
+        self._offsets = array("I", offsets if offsets is not None else [0])
+        self._index: Optional[Dict[int, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        off = self._offsets
+        return self._blob[off[i]:off[i + 1]].decode("utf-8")
+
+    def intern(self, text: Optional[str]) -> int:
+        text = "" if text is None else str(text)
+        index = self._index
+        if index is None:
+            index = self._index = {}
+            for i in range(len(self)):
+                index.setdefault(hash(self[i]), []).append(i)
+        h = hash(text)
+        for i in index.get(h, ()):
+            if self[i] == text:
+                return i
+        i = len(self)
+        self._blob += text.encode("utf-8")
+        self._offsets.append(len(self._blob))
+        index.setdefault(h, []).append(i)
+        return i
+
+    def freeze(self) -> "StringTable":
+        """释放去重索引（只读使用时不再需要）。"""
+        self._index = None
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._blob) + self._offsets.itemsize * len(self._offsets)
+
+
+# ---------------------------------------------------------------------------
+# 二、按需解码的只读视图
+# ---------------------------------------------------------------------------
+
+class _LazySequence(SequenceABC):
+    """长度固定、按下标解码的只读序列。"""
+
+    __slots__ = ("_n", "_get", "_contains")
+
+    def __init__(self, n: int, get, contains=None):
+        self._n = n
+        self._get = get
+        self._contains = contains
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._get(j) for j in range(*i.indices(self._n)))
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return self._get(i)
+
+    def __iter__(self) -> Iterator:
+        get = self._get
+        for i in range(self._n):
+            yield get(i)
+
+    def __contains__(self, item) -> bool:
+        if self._contains is not None:
+            return self._contains(item)
+        return any(x == item for x in self)
+
+    def __repr__(self) -> str:
+        return f"<{len(self)} 项（按需解码）>"
+
+
+class _TriggerPatternsView(MappingABC):
+    """「触发 → 可能的行为模式」的只读映射视图。"""
+
+    __slots__ = ("_registry",)
+
+    def __init__(self, registry: "CompactRegistry"):
+        self._registry = registry
+
+    def __getitem__(self, trigger) -> Tuple[BehaviorPattern, ...]:
+        if self._registry._code("trigger", trigger) is None:
+            raise KeyError(trigger)
+        return self._registry.patterns_for_trigger(trigger)
+
+    def __iter__(self):
+        return iter(self._registry.triggers)
+
+    def __len__(self) -> int:
+        return len(self._registry.triggers)
+
+
+# ---------------------------------------------------------------------------
+# 三、紧凑注册表
+# ---------------------------------------------------------------------------
+
+def _u32(values: Iterable[int] = ()) -> array:
+    return array("I", values)
+
+
+def _csr(n_rows: int, pairs: Iterable[Tuple[int, int]]) -> Tuple[array, array]:
+    """把 (行, 值) 对整理为偏移 + 扁平数组，行内保持出现顺序。"""
+    rows: List[List[int]] = [[] for _ in range(n_rows)]
+    for r, v in pairs:
+        rows[r].append(v)
+    offsets = _u32([0])
+    flat = _u32()
+    for row in rows:
+        flat.extend(row)
+        offsets.append(len(flat))
+    return offsets, flat
+
+
+class CompactRegistry(PatternRegistry):
+    """
+    列式存储的注册表（见模块说明）。构造参数与 PatternRegistry 相同，另可传入共享的 strings；
+    语义也相同：触发与需求按说明的顺序排列、再补上只在映射/卡片里出现的，模式先列有卡片的。
+    """
+
+    __slots__ = (
+        "_strings", "_cols", "_trig_off", "_trig_pat", "_need_off", "_need_card", "_pat_card",
+        "_enum_codes", "_sorted", "_card_cache", "_need_keys", "_code_cache",
+    )
+
+    def __init__(
+        self,
+        cards: Iterable[PatternCard],
+        trigger_patterns: Mapping[TriggerType, Sequence[BehaviorPattern]],
+        trigger_descriptions: Optional[Mapping[TriggerType, str]] = None,
+        need_descriptions: Optional[Mapping[CoreNeed, str]] = None,
+        strings: Optional[StringTable] = None,
+    ):
+        cards = tuple(cards)
+        trigger_descriptions = dict(trigger_descriptions or {})
+        need_descriptions = dict(need_descriptions or {})
+        # 与 PatternRegistry 相同的排序规则
+        by_pattern = {c.pattern: c for c in cards}
+        triggers = list(dict.fromkeys([*trigger_descriptions, *trigger_patterns]))
+        needs = list(dict.fromkeys([*need_descriptions, *(c.serves_need for c in cards)]))
+        patterns = list(dict.fromkeys([*by_pattern, *(p for ps in trigger_patterns.values() for p in ps)]))
+
+        st = strings if strings is not None else StringTable()
+        need_code = {n: i for i, n in enumerate(needs)}
+        trigger_code = {t: i for i, t in enumerate(triggers)}
+        pattern_code = {p: i for i, p in enumerate(patterns)}
+        cols = {
+            "need_name": _u32(st.intern(n.name) for n in needs),
+            "need_value": _u32(st.intern(n.value) for n in needs),
+            "need_desc": _u32(st.intern(need_descriptions.get(n, "")) for n in needs),
+            "trigger_name": _u32(st.intern(t.name) for t in triggers),
+            "trigger_value": _u32(st.intern(t.value) for t in triggers),
+            "trigger_desc": _u32(st.intern(trigger_descriptions.get(t, "")) for t in triggers),
+            "pattern_name": _u32(st.intern(p.name) for p in patterns),
+            "pattern_value": _u32(st.intern(p.value) for p in patterns),
+            "card_pattern": _u32(pattern_code[c.pattern] for c in cards),
+            "card_need": _u32(need_code[c.serves_need] for c in cards),
+            "card_desc": _u32(st.intern(c.description) for c in cards),
+            "card_heal": _u32(st.intern(c.healing_note) for c in cards),
+        }
+        edges = [(trigger_code[t], pattern_code[p]) for t, ps in trigger_patterns.items() for p in ps]
+        self._init_columns(st.freeze() if strings is None else st, cols, edges)
+
+    @classmethod
+    def from_columns(cls, strings: StringTable, cols: Dict[str, array],
+                     edges: Iterable[Tuple[int, int]]) -> "CompactRegistry":
+        """
+        直接由列构建（npd_library 从 .npdlib 缓存解码时使用，不经过任何卡片对象）。
+        cols 的键见 columns()；edges 为 (触发编号, 模式编号)，按触发内顺序给出。
+        """
+        self = cls.__new__(cls)
+        self._init_columns(strings, cols, edges)
+        return self
+
+    def _init_columns(self, strings: StringTable, cols: Dict[str, array], edges: Iterable[Tuple[int, int]]) -> None:
+        self._strings = strings
+        self._cols = cols
+        n_trig = len(cols["trigger_value"])
+        n_need = len(cols["need_value"])
+        n_pat = len(cols["pattern_value"])
+        self._trig_off, self._trig_pat = _csr(n_trig, edges)
+        self._need_off, self._need_card = _csr(n_need, ((n, i) for i, n in enumerate(cols["card_need"])))
+        pat_card = array("i", [-1]) * n_pat
+        for i, p in enumerate(cols["card_pattern"]):
+            pat_card[p] = i  # 同一模式有多张卡片时取最后一张（与 PatternRegistry 一致）
+        self._pat_card = pat_card
+        # 内置枚举成员 ⇄ 编号（只有内置那几十个，放在字典里）
+        self._enum_codes: Dict[str, Dict[object, int]] = {}
+        for kind in KINDS:
+            values = cols[f"{kind}_value"]
+            members = _MEMBERS[kind]
+            codes: Dict[object, int] = {}
+            for i, sid in enumerate(values):
+                member = members.get(strings[sid])
+                if member is not None:
+                    codes.setdefault(member, i)
+            self._enum_codes[kind] = codes
+        self._sorted: Dict[Tuple[str, str], array] = {}
+        self._card_cache: Dict[int, PatternCard] = {}
+        self._code_cache: Dict[Tuple[str, object], int] = {}
+        self._need_keys: Tuple[object, ...] = ()  # 需求通常只有几个，全部解码常驻
+        self._need_keys = tuple(self._key("need", i) for i in range(n_need))
+
+    # -- 编号 ⇄ 键 --------------------------------------------------------
+
+    def _key(self, kind: str, code: int):
+        if kind == "need" and self._need_keys:
+            return self._need_keys[code]
+        strings, cols = self._strings, self._cols
+        value = strings[cols[f"{kind}_value"][code]]
+        member = _MEMBERS[kind].get(value)
+        if member is not None and self._enum_codes[kind].get(member) == code:
+            return member
+        return LibraryKey(kind, strings[cols[f"{kind}_name"][code]], value)
+
+    def _order(self, kind: str, field: str) -> array:
+        """按 name / value 排序的编号（首次查找时建立）。"""
+        order = self._sorted.get((kind, field))
+        if order is None:
+            col = self._cols[f"{kind}_{field}"]
+            strings = self._strings
+            order = self._sorted[(kind, field)] = _u32(sorted(range(len(col)), key=lambda i: strings[col[i]]))
+        return order
+
+    def _search(self, kind: str, field: str, text: str) -> Optional[int]:
+        order = self._order(kind, field)
+        col = self._cols[f"{kind}_{field}"]
+        strings = self._strings
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if strings[col[order[mid]]] < text:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and strings[col[order[lo]]] == text:
+            return order[lo]
+        return None
+
+    def _code(self, kind: str, key) -> Optional[int]:
+        code = self._enum_codes[kind].get(key) if isinstance(key, _ENUMS[kind]) else None
+        if code is not None:
+            return code
+        cached = self._code_cache.get((kind, key))
+        if cached is not None:
+            return cached
+        value = getattr(key, "value", None)
+        if not isinstance(value, str):
+            return None
+        code = self._search(kind, "value", value)
+        if code is None or self._key(kind, code) != key:
+            return None
+        if len(self._code_cache) >= CARD_CACHE_SIZE:
+            self._code_cache.clear()
+        self._code_cache[(kind, key)] = code
+        return code
+
+    def _card(self, i: int) -> PatternCard:
+        card = self._card_cache.get(i)
+        if card is None:
+            if len(self._card_cache) >= CARD_CACHE_SIZE:
+                self._card_cache.clear()
+            cols, strings = self._cols, self._strings
+            card = self._card_cache[i] = PatternCard(
+                self._key("pattern", cols["card_pattern"][i]),
+                self._key("need", cols["card_need"][i]),
+                strings[cols["card_desc"][i]],
+                strings[cols["card_heal"][i]],
+            )
+        return card
+
+    # -- 与 PatternRegistry 相同的查询接口 ---------------------------------
+
+    @property
+    def cards(self) -> Sequence[PatternCard]:
+        return _LazySequence(len(self._cols["card_pattern"]), self._card)
+
+    def _keys(self, kind: str) -> Sequence:
+        return _LazySequence(
+            len(self._cols[f"{kind}_value"]),
+            lambda i: self._key(kind, i),
+            lambda key: self._code(kind, key) is not None,
+        )
+
+    @property
+    def triggers(self) -> Sequence[TriggerType]:
+        return self._keys("trigger")
+
+    @property
+    def needs(self) -> Sequence[CoreNeed]:
+        return self._keys("need")
+
+    @property
+    def patterns(self) -> Sequence[BehaviorPattern]:
+        return self._keys("pattern")
+
+    @property
+    def trigger_patterns(self) -> Mapping[TriggerType, Tuple[BehaviorPattern, ...]]:
+        return _TriggerPatternsView(self)
+
+    def card_for_pattern(self, pattern: BehaviorPattern) -> Optional[PatternCard]:
+        code = self._code("pattern", pattern)
+        if code is None or self._pat_card[code] < 0:
+            return None
+        return self._card(self._pat_card[code])
+
+    def cards_for_need(self, need: CoreNeed) -> Tuple[PatternCard, ...]:
+        code = self._code("need", need)
+        if code is None:
+            return ()
+        flat = self._need_card
+        return tuple(self._card(flat[j]) for j in range(self._need_off[code], self._need_off[code + 1]))
+
+    def _pattern_codes(self, trigger) -> Sequence[int]:
+        code = self._code("trigger", trigger)
+        if code is None:
+            return ()
+        return self._trig_pat[self._trig_off[code]:self._trig_off[code + 1]]
+
+    def patterns_for_trigger(self, trigger: TriggerType) -> Tuple[BehaviorPattern, ...]:
+        return tuple(self._key("pattern", p) for p in self._pattern_codes(trigger))
+
+    def cards_for_trigger(self, trigger: TriggerType) -> Tuple[PatternCard, ...]:
+        pat_card = self._pat_card
+        return tuple(self._card(pat_card[p]) for p in self._pattern_codes(trigger) if pat_card[p] >= 0)
+
+    def with_cards(
+        self,
+        cards: Iterable[PatternCard],
+        trigger_patterns: Optional[Mapping[TriggerType, Sequence[BehaviorPattern]]] = None,
+        trigger_descriptions: Optional[Mapping[TriggerType, str]] = None,
+    ) -> "CompactRegistry":
+        """返回追加了新卡片的新紧凑注册表（与本表共用字符串表），本注册表不变。"""
+        merged: Dict[object, List[object]] = {t: list(self.patterns_for_trigger(t)) for t in self.triggers}
+        for t, ps in (trigger_patterns or {}).items():
+            row = merged.setdefault(t, [])
+            row.extend(p for p in ps if p not in row)
+        descriptions = {t: self.trigger_description(t) for t in self.triggers}
+        descriptions.update(trigger_descriptions or {})
+        return CompactRegistry(
+            (*self.cards, *cards),
+            merged,
+            descriptions,
+            {n: self.need_description(n) for n in self.needs},
+            strings=self._strings,
+        )
+
+    def lookup(self, kind: str, name_or_value: str):
+        if kind not in _ENUMS:
+            return None
+        code = self._search(kind, "value", name_or_value)
+        if code is None:
+            code = self._search(kind, "name", name_or_value)
+        return self._key(kind, code) if code is not None else None
+
+    def trigger_description(self, trigger: TriggerType) -> str:
+        code = self._code("trigger", trigger)
+        return self._strings[self._cols["trigger_desc"][code]] if code is not None else ""
+
+    def need_description(self, need: CoreNeed) -> str:
+        code = self._code("need", need)
+        return self._strings[self._cols["need_desc"][code]] if code is not None else ""
+
+    # -- 列与内存 ----------------------------------------------------------
+
+    @property
+    def strings(self) -> StringTable:
+        return self._strings
+
+    def columns(self, numpy: bool = False) -> Dict[str, object]:
+        """全部整数列（含 CSR 偏移与扁平数组）；numpy=True 时为共享内存的 uint32 / int32 视图。"""
+        cols: Dict[str, object] = dict(self._cols)
+        cols.update(trigger_offsets=self._trig_off, trigger_patterns=self._trig_pat,
+                    need_offsets=self._need_off, need_cards=self._need_card, pattern_card=self._pat_card)
+        if numpy:
+            import numpy as np
+            cols = {k: np.frombuffer(v, dtype=np.int32 if v.typecode == "i" else np.uint32) for k, v in cols.items()}
+        return cols
+
+    @property
+    def nbytes(self) -> int:
+        """列与字符串表占用的字节数（不含少量固定开销与卡片缓存）。"""
+        return self._strings.nbytes + sum(v.itemsize * len(v) for v in self.columns().values())
+
+
+def compact_registry(registry: PatternRegistry, strings: Optional[StringTable] = None) -> CompactRegistry:
+    """把任意注册表转换为紧凑形式（可传入共享的字符串表，例如同一库的其他语言版本）。"""
+    if isinstance(registry, CompactRegistry) and strings is None:
+        return registry
+    return CompactRegistry(
+        registry.cards,
+        registry.trigger_patterns,
+        {t: registry.trigger_description(t) for t in registry.triggers},
+        {n: registry.need_description(n) for n in registry.needs},
+        strings=strings,
+    )
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+我的防御策略：面对某个触发情境、某种行为模式时，可以用哪些具体做法保护自己。
+
+  - 策略目录（DefenseStrategy）：灰岩法、边界话术、记录与核对、不辩解、离场计划等，
+    每条策略标注它最适合应对的行为模式、触发情境与核心需求（权重 0～1）；
+  - 推荐：recommend(trigger, pattern) 返回按得分排序的策略；
+    得分 = 模式权重 + 0.5 × 触发权重（库中没有直接标注的自定义模式，按它服务的核心需求折半估计）；
+  - 预计算：StrategyTable 在构建时就把当前库里每一组（触发, 模式）以及单独的触发 / 模式
+    的排序结果算好，之后的查询只是查表——图形界面在每张卡片旁显示推荐时不会有可感知的延迟；
+    权重相同的键共用同一份排序结果。
+
+这些策略是自我保护的常见做法，不替代专业帮助；涉及人身安全时，请优先「安全优先」一条。
+
+依赖：同目录下的 npd.py。
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from npd import (
+    BehaviorPattern,
+    CoreNeed,
+    PatternRegistry,
+    TriggerType,
+    get_registry,
+)
+
+
+TRIGGER_FACTOR = 0.5   # 触发权重相对模式权重的折扣
+NEED_FACTOR = 0.5      # 自定义模式按核心需求估计时的折扣
+DEFAULT_LIMIT = 3
+PRECOMPUTE_LIMIT = 20000  # 模式数超过它的大库不逐对预计算，首次查询时再填表（排序结果仍共享）
+
+
+@dataclass(frozen=True)
+class DefenseStrategy:
+    """一条防御策略：名称、做法概述、具体步骤，以及适用的模式 / 触发 / 核心需求（权重）。"""
+    name: str
+    value: str
+    summary: str
+    steps: Tuple[str, ...]
+    patterns: Tuple[Tuple[BehaviorPattern, float], ...] = ()
+    triggers: Tuple[Tuple[TriggerType, float], ...] = ()
+    needs: Tuple[Tuple[CoreNeed, float], ...] = ()
+
+
+@dataclass(frozen=True)
+class RankedStrategy:
+    strategy: DefenseStrategy
+    score: float
+
+
+def _builtin_strategies() -> Tuple[DefenseStrategy, ...]:
+    """内置策略目录（只在构建推荐表时调用一次）。"""
+    P, T, N = BehaviorPattern, TriggerType, CoreNeed
+    return (
+        DefenseStrategy(
+            "安全优先", "safety_first",
+            "出现吼叫、摔东西、威胁或任何人身危险时，先离开现场，安全比讲清道理重要。",
+            ("提前记下一个可以随时联系的人和当地求助电话", "感到危险时不解释、直接离开", "事后再决定是否、如何沟通"),
+            patterns=((P.惩罚与虐待, 1.0),),
+            needs=((N.控制血包在身边, 0.3),),
+        ),
+        DefenseStrategy(
+            "灰岩法", "grey_rock",
+            "回应平淡、简短、没有情绪起伏，像一块灰色的石头——不给程序想要的供给。",
+            ("用「嗯」「知道了」「我再想想」回应", "不分享私事与感受", "挑衅时不接话，转去做自己的事"),
+            patterns=((P.贬低与挑剔, 0.8), (P.被动攻击, 0.7), (P.比较与嫉妒, 0.7), (P.三角化, 0.5), (P.扮演受害者, 0.5)),
+            triggers=((T.未被关注或忽视, 0.6), (T.孩子成就超过或脱离, 0.6), (T.孩子获得他人关注, 0.7)),
+            needs=((N.维护自恋与优越感, 0.6),),
+        ),
+        DefenseStrategy(
+            "边界话术", "boundary_script",
+            "事先写好一两句简短的话，冲突时像唱片一样平静重复，不追加解释。",
+            ("写下来：「这件事我自己决定。」「我现在不讨论这个。」", "对方升级时只重复同一句", "说完就执行（挂电话、离开房间）"),
+            patterns=((P.过度控制, 0.9), (P.道德绑架, 0.7), (P.否认感受, 0.5), (P.惩罚与虐待, 0.4)),
+            triggers=((T.设立边界, 1.0), (T.孩子独立或疏远, 0.7)),
+            needs=((N.控制血包在身边, 0.6),),
+        ),
+        DefenseStrategy(
+            "记录与核对", "documentation",
+            "把发生的事当天写下来（时间、原话、你的感受），必要时与可信的人核对，稳住「我的记忆是对的」。",
+            ("用事件日志或备忘录记下原话", "不与对方争论记忆，只核对自己的记录", "定期回看，识别重复出现的模式"),
+            patterns=((P.煤气灯, 1.0), (P.DARVO, 0.7), (P.否认感受, 0.7), (P.三角化, 0.4)),
+            triggers=((T.被质疑或要求负责, 0.8), (T.暴露缺点或失败, 0.7), (T.被批评或否定, 0.4)),
+            needs=((N.避免羞耻与暴露, 0.6),),
+        ),
+        DefenseStrategy(
+            "不辩解", "no_jade",
+            "不解释、不辩护、不争论、不过度说明——这些都会被当作继续拉扯的把手。",
+            ("只陈述一次自己的决定", "听到歪曲时说「我们记得不一样」然后停下", "不试图让对方承认"),
+            patterns=((P.DARVO, 0.9), (P.煤气灯, 0.6), (P.贬低与挑剔, 0.6), (P.道德绑架, 0.5)),
+            triggers=((T.被批评或否定, 0.8), (T.被质疑或要求负责, 0.8), (T.暴露缺点或失败, 0.5)),
+            needs=((N.避免羞耻与暴露, 0.5),),
+        ),
+        DefenseStrategy(
+            "离场计划", "exit_plan",
+            "见面或通话前先定好时长和离开的信号，到点或越界就按计划离开。",
+            ("事先定好：待多久、什么情况下离开", "准备好交通与落脚的地方", "离开时只说一句告别，不解释"),
+            patterns=((P.惩罚与虐待, 0.8), (P.过度控制, 0.6), (P.爱的撤回, 0.4)),
+            triggers=((T.孩子独立或疏远, 0.8), (T.设立边界, 0.6)),
+            needs=((N.控制血包在身边, 0.5),),
+        ),
+        DefenseStrategy(
+            "拒绝愧疚", "guilt_is_not_debt",
+            "提醒自己：被触发的愧疚不等于真的亏欠；照顾她的情绪不是你的责任。",
+            ("察觉愧疚感升起时先停一下再回应", "问自己：我答应是出于意愿还是恐惧？", "可以说「我理解你难过，但我的决定不变」"),
+            patterns=((P.道德绑架, 0.9), (P.扮演受害者, 0.8), (P.爱的撤回, 0.6)),
+            triggers=((T.孩子独立或疏远, 0.6), (T.未被关注或忽视, 0.5)),
+            needs=((N.控制血包在身边, 0.6),),
+        ),
+        DefenseStrategy(
+            "走出三角", "step_out_of_triangle",
+            "不当传话筒、不参与比较与站队，有事直接找当事人。",
+            ("「你可以直接跟他说」", "不转述第三方的评价", "与兄弟姐妹单独建立自己的关系"),
+            patterns=((P.三角化, 1.0), (P.比较与嫉妒, 0.5)),
+            triggers=((T.孩子获得他人关注, 0.5),),
+            needs=((N.维护自恋与优越感, 0.3),),
+        ),
+        DefenseStrategy(
+            "信息节食", "low_information",
+            "少分享成就、计划与私事，减少可被比较、贬低或控制的素材。",
+            ("好消息先和支持你的人分享", "被追问时给笼统的回答", "不在家庭群里发布个人动态"),
+            patterns=((P.比较与嫉妒, 0.8), (P.贬低与挑剔, 0.6), (P.过度控制, 0.5)),
+            triggers=((T.孩子成就超过或脱离, 0.9), (T.孩子获得他人关注, 0.8)),
+            needs=((N.维护自恋与优越感, 0.5),),
+        ),
+        DefenseStrategy(
+            "支持网络", "support_network",
+            "和可信的朋友、伴侣或心理咨询师保持联系，让外部的现实感帮你对抗孤立与否认。",
+            ("冲突后找一个人说一说发生了什么", "考虑寻找了解家庭创伤的咨询师", "参加同类经历者的互助小组"),
+            patterns=((P.爱的撤回, 0.8), (P.煤气灯, 0.6), (P.否认感受, 0.5), (P.扮演受害者, 0.4)),
+            triggers=((T.孩子独立或疏远, 0.5),),
+            needs=((N.控制血包在身边, 0.4), (N.避免羞耻与暴露, 0.4)),
+        ),
+        DefenseStrategy(
+            "命名程序", "name_the_program",
+            "在心里说出「这是××程序」——去个人化：这是她的内在程序被触发，不是你不够好。",
+            ("对照卡片认出当前的行为模式", "对自己说：「这是程序输出，不是对我的评价」", "把注意力带回自己的身体与呼吸"),
+            patterns=((P.否认感受, 0.6), (P.贬低与挑剔, 0.5), (P.被动攻击, 0.5), (P.扮演受害者, 0.4)),
+            needs=((N.维护自恋与优越感, 0.4), (N.控制血包在身边, 0.4), (N.避免羞耻与暴露, 0.4)),
+        ),
+    )
+
+
+# ---------------------------------------------------------------------------
+# 一、预计算的推荐表
+# ---------------------------------------------------------------------------
+
+class StrategyTable:
+    """
+    某个库的全部推荐结果：（触发, 模式）、（触发, None）、（None, 模式）→ 按得分排序的策略。
+    构建时一次算好；库中不存在的组合在首次查询时计算并记住。
+
+    每个触发 / 模式先折算成「对各条策略的权重向量」，向量相同的键共用同一个编号，
+    排序结果按（触发向量, 模式向量）编号缓存——自定义库里成千上万个只靠核心需求估计的模式
+    只对应少数几种向量，十万张卡片的库也只需排序几十次。
+    模式数超过 PRECOMPUTE_LIMIT 时不逐对预填（省下几十万个表项的内存与构建时间），
+    查询时按需填表，代价是两次字典查找。
+    """
+
+    def __init__(self, registry: PatternRegistry, strategies: Optional[Iterable[DefenseStrategy]] = None):
+        self.registry = registry
+        self.strategies: Tuple[DefenseStrategy, ...] = tuple(
+            _builtin_strategies() if strategies is None else strategies)
+        self._by_value = {s.value: s for s in self.strategies}
+        self._pattern_weights = [dict(s.patterns) for s in self.strategies]
+        self._trigger_weights = [dict(s.triggers) for s in self.strategies]
+        self._need_weights = [dict(s.needs) for s in self.strategies]
+        self._vectors: List[Tuple[float, ...]] = [(0.0,) * len(self.strategies)]  # 编号 0：不参与
+        self._vector_ids: Dict[Tuple[float, ...], int] = {self._vectors[0]: 0}
+        self._trigger_vid: Dict[object, int] = {None: 0}
+        self._pattern_vid: Dict[object, int] = {None: 0}
+        self._need_vid: Dict[object, int] = {}
+        self._ranked: Dict[Tuple[int, int], Tuple[RankedStrategy, ...]] = {}
+        self._table: Dict[Tuple[object, object], Tuple[RankedStrategy, ...]] = {}
+
+        if len(registry.patterns) > PRECOMPUTE_LIMIT:
+            return
+        table, rank_ids = self._table, self._rank_ids
+        pattern_vid = self._pattern_vector_id
+        for pattern in registry.patterns:
+            table[(None, pattern)] = rank_ids(0, pattern_vid(pattern))
+        for trigger, patterns in registry.trigger_patterns.items():
+            tid = self._trigger_vector_id(trigger)
+            table[(trigger, None)] = rank_ids(tid, 0)
+            for pattern in patterns:
+                table[(trigger, pattern)] = rank_ids(tid, pattern_vid(pattern))
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def _vector_id(self, vector: Tuple[float, ...]) -> int:
+        vid = self._vector_ids.get(vector)
+        if vid is None:
+            vid = self._vector_ids[vector] = len(self._vectors)
+            self._vectors.append(vector)
+        return vid
+
+    def _trigger_vector_id(self, trigger) -> int:
+        vid = self._trigger_vid.get(trigger)
+        if vid is None:
+            vid = self._trigger_vid[trigger] = self._vector_id(
+                tuple(w.get(trigger, 0.0) * TRIGGER_FACTOR for w in self._trigger_weights))
+        return vid
+
+    def _pattern_vector_id(self, pattern) -> int:
+        vid = self._pattern_vid.get(pattern)
+        if vid is not None:
+            return vid
+        if any(pattern in w for w in self._pattern_weights):
+            vid = self._vector_id(tuple(w.get(pattern, 0.0) for w in self._pattern_weights))
+        else:
+            # 目录里没有直接标注的模式（自定义库）：按它服务的核心需求折半估计
+            card = self.registry.card_for_pattern(pattern)
+            need = card.serves_need if card is not None else None
+            vid = self._need_vid.get(need)
+            if vid is None:
+                vid = self._need_vid[need] = self._vector_id(
+                    tuple(w.get(need, 0.0) * NEED_FACTOR for w in self._need_weights))
+        self._pattern_vid[pattern] = vid
+        return vid
+
+    def _rank_ids(self, tid: int, pid: int) -> Tuple[RankedStrategy, ...]:
+        key = (tid, pid)
+        ranked = self._ranked.get(key)
+        if ranked is None:
+            scores = [t + p for t, p in zip(self._vectors[tid], self._vectors[pid])]
+            order = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+            ranked = self._ranked[key] = tuple(
+                RankedStrategy(self.strategies[i], round(scores[i], 4)) for i in order)  # 同分保持目录顺序
+        return ranked
+
+    def get(self, trigger=None, pattern=None) -> Tuple[RankedStrategy, ...]:
+        key = (trigger, pattern)
+        ranked = self._table.get(key)
+        if ranked is None:
+            ranked = self._table[key] = self._rank_ids(
+                self._trigger_vector_id(trigger), self._pattern_vector_id(pattern))
+        return ranked
+
+    def recommend_for_situation(
+        self,
+        triggers: Iterable[object] = (),
+        patterns: Iterable[object] = (),
+        limit: Optional[int] = DEFAULT_LIMIT,
+    ) -> Tuple[RankedStrategy, ...]:
+        """多个触发、多个模式同时出现时：各单项得分相加后排序。"""
+        totals: Dict[str, float] = {}
+        for ranked in [*(self.get(t, None) for t in triggers), *(self.get(None, p) for p in patterns)]:
+            for r in ranked:
+                totals[r.strategy.value] = totals.get(r.strategy.value, 0.0) + r.score
+        order = sorted(totals.items(), key=lambda kv: -kv[1])
+        return tuple(RankedStrategy(self._by_value[v], round(s, 4)) for v, s in order[:limit])
+
+    def strategy(self, name_or_value: str) -> Optional[DefenseStrategy]:
+        found = self._by_value.get(name_or_value)
+        return found or next((s for s in self.strategies if s.name == name_or_value), None)
+
+
+_table: Optional[StrategyTable] = None
+
+
+def get_strategy_table() -> StrategyTable:
+    """当前库对应的推荐表（库被替换后重建）。"""
+    global _table
+    registry = get_registry()
+    if _table is None or _table.registry is not registry:
+        _table = StrategyTable(registry)
+    return _table
+
+
+def get_strategies() -> Tuple[DefenseStrategy, ...]:
+    """全部策略（目录顺序）。"""
+    return get_strategy_table().strategies
+
+
+def recommend(trigger=None, pattern=None, limit: Optional[int] = DEFAULT_LIMIT) -> Tuple[RankedStrategy, ...]:
+    """某触发下、面对某行为模式时（两者都可省略其一）按得分排序的策略。"""
+    return get_strategy_table().get(trigger, pattern)[:limit]
+
+
+def format_strategies(ranked: Iterable[RankedStrategy]) -> List[str]:
+    """推荐结果的可读文本（每条策略一行概述）。"""
+    return [f"· {r.strategy.name}：{r.strategy.summary}" for r in ranked]
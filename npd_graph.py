@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+"""
+模型图：把「触发 → 行为模式 → 核心需求 → 自恋供给」连成一张有向图，预先算好邻接与传递闭包，
+回答跨越多跳的问题——哪些触发最终都在喂「控制血包在身边」、两个触发共有哪些模式、
+最少记住哪几个触发就能覆盖全部行为模式——并导出 DOT / GraphML 供 Graphviz、Gephi、yEd 查看。
+
+  - 边：触发 → 模式（触发映射）、模式 → 需求（卡片的 serves_need）、
+    需求 → 一级供给（崇拜；程序的每条需求都靠供给维持）、供给 → 下一级供给（get_escalation_path 的升级顺序）；
+  - 编号：节点按 供给、需求、模式、触发 的顺序编号，边总是从大编号指向小编号；
+    每个节点的后代集合是一个整数位掩码（第 j 位 = 节点 j），祖先集合同样是位掩码但按编号倒序记位——
+    两个方向的掩码都只有「实际可能出现的那一段」那么长；
+  - 闭包：节点数不超过 EAGER_NODES 时构建时全部算好，更大的库按需计算并缓存；
+    之后的可达、共有、喂给哪些需求等查询都只是一两次整数位运算；
+  - 最小覆盖：集合覆盖是 NP 难问题——先去掉被其他触发完全包含的触发、选定唯一能覆盖某模式的触发，
+    以贪心解为上界做分支定界；搜索超过 COVER_BUDGET 个节点时返回目前最好的解并标明不一定最小。
+
+    graph = get_graph()
+    graph.ancestors(CoreNeed.控制血包在身边, "trigger")
+    graph.shared_patterns(TriggerType.设立边界, TriggerType.被批评或否定)
+    graph.min_trigger_cover().triggers
+    write_graph("model.dot")
+
+命令行：python npd_graph.py feeds 控制血包在身边
+        python npd_graph.py shared 设立边界 被批评或否定
+        python npd_graph.py cover [-p 过度控制 -p DARVO]
+        python npd_graph.py export model.graphml [--library my_lib.json]
+
+依赖：同目录下的 npd.py；--library 用到 npd_library.py。
+"""
+
+import argparse
+import heapq
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from npd import PatternRegistry, SupplyType, get_escalation_path, get_registry
+
+
+KINDS = ("supply", "need", "pattern", "trigger")   # 编号顺序：边总是从后面的类指向前面的类
+EAGER_NODES = 30000   # 节点数不超过它时构建时算好全部闭包（更大的库按需计算）
+COVER_BUDGET = 200000  # 最小覆盖分支定界最多展开的搜索节点数
+
+_KIND_LABELS = {"supply": "自恋供给", "need": "核心需求", "pattern": "行为模式", "trigger": "触发"}
+_RELATIONS = {("trigger", "pattern"): "激活", ("pattern", "need"): "服务于",
+              ("need", "supply"): "索取", ("supply", "supply"): "升级为"}
+_DOT_SHAPES = {"supply": "diamond", "need": "hexagon", "pattern": "ellipse", "trigger": "box"}
+
+_popcount = getattr(int, "bit_count", None) or (lambda m: bin(m).count("1"))
+
+
+def _bits(mask: int) -> List[int]:
+    """位掩码里为 1 的位（从低到高）。"""
+    if mask.bit_length() <= 256:
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(low.bit_length() - 1)
+            mask ^= low
+        return out
+    # 长掩码逐位剥离每次都要复制整个整数；转成二进制串一次扫完是线性的
+    text = bin(mask)
+    top = len(text) - 1
+    out = []
+    i = text.find("1", 2)
+    while i != -1:
+        out.append(top - i)
+        i = text.find("1", i + 1)
+    out.reverse()
+    return out
+
+
+@dataclass(frozen=True)
+class Cover:
+    """最小触发覆盖：选出的触发、没有任何触发能覆盖的模式，以及是否已证明最小。"""
+    triggers: Tuple[Any, ...]
+    uncovered: Tuple[Any, ...]
+    exact: bool
+
+
+class ModelGraph:
+    """某个注册表的模型图（只读；库被替换后由 get_graph() 重建）。"""
+
+    def __init__(self, registry: PatternRegistry):
+        self.registry = registry
+        escalation = get_escalation_path(True)
+        supplies = tuple(reversed(escalation))  # 倒序编号：一级供给编号最大，升级边同样从大编号指向小编号
+        groups = {"supply": supplies, "need": registry.needs, "pattern": registry.patterns,
+                  "trigger": registry.triggers}
+        self.nodes: Tuple[Any, ...] = tuple(k for kind in KINDS for k in groups[kind])
+        self._ranges: Dict[str, range] = {}
+        start = 0
+        for kind in KINDS:
+            self._ranges[kind] = range(start, start + len(groups[kind]))
+            start += len(groups[kind])
+        n = len(self.nodes)
+        self._index: Dict[int, int] = {id(k): i for i, k in enumerate(self.nodes)}  # 键在注册表内唯一，按 id 查
+        self._by_key: Dict[Any, int] = {}
+
+        # 邻接（一跳）：后继用正序位，前驱用倒序位（第 n-1-j 位 = 节点 j）
+        self._succ: List[int] = [0] * n
+        self._pred: List[int] = [0] * n
+
+        def link(a: int, b: int) -> None:
+            self._succ[a] |= 1 << b
+            self._pred[b] |= 1 << (n - 1 - a)
+
+        index = self._index
+        for t, ps in registry.trigger_patterns.items():
+            ti = index.get(id(t))
+            for p in ps:
+                pi = index.get(id(p))
+                if ti is not None and pi is not None:
+                    link(ti, pi)
+        for card in registry.cards:
+            pi, ni = index.get(id(card.pattern)), index.get(id(card.serves_need))
+            if pi is not None and ni is not None:
+                link(pi, ni)
+        first_supply = self._ranges["supply"].stop - 1
+        for ni in self._ranges["need"]:
+            link(ni, first_supply)
+        for a in reversed(self._ranges["supply"][1:]):
+            link(a, a - 1)
+
+        # 传递闭包（不含自身），None 表示尚未计算
+        self._down: List[Optional[int]] = [None] * n
+        self._up: List[Optional[int]] = [None] * n
+        self._covers: Dict[int, Cover] = {}
+        self._kind_masks: Dict[Tuple[str, bool], int] = {}
+        if n <= EAGER_NODES:
+            for i in range(n):           # 后继编号更小：正序计算时它们的闭包已经就绪
+                self._descendant_mask(i)
+            for i in reversed(range(n)):
+                self._ancestor_mask(i)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, key: Any) -> bool:
+        return self._node(key, required=False) is not None
+
+    # -- 节点与掩码 ----------------------------------------------------------
+
+    def _node(self, key: Any, required: bool = True) -> Optional[int]:
+        i = self._index.get(id(key))
+        if i is None:
+            if not self._by_key:
+                self._by_key = {k: j for j, k in enumerate(self.nodes)}
+            i = self._by_key.get(key)
+        if i is None and required:
+            raise KeyError(f"图中没有该节点：{key!r}")
+        return i
+
+    def kind(self, key: Any) -> str:
+        i = self._node(key)
+        return next(kind for kind, r in self._ranges.items() if i in r)
+
+    def find(self, text: str, kinds: Sequence[str] = ("trigger", "pattern", "need", "supply")) -> Optional[Any]:
+        """按名称或 value 找节点（按 kinds 的顺序依次尝试）。"""
+        for kind in kinds:
+            if kind == "supply":
+                for s in self.nodes_of("supply"):
+                    if text in (s.name, s.value):
+                        return s
+            else:
+                key = self.registry.lookup(kind, text)
+                if key is not None:
+                    return key
+        return None
+
+    def nodes_of(self, kind: str) -> Tuple[Any, ...]:
+        """某一类的全部节点，按库中顺序（供给按升级顺序）。"""
+        r = self._ranges[kind]
+        keys = self.nodes[r.start:r.stop]
+        return keys[::-1] if kind == "supply" else keys
+
+    def _descendant_mask(self, i: int) -> int:
+        mask = self._down[i]
+        if mask is None:
+            mask = self._succ[i]
+            for j in _bits(self._succ[i]):
+                mask |= self._descendant_mask(j)
+            self._down[i] = mask
+        return mask
+
+    def _ancestor_mask(self, i: int) -> int:
+        mask = self._up[i]
+        if mask is None:
+            n = len(self.nodes)
+            mask = self._pred[i]
+            for r in _bits(self._pred[i]):
+                mask |= self._ancestor_mask(n - 1 - r)
+            self._up[i] = mask
+        return mask
+
+    def _kind_mask(self, kind: Optional[str], reverse: bool = False) -> int:
+        if kind is None:
+            return -1
+        mask = self._kind_masks.get((kind, reverse))
+        if mask is None:
+            r = self._ranges[kind]
+            start = len(self.nodes) - r.stop if reverse else r.start
+            mask = self._kind_masks[kind, reverse] = ((1 << len(r)) - 1) << start
+        return mask
+
+    def _keys(self, mask: int, reverse: bool = False) -> Tuple[Any, ...]:
+        if not reverse:
+            return tuple(self.nodes[j] for j in _bits(mask))
+        n = len(self.nodes)
+        return tuple(self.nodes[n - 1 - r] for r in reversed(_bits(mask)))
+
+    # -- 查询 ----------------------------------------------------------------
+
+    def successors(self, key: Any) -> Tuple[Any, ...]:
+        return self._keys(self._succ[self._node(key)])
+
+    def predecessors(self, key: Any) -> Tuple[Any, ...]:
+        return self._keys(self._pred[self._node(key)], reverse=True)
+
+    def descendants(self, key: Any, kind: Optional[str] = None) -> Tuple[Any, ...]:
+        """key 沿边最终能到达的节点（可只取某一类），按编号顺序。"""
+        return self._keys(self._descendant_mask(self._node(key)) & self._kind_mask(kind))
+
+    def ancestors(self, key: Any, kind: Optional[str] = None) -> Tuple[Any, ...]:
+        """最终会走到 key 的节点，如 ancestors(CoreNeed.控制血包在身边, "trigger")。"""
+        return self._keys(self._ancestor_mask(self._node(key)) & self._kind_mask(kind, reverse=True), reverse=True)
+
+    def reaches(self, source: Any, target: Any) -> bool:
+        """source 是否（经一跳或多跳）通向 target。"""
+        return bool(self._descendant_mask(self._node(source)) >> self._node(target) & 1)
+
+    def triggers_feeding(self, target: Any) -> Tuple[Any, ...]:
+        """最终喂给某核心需求 / 供给（或导向某行为模式）的全部触发。"""
+        return self.ancestors(target, "trigger")
+
+    def shared_patterns(self, *triggers: Any) -> Tuple[Any, ...]:
+        """这些触发都可能激活的行为模式。"""
+        if not triggers:
+            return ()
+        mask = self._kind_mask("pattern")
+        for t in triggers:
+            mask &= self._descendant_mask(self._node(t))
+        return self._keys(mask)
+
+    def shared_needs(self, *keys: Any) -> Tuple[Any, ...]:
+        """这些触发 / 行为模式最终都服务的核心需求。"""
+        mask = self._kind_mask("need") if keys else 0
+        for k in keys:
+            mask &= self._descendant_mask(self._node(k))
+        return self._keys(mask)
+
+    def min_trigger_cover(self, patterns: Optional[Iterable[Any]] = None, budget: int = COVER_BUDGET) -> Cover:
+        """
+        覆盖 patterns（默认为全部行为模式）所需的最少触发。结果按目标缓存；
+        超出搜索预算时 exact 为 False（仍是一个可行的覆盖，通常已是最小或只多一两个）。
+        """
+        if patterns is None:
+            target = self._kind_mask("pattern")
+        else:
+            target = 0
+            for p in patterns:
+                target |= 1 << self._node(p)
+        cached = self._covers.get(target)
+        if cached is None:
+            cached = self._covers[target] = self._solve_cover(target, budget)
+        return cached
+
+    def _solve_cover(self, target: int, budget: int) -> Cover:
+        sets: Dict[int, int] = {}
+        for ti in self._ranges["trigger"]:
+            m = self._descendant_mask(ti) & target
+            if m:
+                sets[ti] = m
+        reachable = 0
+        for m in sets.values():
+            reachable |= m
+        uncovered = self._keys(target & ~reachable)
+
+        # 去掉被别的触发完全包含的触发（两个相同时留编号小的，即库中靠前的）：
+        # 包含 t 的触发必然也有 t 的最低位，只需和登记了这一位的触发比
+        order = sorted(sets, key=lambda t: (-_popcount(sets[t]), t))
+        kept: List[int] = []
+        holders: Dict[int, List[int]] = {}
+        for t in order:
+            low = sets[t] & -sets[t]
+            if any((sets[t] & ~sets[k]) == 0 for k in holders.get(low, ())):
+                continue
+            kept.append(t)
+            for bit in _bits(sets[t]):
+                holders.setdefault(1 << bit, []).append(t)
+        # 只有一个触发能覆盖的模式：那个触发必选
+        owners: Dict[int, int] = {}
+        for t in kept:
+            for bit in _bits(sets[t]):
+                owners[bit] = t if bit not in owners else -1
+        chosen: List[int] = []
+        remaining = reachable
+        for t in owners.values():
+            if t >= 0 and sets[t] & remaining:
+                chosen.append(t)
+                remaining &= ~sets[t]
+        candidates = [t for t in kept if t not in chosen and sets[t] & remaining]
+
+        # 贪心上界（惰性：覆盖数只减不增，堆顶重算后仍不小于次大者即可直接选）
+        best = list(chosen)
+        left = remaining
+        heap = [(-_popcount(sets[t] & left), t) for t in candidates]
+        heapq.heapify(heap)
+        while left:
+            _, t = heapq.heappop(heap)
+            gain = _popcount(sets[t] & left)
+            if not gain:
+                continue
+            if heap and gain < -heap[0][0]:
+                heapq.heappush(heap, (-gain, t))
+                continue
+            best.append(t)
+            left &= ~sets[t]
+
+        widest = max((_popcount(sets[t]) for t in candidates), default=1)
+        expanded = 0
+        exact = True
+
+        def search(left: int, picked: List[int]) -> None:
+            nonlocal best, expanded, exact
+            if not left:
+                if len(picked) < len(best):
+                    best = list(picked)
+                return
+            if len(picked) + -(-_popcount(left) // widest) >= len(best):
+                return  # 下界：剩余模式数 / 单个触发最多覆盖数
+            expanded += 1
+            if expanded > budget:
+                exact = False
+                return
+            low = left & -left  # 任取一个未覆盖的模式，必有一个触发覆盖它：只在这些触发间分支
+            options = [t for t in candidates if sets[t] & low]
+            options.sort(key=lambda t: -_popcount(sets[t] & left))
+            for t in options:
+                picked.append(t)
+                search(left & ~sets[t], picked)
+                picked.pop()
+                if not exact:
+                    return
+
+        search(remaining, list(chosen))
+        triggers = tuple(self.nodes[t] for t in sorted(best))  # 触发的编号顺序即库中顺序
+        return Cover(triggers, uncovered, exact)
+
+    # -- 遍历 ----------------------------------------------------------------
+
+    def edges(self) -> Iterator[Tuple[Any, Any, str]]:
+        """全部边：(起点, 终点, 关系)。按起点的库中顺序：触发、模式、需求、供给。"""
+        kind_of = {i: kind for kind, r in self._ranges.items() for i in r}
+        for kind in reversed(KINDS):
+            for i in self._ranges[kind]:
+                for j in _bits(self._succ[i]):
+                    yield self.nodes[i], self.nodes[j], _RELATIONS[kind, kind_of[j]]
+
+    def _labeled_nodes(self) -> Iterator[Tuple[str, str, Any]]:
+        """(节点 id, 类别, 键)，id 形如 trigger:boundary。按 触发、模式、需求、供给 的顺序。"""
+        for kind in reversed(KINDS):
+            for key in self.nodes_of(kind):
+                yield f"{kind}:{key.value}", kind, key
+
+
+_graph: Optional[ModelGraph] = None
+
+
+def get_graph() -> ModelGraph:
+    """返回当前注册表的模型图（首次调用或库被替换后构建）。"""
+    global _graph
+    registry = get_registry()
+    if _graph is None or _graph.registry is not registry:
+        _graph = ModelGraph(registry)
+    return _graph
+
+
+# ---------------------------------------------------------------------------
+# 导出
+# ---------------------------------------------------------------------------
+
+def _dot_quote(text: Any) -> str:
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def write_dot(out: TextIO, graph: Optional[ModelGraph] = None) -> None:
+    """写 Graphviz DOT：四类节点各占一列（rank=same），从左到右为 触发 → 模式 → 需求 → 供给。"""
+    graph = graph or get_graph()
+    ids = {id(key): node_id for node_id, _, key in graph._labeled_nodes()}
+    out.write("digraph npd {\n  rankdir=LR;\n  node [fontname=\"Microsoft YaHei\"];\n")
+    for kind in reversed(KINDS):
+        out.write(f"  subgraph {_dot_quote('cluster_' + kind)} {{\n    label={_dot_quote(_KIND_LABELS[kind])};\n"
+                  f"    rank=same;\n    node [shape={_DOT_SHAPES[kind]}];\n")
+        for key in graph.nodes_of(kind):
+            out.write(f"    {_dot_quote(ids[id(key)])} [label={_dot_quote(key.name)}];\n")
+        out.write("  }\n")
+    for a, b, relation in graph.edges():
+        attrs = f" [label={_dot_quote(relation)}, style=dashed]" if relation == _RELATIONS["supply", "supply"] else ""
+        out.write(f"  {_dot_quote(ids[id(a)])} -> {_dot_quote(ids[id(b)])}{attrs};\n")
+    out.write("}\n")
+
+
+def graphml_tree(graph: Optional[ModelGraph] = None) -> ET.ElementTree:
+    """GraphML 文档：节点带 kind / name / value（供给另带 level），边带 relation。"""
+    graph = graph or get_graph()
+    root = ET.Element("graphml", xmlns="http://graphml.graphdrawing.org/xmlns")
+    for key_id, target, name in (("d0", "node", "kind"), ("d1", "node", "name"), ("d2", "node", "value"),
+                                 ("d3", "node", "level"), ("d4", "edge", "relation")):
+        ET.SubElement(root, "key", {"id": key_id, "for": target, "attr.name": name,
+                                    "attr.type": "int" if name == "level" else "string"})
+    g = ET.SubElement(root, "graph", id="npd", edgedefault="directed")
+    ids = {}
+    levels = {s: i for i, s in enumerate(graph.nodes_of("supply"), 1)}
+    for node_id, kind, key in graph._labeled_nodes():
+        ids[id(key)] = node_id
+        node = ET.SubElement(g, "node", id=node_id)
+        for key_id, value in (("d0", kind), ("d1", key.name), ("d2", key.value)):
+            ET.SubElement(node, "data", key=key_id).text = str(value)
+        if isinstance(key, SupplyType):
+            ET.SubElement(node, "data", key="d3").text = str(levels[key])
+    for n, (a, b, relation) in enumerate(graph.edges()):
+        edge = ET.SubElement(g, "edge", id=f"e{n}", source=ids[id(a)], target=ids[id(b)])
+        ET.SubElement(edge, "data", key="d4").text = relation
+    return ET.ElementTree(root)
+
+
+def write_graph(path: str, fmt: Optional[str] = None, graph: Optional[ModelGraph] = None) -> None:
+    """按扩展名（.dot / .gv / .graphml）或 fmt（"dot" / "graphml"）把模型图写入文件。"""
+    fmt = fmt or ("graphml" if path.lower().endswith(".graphml") else "dot")
+    if fmt == "graphml":
+        tree = graphml_tree(graph)
+        ET.indent(tree)
+        tree.write(path, encoding="utf-8", xml_declaration=True)
+    elif fmt == "dot":
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            write_dot(f, graph)
+    else:
+        raise ValueError(f"不支持的格式：{fmt!r}（dot 或 graphml）")
+
+
+# ---------------------------------------------------------------------------
+# 命令行
+# ---------------------------------------------------------------------------
+
+def _names(keys: Iterable[Any]) -> str:
+    return "、".join(k.name for k in keys) or "（无）"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="npd_graph", description="模型图：多跳查询与 DOT / GraphML 导出")
+    parser.add_argument("--library", metavar="PATH", help="使用自定义库文件（JSON / TOML）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("feeds", help="最终喂给某核心需求 / 供给（或导向某行为模式）的触发")
+    p.add_argument("target")
+    p = sub.add_parser("shared", help="几个触发共有的行为模式与核心需求")
+    p.add_argument("triggers", nargs="+")
+    p = sub.add_parser("cover", help="覆盖全部（或指定）行为模式所需的最少触发")
+    p.add_argument("--pattern", "-p", action="append", default=[], help="只覆盖这些模式（可重复）")
+    p = sub.add_parser("export", help="导出为 .dot / .graphml")
+    p.add_argument("output")
+    p.add_argument("--format", choices=("dot", "graphml"), help="默认按扩展名")
+    args = parser.parse_args(argv)
+
+    if args.library:
+        from npd_library import use_library
+        try:
+            use_library(args.library)
+        except (OSError, ValueError, KeyError) as e:
+            raise SystemExit(f"npd_graph: 无法加载库文件 {args.library}：{e}")
+    graph = get_graph()
+
+    def resolve(text: str, kinds: Sequence[str]) -> Any:
+        key = graph.find(text, kinds)
+        if key is None:
+            raise SystemExit(f"npd_graph: 找不到：{text}")
+        return key
+
+    if args.command == "feeds":
+        target = resolve(args.target, ("need", "supply", "pattern"))
+        print(f"最终喂给「{target.name}」的触发：{_names(graph.triggers_feeding(target))}")
+    elif args.command == "shared":
+        triggers = [resolve(t, ("trigger",)) for t in args.triggers]
+        print(f"共有的行为模式：{_names(graph.shared_patterns(*triggers))}")
+        print(f"共同服务的核心需求：{_names(graph.shared_needs(*triggers))}")
+    elif args.command == "cover":
+        patterns = [resolve(p, ("pattern",)) for p in args.pattern] or None
+        cover = graph.min_trigger_cover(patterns)
+        print(f"{len(cover.triggers)} 个触发即可覆盖{'（已证明最少）' if cover.exact else '（搜索预算用尽，不一定最少）'}："
+              f"{_names(cover.triggers)}")
+        if cover.uncovered:
+            print(f"没有触发会激活的模式：{_names(cover.uncovered)}")
+    else:
+        write_graph(args.output, args.format, graph)
+        print(f"已写入 {args.output}（{len(graph)} 个节点，{sum(1 for _ in graph.edges())} 条边）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
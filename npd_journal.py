@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+事件日志：把「程序」真实发生的时刻记下来——什么时候、踩中了哪些触发、观察到哪些行为模式、
+升级到了哪一级、备注。记录本身就是对抗煤气灯的方法：「我的记忆是对的」有据可查。
+
+  - 存储：只追加的 JSON Lines 文件，一行一个事件，追加是 O(1)；
+  - 读取：iter_incidents() 是生成器，逐行读取，从不把整个文件读进内存；
+  - 汇总：按触发 / 模式 / 核心需求 / 升级层级的计数随追加实时更新，
+    并落盘到旁边的 .agg.json（记录已统计到的字节偏移）。重新打开时只补读偏移之后新增的行，
+    汇总查询永远不需要重扫整个日志。
+  - 按日志学习「接下来可能出现哪个模式」的在线预测见 npd_predict.py；
+  - 需要按时间窗提问（最近 90 天、按月、按周）时，可改用 npd_store.py 的 SQLite 事件库。
+
+依赖：同目录下的 npd.py。
+"""
+
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from npd import (
+    BehaviorPattern,
+    CoreNeed,
+    EscalationLevel,
+    PatternRegistry,
+    TriggerType,
+    get_registry,
+)
+
+
+AGGREGATE_SUFFIX = ".agg.json"
+_AGGREGATE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Incident:
+    """一次事件：时间、触发（可多个）、观察到的行为模式、升级层级、备注。"""
+    timestamp: datetime
+    triggers: Tuple[TriggerType, ...] = ()
+    patterns: Tuple[BehaviorPattern, ...] = ()
+    stage: Optional[EscalationLevel] = None
+    note: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "ts": self.timestamp.isoformat(timespec="seconds"),
+                "triggers": [t.value for t in self.triggers],
+                "patterns": [p.value for p in self.patterns],
+                "stage": self.stage.value if self.stage is not None else None,
+                "note": self.note,
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, line: str, registry: Optional[PatternRegistry] = None) -> "Incident":
+        """从一行 JSON 还原；触发/模式按 value 在当前库中解析，库里没有的会被跳过。"""
+        registry = registry or get_registry()
+        d = json.loads(line)
+        stage = d.get("stage")
+        return cls(
+            timestamp=datetime.fromisoformat(d["ts"]),
+            triggers=tuple(k for k in (registry.lookup("trigger", v) for v in d.get("triggers", ())) if k),
+            patterns=tuple(k for k in (registry.lookup("pattern", v) for v in d.get("patterns", ())) if k),
+            stage=EscalationLevel(stage) if stage is not None else None,
+            note=d.get("note", ""),
+        )
+
+
+def new_incident(
+    triggers: Iterable[TriggerType] = (),
+    patterns: Iterable[BehaviorPattern] = (),
+    stage: Optional[EscalationLevel] = None,
+    note: str = "",
+    timestamp: Optional[datetime] = None,
+) -> Incident:
+    """以当前时间（或给定时间）创建一条事件。"""
+    return Incident(timestamp or datetime.now().replace(microsecond=0), tuple(triggers), tuple(patterns), stage, note)
+
+
+def iter_incidents(
+    path: str,
+    start: int = 0,
+    registry: Optional[PatternRegistry] = None,
+) -> Iterator[Incident]:
+    """从字节偏移 start 开始逐行读取事件（生成器）。空行、写了一半的末行与解析不了的行会被跳过。"""
+    for _, incident in iter_incident_offsets(path, start, registry):
+        yield incident
+
+
+def iter_incident_offsets(
+    path: str,
+    start: int = 0,
+    registry: Optional[PatternRegistry] = None,
+) -> Iterator[Tuple[int, Incident]]:
+    """
+    同 iter_incidents，同时给出读完该行后的字节偏移（增量汇总记下它，下次从这里补读）。
+    解析不了的行（崩溃留下的半行又被接上了新记录等）跳过，偏移照样越过它。
+    """
+    registry = registry or get_registry()
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # 另一个进程正写到一半的行，下次再读
+            offset += len(raw)
+            try:
+                line = raw.decode("utf-8").strip()
+                incident = Incident.from_json(line, registry) if line else None
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            if incident is not None:
+                yield offset, incident
+
+
+@dataclass
+class JournalStats:
+    """事件日志的累计统计（键为 value 字符串，跨库稳定）。"""
+    count: int = 0
+    first: Optional[str] = None
+    last: Optional[str] = None
+    triggers: Counter = field(default_factory=Counter)
+    patterns: Counter = field(default_factory=Counter)
+    needs: Counter = field(default_factory=Counter)
+    stages: Counter = field(default_factory=Counter)
+
+    def add(self, incident: Incident, registry: PatternRegistry) -> None:
+        ts = incident.timestamp.isoformat(timespec="seconds")
+        self.count += 1
+        if self.first is None or ts < self.first:
+            self.first = ts
+        if self.last is None or ts > self.last:
+            self.last = ts
+        self.triggers.update(t.value for t in incident.triggers)
+        self.patterns.update(p.value for p in incident.patterns)
+        # 同一事件里服务同一需求的多个模式只计一次
+        self.needs.update({
+            card.serves_need.value
+            for card in (registry.card_for_pattern(p) for p in incident.patterns)
+            if card is not None
+        })
+        if incident.stage is not None:
+            self.stages[str(incident.stage.value)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "first": self.first,
+            "last": self.last,
+            "triggers": dict(self.triggers),
+            "patterns": dict(self.patterns),
+            "needs": dict(self.needs),
+            "stages": dict(self.stages),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "JournalStats":
+        return cls(
+            d["count"], d.get("first"), d.get("last"),
+            Counter(d.get("triggers", {})), Counter(d.get("patterns", {})),
+            Counter(d.get("needs", {})), Counter(d.get("stages", {})),
+        )
+
+
+class IncidentJournal:
+    """
+    只追加的事件日志。用法：
+
+        with IncidentJournal("journal.jsonl") as journal:
+            journal.append(new_incident([TriggerType.设立边界], [BehaviorPattern.道德绑架], EscalationLevel.二级_恐惧))
+            journal.pattern_counts()
+    """
+
+    def __init__(self, path: str, registry: Optional[PatternRegistry] = None):
+        self.path = path
+        self.registry = registry or get_registry()
+        self._aggregate_path = path + AGGREGATE_SUFFIX
+        self._stats, self._offset = self._load_aggregates()
+        self._file = open(path, "ab")
+        self._seal_torn_tail()
+        self._catch_up()
+
+    # -- 汇总的落盘与补读 --------------------------------------------------
+
+    def _load_aggregates(self) -> Tuple[JournalStats, int]:
+        try:
+            with open(self._aggregate_path, encoding="utf-8") as f:
+                d = json.load(f)
+            if d.get("version") == _AGGREGATE_VERSION and d["offset"] <= os.path.getsize(self.path):
+                return JournalStats.from_dict(d["stats"]), d["offset"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return JournalStats(), 0  # 没有或不可信的汇总：从头流式重建
+
+    def _seal_torn_tail(self) -> None:
+        """
+        上次写到一半就崩溃时文件不以换行结尾：先补一个换行，让那半行自成一行（读取时作为坏行跳过），
+        否则接着追加的记录会和它粘成一行。补换行而不是截掉，不丢任何已写入的字节。
+        """
+        size = self._file.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+        self._file.write(b"\n")
+        self._file.flush()
+
+    def _catch_up(self) -> None:
+        """补读上次汇总之后（例如被其他程序）追加的行。"""
+        if not os.path.exists(self.path):
+            return
+        for offset, incident in iter_incident_offsets(self.path, self._offset, self.registry):
+            self._stats.add(incident, self.registry)
+            self._offset = offset
+
+    def checkpoint(self) -> None:
+        """把当前汇总与已统计到的偏移写入 .agg.json（原子替换）。"""
+        self._file.flush()
+        tmp = self._aggregate_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _AGGREGATE_VERSION, "offset": self._offset, "stats": self._stats.to_dict()},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self._aggregate_path)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.checkpoint()
+            self._file.close()
+
+    def __enter__(self) -> "IncidentJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- 写入与读取 --------------------------------------------------------
+
+    def append(self, incident: Incident) -> None:
+        """追加一条事件并更新汇总（O(1)，不读已有内容）。"""
+        data = (incident.to_json() + "\n").encode("utf-8")
+        self._file.write(data)
+        self._file.flush()
+        self._offset += len(data)
+        self._stats.add(incident, self.registry)
+
+    def __iter__(self) -> Iterator[Incident]:
+        self._file.flush()
+        return iter_incidents(self.path, 0, self.registry)
+
+    def __len__(self) -> int:
+        return self._stats.count
+
+    # -- 汇总查询（只读内存中的计数） --------------------------------------
+
+    @property
+    def stats(self) -> JournalStats:
+        return self._stats
+
+    def _resolve(self, kind: str, counts: Counter) -> Dict[Any, int]:
+        return {self.registry.lookup(kind, v) or v: n for v, n in counts.most_common()}
+
+    def trigger_counts(self) -> Dict[TriggerType, int]:
+        return self._resolve("trigger", self._stats.triggers)
+
+    def pattern_counts(self) -> Dict[BehaviorPattern, int]:
+        return self._resolve("pattern", self._stats.patterns)
+
+    def need_counts(self) -> Dict[CoreNeed, int]:
+        return self._resolve("need", self._stats.needs)
+
+    def stage_counts(self) -> Dict[EscalationLevel, int]:
+        return {EscalationLevel(int(v)): n for v, n in self._stats.stages.most_common()}
@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+外部模式库：从 JSON / TOML 文件读取（临床工作者编写的）卡片、触发与需求，编译为带版本号的二进制缓存。
+
+  - 源文件默认「继承」内置库（extends = "builtin"），同 value 的条目覆盖内置条目，新 value 的条目追加；
+  - 首次加载时把合并后的完整库编译为二进制缓存（默认与源文件同目录、扩展名 .npdlib）；
+  - 之后启动直接内存映射（mmap）缓存文件解码，源文件与内置数据的内容哈希不变就不重建。
+
+库文件格式（JSON；TOML 用 [[needs]] / [[triggers]] / [[patterns]] 表数组，字段相同）：
+
+    {
+      "extends": "builtin",
+      "needs":    [{"name": "维护自恋与优越感", "value": "maintain_narcissism", "description": "..."}],
+      "triggers": [{"name": "设立边界", "value": "boundary", "description": "...",
+                    "patterns": ["moral_blackmail", "惩罚与虐待"]}],
+      "patterns": [{"name": "道德绑架", "value": "moral_blackmail", "serves_need": "control_supply",
+                    "description": "...", "healing_note": "..."}]
+    }
+
+引用（patterns 列表、serves_need）既可以写 value 也可以写 name。value 与内置枚举相同的条目
+解码为对应的枚举成员；其余解码为 LibraryKey，同样具有 name 与 value 属性。
+
+依赖：同目录下的 npd.py；TOML 需要 Python 3.11+ 的标准库 tomllib。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from npd import (
+    BehaviorPattern,
+    CoreNeed,
+    PatternCard,
+    PatternRegistry,
+    TriggerType,
+    build_builtin_registry,
+    get_registry,
+    set_registry,
+)
+
+
+FORMAT_VERSION = 1
+CACHE_SUFFIX = ".npdlib"
+
+_MAGIC = b"NPDLIB\0\0"
+# magic, 格式版本, 保留, 内容哈希, 字符串数, 需求数, 触发数, 模式数, 卡片数, 触发→模式边数
+_HEADER = struct.Struct("<8sHH32sIIIIII")
+
+
+class LibraryError(ValueError):
+    """库文件内容不合法（缺字段、引用不存在的模式或需求等）。"""
+
+
+@dataclass(frozen=True)
+class LibraryKey:
+    """自定义库中新增的触发 / 模式 / 需求（内置枚举之外），与枚举成员一样有 name 与 value。"""
+    kind: str
+    name: str
+    value: str
+
+
+# ---------------------------------------------------------------------------
+# 一、注册表 ⇄ 字典（库文件的统一中间形式）
+# ---------------------------------------------------------------------------
+
+def registry_to_dict(registry: Optional[PatternRegistry] = None) -> Dict[str, Any]:
+    """把注册表导出为库文件格式的字典（不继承内置库，内容自包含）。"""
+    registry = registry or get_registry()
+    return {
+        "extends": None,
+        "needs": [
+            {"name": n.name, "value": n.value, "description": registry.need_description(n)}
+            for n in registry.needs
+        ],
+        "triggers": [
+            {
+                "name": t.name,
+                "value": t.value,
+                "description": registry.trigger_description(t),
+                "patterns": [p.value for p in registry.patterns_for_trigger(t)],
+            }
+            for t in registry.triggers
+        ],
+        "patterns": [
+            {
+                "name": c.pattern.name,
+                "value": c.pattern.value,
+                "serves_need": c.serves_need.value,
+                "description": c.description,
+                "healing_note": c.healing_note,
+            }
+            for c in registry.cards
+        ],
+    }
+
+
+def dump_library(path: str, registry: Optional[PatternRegistry] = None) -> None:
+    """把注册表（默认当前库）写成 JSON 库文件，可作为编写自定义库的模板。"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(registry_to_dict(registry), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+@lru_cache(maxsize=1)
+def _builtin_library() -> Tuple[Dict[str, Any], bytes]:
+    """内置库的字典形式及其内容哈希（内置数据变化时所有缓存随之失效）。"""
+    data = registry_to_dict(build_builtin_registry())
+    digest = hashlib.sha256(json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")).digest()
+    return data, digest
+
+
+def builtin_digest() -> bytes:
+    """内置数据的内容哈希：派生缓存（如扩展包合成的库）的哈希应包含它，内置数据变化时随之失效。"""
+    return _builtin_library()[1]
+
+
+def _parse_source(raw: bytes, path: str) -> Dict[str, Any]:
+    if path.lower().endswith(".toml"):
+        try:
+            import tomllib  # 导入要好几毫秒，只在真有 TOML 库时导入
+        except ImportError:
+            raise LibraryError("读取 TOML 库需要 Python 3.11+（标准库 tomllib）") from None
+        try:
+            return tomllib.loads(raw.decode("utf-8"))
+        except (UnicodeDecodeError, tomllib.TOMLDecodeError) as e:
+            raise LibraryError(f"{path}: TOML 解析失败：{e}") from e
+    try:
+        return json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise LibraryError(f"{path}: JSON 解析失败：{e}") from e
+
+
+def _merge_section(table: Dict[str, Dict[str, Any]], entries: Any, section: str) -> None:
+    """按 value 合并（没写 value 时按 name 找已有条目）：已有的条目逐字段覆盖，新的条目追加。"""
+    if not isinstance(entries, list):
+        raise LibraryError(f"{section} 必须是列表")
+    by_name = {e["name"]: v for v, e in table.items()}
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("name"):
+            raise LibraryError(f"{section}[{i}] 缺少 name")
+        value = str(entry.get("value") or by_name.get(entry["name"]) or entry["name"])
+        merged = dict(table.get(value, {}))
+        merged.update(entry)
+        merged["value"] = value
+        table[value] = merged
+        by_name[merged["name"]] = value
+
+
+def _resolve_library(source: Dict[str, Any]) -> Dict[str, Any]:
+    """把源文件（可能继承内置库）展开为完整、引用已解析为 value 的库字典。"""
+    if not isinstance(source, dict):
+        raise LibraryError("库文件顶层必须是对象/表")
+    extends = source.get("extends", "builtin")
+    if extends not in (None, "builtin"):
+        raise LibraryError(f"不支持的 extends：{extends!r}（只能是 \"builtin\" 或省略为 null）")
+    tables: Dict[str, Dict[str, Dict[str, Any]]] = {"needs": {}, "triggers": {}, "patterns": {}}
+    if extends == "builtin":
+        base, _ = _builtin_library()
+        for section in tables:
+            _merge_section(tables[section], base[section], section)
+    for section in tables:
+        _merge_section(tables[section], source.get(section, []), section)
+
+    def resolver(section: str):
+        by_name = {e["name"]: v for v, e in tables[section].items()}
+
+        def resolve(ref: Any, where: str) -> str:
+            ref = str(ref)
+            if ref in tables[section]:
+                return ref
+            if ref in by_name:
+                return by_name[ref]
+            raise LibraryError(f"{where} 引用了不存在的 {section[:-1]}：{ref!r}")
+        return resolve
+
+    resolve_need = resolver("needs")
+    resolve_pattern = resolver("patterns")
+    for value, p in tables["patterns"].items():
+        if "serves_need" not in p:
+            raise LibraryError(f"模式 {p['name']!r} 缺少 serves_need")
+        p["serves_need"] = resolve_need(p["serves_need"], f"模式 {p['name']!r}")
+    for value, t in tables["triggers"].items():
+        t["patterns"] = [resolve_pattern(r, f"触发 {t['name']!r}") for r in t.get("patterns", [])]
+    return {section: list(table.values()) for section, table in tables.items()}
+
+
+# ---------------------------------------------------------------------------
+# 二、二进制缓存：编译与（内存映射）解码
+# ---------------------------------------------------------------------------
+
+def _compile(library: Dict[str, Any], digest: bytes) -> bytes:
+    """
+    布局（全部小端）：头部 | 字符串偏移表 | 需求表 | 触发表 | 模式表 | 卡片表 | 边表（均为 u32）| UTF-8 字符串区。
+    相同的字符串只存一份。
+    """
+    strings: Dict[str, int] = {}
+
+    def s(text: Any) -> int:
+        text = "" if text is None else str(text)
+        idx = strings.get(text)
+        if idx is None:
+            idx = strings[text] = len(strings)
+        return idx
+
+    need_ord = {n["value"]: i for i, n in enumerate(library["needs"])}
+    pattern_ord = {p["value"]: i for i, p in enumerate(library["patterns"])}
+    needs: List[int] = []
+    for n in library["needs"]:
+        needs += (s(n["name"]), s(n["value"]), s(n.get("description")))
+    triggers: List[int] = []
+    edges: List[int] = []
+    for t in library["triggers"]:
+        triggers += (s(t["name"]), s(t["value"]), s(t.get("description")), len(edges), len(t["patterns"]))
+        edges += (pattern_ord[v] for v in t["patterns"])
+    patterns: List[int] = []
+    cards: List[int] = []
+    for i, p in enumerate(library["patterns"]):
+        patterns += (s(p["name"]), s(p["value"]))
+        cards += (i, need_ord[p["serves_need"]], s(p.get("description")), s(p.get("healing_note")))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    ints = array("I", offsets + needs + triggers + patterns + cards + edges)
+    if sys.byteorder != "little":
+        ints.byteswap()
+    header = _HEADER.pack(
+        _MAGIC, FORMAT_VERSION, 0, digest,
+        len(encoded), len(library["needs"]), len(library["triggers"]),
+        len(library["patterns"]), len(library["patterns"]), len(edges),
+    )
+    return header + ints.tobytes() + b"".join(encoded)
+
+
+_ENUMS_BY_VALUE = {
+    kind: {m.value: m for m in enum_cls}
+    for kind, enum_cls in (("need", CoreNeed), ("trigger", TriggerType), ("pattern", BehaviorPattern))
+}
+
+
+def _key(kind: str, name: str, value: str):
+    member = _ENUMS_BY_VALUE[kind].get(value)
+    return member if member is not None else LibraryKey(kind, name, value)
+
+
+def _decode(buf: memoryview, digest: Optional[bytes] = None) -> Optional[PatternRegistry]:
+    """从缓存字节解码出注册表；魔数、版本或内容哈希不符时返回 None。"""
+    if len(buf) < _HEADER.size:
+        return None
+    magic, version, _, stored, n_str, n_need, n_trig, n_pat, n_card, n_edge = _HEADER.unpack_from(buf)
+    if magic != _MAGIC or version != FORMAT_VERSION or (digest is not None and stored != digest):
+        return None
+    n_ints = (n_str + 1) + 3 * n_need + 5 * n_trig + 2 * n_pat + 4 * n_card + n_edge
+    ints_end = _HEADER.size + 4 * n_ints
+    if len(buf) < ints_end:
+        return None
+    raw_ints = buf[_HEADER.size:ints_end]
+    blob = buf[ints_end:]
+    if sys.byteorder == "little":
+        # 直接在映射内存上按 u32 解释，一次性转成 int 列表（比逐项访问视图快得多）
+        with raw_ints.cast("I") as view:
+            ints = view.tolist()
+    else:
+        ints = array("I", raw_ints.tobytes())
+        ints.byteswap()
+    try:
+        strings = [str(blob[ints[i]:ints[i + 1]], "utf-8") for i in range(n_str)]
+        pos = n_str + 1
+
+        needs = []
+        need_desc = {}
+        for _ in range(n_need):
+            name, value, desc = strings[ints[pos]], strings[ints[pos + 1]], strings[ints[pos + 2]]
+            need = _key("need", name, value)
+            needs.append(need)
+            need_desc[need] = desc
+            pos += 3
+        trigger_pos = pos
+        pos += 5 * n_trig
+        patterns = []
+        for _ in range(n_pat):
+            patterns.append(_key("pattern", strings[ints[pos]], strings[ints[pos + 1]]))
+            pos += 2
+        cards = []
+        for _ in range(n_card):
+            cards.append(PatternCard(
+                patterns[ints[pos]], needs[ints[pos + 1]], strings[ints[pos + 2]], strings[ints[pos + 3]],
+            ))
+            pos += 4
+        edge_pos = pos
+        trigger_patterns = {}
+        trigger_desc = {}
+        for i in range(trigger_pos, trigger_pos + 5 * n_trig, 5):
+            trigger = _key("trigger", strings[ints[i]], strings[ints[i + 1]])
+            trigger_desc[trigger] = strings[ints[i + 2]]
+            start = edge_pos + ints[i + 3]
+            trigger_patterns[trigger] = [patterns[ints[j]] for j in range(start, start + ints[i + 4])]
+    except (IndexError, UnicodeDecodeError):
+        return None
+    finally:
+        # 必须先释放指向映射内存的视图，mmap 才能关闭
+        raw_ints.release()
+        blob.release()
+    return PatternRegistry(cards, trigger_patterns, trigger_desc, need_desc)
+
+
+def _decode_compact(buf: memoryview, digest: Optional[bytes] = None) -> Optional[PatternRegistry]:
+    """同 _decode，但直接把各表切成整数列、字符串区原样作为字符串表（见 npd_compact），不创建卡片对象。"""
+    from npd_compact import CompactRegistry, StringTable
+
+    if len(buf) < _HEADER.size:
+        return None
+    magic, version, _, stored, n_str, n_need, n_trig, n_pat, n_card, n_edge = _HEADER.unpack_from(buf)
+    if magic != _MAGIC or version != FORMAT_VERSION or (digest is not None and stored != digest):
+        return None
+    n_ints = (n_str + 1) + 3 * n_need + 5 * n_trig + 2 * n_pat + 4 * n_card + n_edge
+    ints_end = _HEADER.size + 4 * n_ints
+    if len(buf) < ints_end:
+        return None
+    ints = array("I", buf[_HEADER.size:ints_end].tobytes())
+    if sys.byteorder != "little":
+        ints.byteswap()
+    blob = bytes(buf[ints_end:])
+    if ints[n_str] != len(blob):
+        return None
+
+    pos = n_str + 1
+    cols = {}
+
+    def take(names: Tuple[str, ...], n: int) -> None:
+        nonlocal pos
+        width = len(names)
+        for j, name in enumerate(names):
+            cols[name] = ints[pos + j:pos + width * n:width]
+        pos += width * n
+
+    take(("need_name", "need_value", "need_desc"), n_need)
+    take(("trigger_name", "trigger_value", "trigger_desc", "edge_start", "edge_count"), n_trig)
+    take(("pattern_name", "pattern_value"), n_pat)
+    take(("card_pattern", "card_need", "card_desc", "card_heal"), n_card)
+    targets = ints[pos:pos + n_edge]
+    starts, counts = cols.pop("edge_start"), cols.pop("edge_count")
+    edges = ((t, targets[j]) for t in range(n_trig) for j in range(starts[t], starts[t] + counts[t]))
+    return CompactRegistry.from_columns(StringTable(blob, ints[:n_str + 1]), cols, edges)
+
+
+def _read_cache(cache_path: str, digest: bytes, decode=_decode) -> Optional[PatternRegistry]:
+    try:
+        with open(cache_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as buf:
+                return decode(buf, digest)
+    except (OSError, ValueError):
+        return None  # 缓存不存在、为空或无法映射：重新编译
+
+
+def _write_cache(cache_path: str, data: bytes) -> None:
+    tmp = cache_path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass  # 目录不可写时只是没有缓存，不影响本次加载
+
+
+# ---------------------------------------------------------------------------
+# 三、对外接口
+# ---------------------------------------------------------------------------
+
+def read_library_source(path: str) -> Dict[str, Any]:
+    """读取并解析库文件（JSON / TOML），返回未展开继承、未解析引用的源字典。"""
+    with open(path, "rb") as f:
+        return _parse_source(f.read(), path)
+
+
+def default_cache_path(path: str) -> str:
+    return os.path.splitext(path)[0] + CACHE_SUFFIX
+
+
+def load_library(path: str, cache_path: Optional[str] = None, use_cache: bool = True,
+                 compact: bool = False) -> PatternRegistry:
+    """
+    读取库文件并返回注册表（不改变当前使用的库）。
+    缓存的内容哈希与「源文件 + 内置数据」一致时直接映射缓存；否则重新编译并写回缓存。
+    compact=True 时返回列式存储的 npd_compact.CompactRegistry（十万张以上卡片的大库用）。
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw + _builtin_library()[1]).digest()
+    return load_library_source(lambda: _parse_source(raw, path), digest,
+                               cache_path or default_cache_path(path) if use_cache else None, compact)
+
+
+def load_library_source(
+    build: Callable[[], Dict[str, Any]],
+    digest: bytes,
+    cache_path: Optional[str] = None,
+    compact: bool = False,
+    reuse: bool = True,
+) -> PatternRegistry:
+    """
+    由库文件格式的字典得到注册表，带二进制缓存：cache_path 处缓存的内容哈希等于 digest（32 字节）时
+    直接映射缓存，build() 根本不会被调用；否则调用 build() 取得源字典、编译并写回缓存。
+    reuse=False 时忽略已有缓存（调用方知道源已变而 digest 未变时用）。供 npd_plugins 等非文件来源使用。
+    """
+    decode = _decode_compact if compact else _decode
+    if cache_path and reuse:
+        registry = _read_cache(cache_path, digest, decode)
+        if registry is not None:
+            return registry
+    data = _compile(_resolve_library(build()), digest)
+    if cache_path:
+        _write_cache(cache_path, data)
+    registry = decode(memoryview(data), digest)
+    assert registry is not None
+    return registry
+
+
+def use_library(path: Optional[str], cache_path: Optional[str] = None, compact: bool = False) -> PatternRegistry:
+    """加载库文件并设为当前使用的库；path 为 None 时恢复内置默认库。"""
+    registry = load_library(path, cache_path, compact=compact) if path else None
+    set_registry(registry)
+    return get_registry()
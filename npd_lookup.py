@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+名称快速过滤：图形界面左侧搜索框背后的索引——边输入边筛选触发与行为模式。
+
+  - 可匹配的字段：中文名（「控制」→ 过度控制）、value（criticism、gaslighting）、
+    拼音首字母（gdkz → 过度控制）；大小写与空格不敏感，任一字段包含输入即算匹配；
+  - 索引：构建时把每个条目各字段的单字与相邻两字（n = 1, 2）登记进倒排表，
+    查询时取输入里最稀有的那个片段的倒排表作为候选，再逐个核对子串——
+    只触及可能命中的条目，上万条目时每次按键也远不到一帧；
+  - 增量：输入是上一次输入的延长（继续打字）时，直接在上一次的结果里核对；
+  - 排序：名称完全相同 → 某字段以输入开头 → 其余包含；同级按库中顺序（触发在前）；
+  - 拼音首字母：装有 pypinyin 时用它；否则按 GB2312 一级汉字（按拼音排序）的编码区间推算，
+    二级汉字与生僻字没有首字母，只能用中文名或 value 匹配。
+
+依赖：同目录下的 npd.py；pypinyin 可选。
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from npd import PatternRegistry, TriggerType, get_registry
+
+
+MAX_RESULTS = 500  # 界面列表最多显示的条数（总匹配数另行返回）
+_SEP = "\0"
+
+# GB2312 一级汉字按拼音排序：各声母首字的编码（高字节 × 256 + 低字节）
+_GB2312_STARTS = (
+    0xB0A1, 0xB0C5, 0xB2C1, 0xB4EE, 0xB6EA, 0xB7A2, 0xB8C1, 0xB9FE, 0xBBF7, 0xBFA6, 0xC0AC, 0xC2E8,
+    0xC4C3, 0xC5B6, 0xC5BE, 0xC6DA, 0xC8BB, 0xC8F6, 0xCBFA, 0xCDDA, 0xCEF4, 0xD1B9, 0xD4D1,
+)
+_GB2312_LETTERS = "abcdefghjklmnopqrstwxyz"
+_GB2312_END = 0xD7FA  # 一级汉字之后（二级汉字按部首排序，不能推算）
+
+_pypinyin: Any = False  # False：尚未尝试导入；None：未安装
+
+
+def _load_pypinyin() -> Any:
+    """按需导入 pypinyin（只尝试一次）。"""
+    global _pypinyin
+    if _pypinyin is False:
+        try:
+            import pypinyin
+        except ImportError:
+            pypinyin = None
+        _pypinyin = pypinyin
+    return _pypinyin
+
+
+def _initial(ch: str) -> str:
+    """单个字符的拼音首字母（小写）；字母数字原样（小写）；推算不出时返回空串。"""
+    if ch.isascii():
+        return ch.lower() if ch.isalnum() else ""
+    try:
+        raw = ch.encode("gb2312")
+    except UnicodeEncodeError:
+        return ""
+    if len(raw) != 2:
+        return ""
+    code = raw[0] << 8 | raw[1]
+    if code < _GB2312_STARTS[0] or code >= _GB2312_END:
+        return ""
+    return _GB2312_LETTERS[bisect_right(_GB2312_STARTS, code) - 1]
+
+
+def pinyin_initials(text: str) -> str:
+    """文字的拼音首字母串，如「过度控制」→ gdkz、「DARVO」→ darvo。"""
+    pypinyin = _load_pypinyin()
+    if pypinyin is not None:
+        letters = pypinyin.lazy_pinyin(text, style=pypinyin.Style.FIRST_LETTER, errors=lambda s: list(s))
+        return "".join(c.lower() for c in "".join(letters) if c.isascii() and c.isalnum())
+    return "".join(_initial(ch) for ch in text)
+
+
+def normalize(query: str) -> str:
+    """查询的规范形式：去掉空白、转小写。"""
+    return "".join(query.split()).lower()
+
+
+@dataclass(frozen=True)
+class LookupEntry:
+    """一个可过滤的条目。trigger 为跳转用的触发：触发条目就是它自己，模式条目为第一个包含它的触发。"""
+    kind: str
+    key: Any
+    trigger: Optional[TriggerType]
+
+
+class LookupIndex:
+    """当前库中触发与行为模式的过滤索引（只读；库被替换后由 get_lookup_index() 重建）。"""
+
+    def __init__(self, registry: PatternRegistry):
+        self.registry = registry
+        trigger_of: Dict[int, TriggerType] = {}
+        for t in registry.triggers:
+            for p in registry.patterns_for_trigger(t):
+                trigger_of.setdefault(id(p), t)  # 键对象在注册表内唯一，按 id 查比哈希自定义键快
+        self.entries: List[LookupEntry] = [LookupEntry("trigger", t, t) for t in registry.triggers]
+        self.entries.extend(LookupEntry("pattern", p, trigger_of.get(id(p))) for p in registry.patterns)
+
+        # 每个条目的字段以 \0 连成一个串：核对「包含」「以输入开头」各只需一次字符串操作
+        self._joined: List[str] = []
+        self._grams: Dict[str, List[int]] = {}
+        grams = self._grams
+        for i, entry in enumerate(self.entries):
+            fields = (normalize(entry.key.name), normalize(entry.key.value), pinyin_initials(entry.key.name))
+            self._joined.append(_SEP.join(fields))
+            seen = set()
+            for f in fields:
+                seen.update(f)
+                seen.update(f[j:j + 2] for j in range(len(f) - 1))
+            for g in seen:
+                posting = grams.get(g)
+                if posting is None:
+                    grams[g] = [i]
+                else:
+                    posting.append(i)  # 按条目顺序登记，倒排表天然有序
+        self._last_query = ""
+        self._last_ids: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _matches(self, q: str) -> List[int]:
+        joined = self._joined
+        if self._last_ids is not None and self._last_query and q.startswith(self._last_query):
+            return [i for i in self._last_ids if q in joined[i]]  # 继续打字：结果只会变少
+        if len(q) <= 2:
+            return self._grams.get(q, [])  # 单字、两字的倒排表就是精确结果，无需核对
+        grams = [q[j:j + 2] for j in range(len(q) - 1)]
+        best: Optional[List[int]] = None
+        for g in grams:
+            posting = self._grams.get(g)
+            if posting is None:
+                return []
+            if best is None or len(posting) < len(best):
+                best = posting
+        return [i for i in best or () if q in joined[i]]
+
+    def filter(self, query: str, limit: Optional[int] = MAX_RESULTS) -> Tuple[List[LookupEntry], int]:
+        """返回（排好序的前 limit 个匹配条目, 匹配总数）。查询为空时返回全部触发。"""
+        q = normalize(query)
+        if not q:
+            self._last_query, self._last_ids = "", None
+            triggers = [e for e in self.entries if e.kind == "trigger"]
+            return triggers[:limit], len(triggers)
+        ids = self._matches(q)
+        self._last_query, self._last_ids = q, ids
+
+        joined = self._joined
+        head, sep_q = q + _SEP, _SEP + q
+        exact = [i for i in ids if joined[i].startswith(head)]
+        prefix = [i for i in ids if (joined[i].startswith(q) or sep_q in joined[i]) and not joined[i].startswith(head)]
+        ordered = exact + prefix
+        if limit is None or len(ordered) < limit:
+            ranked = set(ordered)
+            ordered.extend(i for i in ids if i not in ranked)
+        if limit is not None:
+            ordered = ordered[:limit]
+        entries = self.entries
+        return [entries[i] for i in ordered], len(ids)
+
+
+_index: Optional[LookupIndex] = None
+
+
+def get_lookup_index() -> LookupIndex:
+    """返回当前注册表的过滤索引（首次调用或库被替换后构建）。"""
+    global _index
+    registry = get_registry()
+    if _index is None or _index.registry is not registry:
+        _index = LookupIndex(registry)
+    return _index
+
+
+def lookup(query: str, limit: Optional[int] = MAX_RESULTS) -> List[LookupEntry]:
+    """按中文名、value 或拼音首字母过滤当前库的触发与行为模式。"""
+    return get_lookup_index().filter(query, limit)[0]
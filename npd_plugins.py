@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+扩展包：以独立发行包安装的第三方模式库（显性 NPD 包、纵容型父母包、手足三角化包等），
+通过包的入口点（entry point）被发现，其需求、触发、行为模式与触发→模式映射并入内置库。
+
+编写扩展包：在发行包的 pyproject.toml 里声明入口点，指向一个库文件格式的字典
+（格式同 npd_library.py；也可以是返回该字典的函数，或相对模块目录的 JSON / TOML 文件路径）：
+
+    [project.entry-points."npd.packs"]
+    sibling = "npd_sibling_pack:LIBRARY"
+
+  - 合并：各包按入口点名称顺序叠加在内置库上；同 value（或同 name）的条目逐字段覆盖，
+    新条目追加；已有触发的 patterns 是「追加」而不是替换——扩展包只能给触发添模式；
+  - 容错：某个包导入失败、格式不对或引用了不存在的条目时，跳过该包并在 stderr 说明，其余照常；
+  - 懒加载：合并结果编译为二进制缓存（见 npd_library.load_library_source）。启动时只对 sys.path
+    各目录与已知扩展包的模块文件做 stat，与上次的索引一致就直接映射缓存——既不扫描入口点
+    （导入 importlib.metadata 本身就要几十毫秒），也不导入任何扩展包；
+    目录有变化时才扫描入口点，扩展包本身（名称、目标、发行包版本）也变了才导入、重新合成。
+    整个过程推迟到第一次取注册表（npd.get_registry()）时，装多少个包启动都基本不变；
+    一个扩展包也没有时同样记下索引（扩展包列表为空），环境不变就连入口点也不扫描；
+  - 设置环境变量 NPD_NO_PACKS=1 可只用内置库；缓存目录默认 ~/.cache/npd
+    （Windows 为 %LOCALAPPDATA%\\npd），可用 NPD_CACHE_DIR 指定。
+
+本模块不导入 npd：内置库由调用方以 build_builtin 传入（npd.get_registry() 传自己的
+build_builtin_registry）。否则以 python npd.py 运行时 npd 会被再导入一份，注册表的键
+就成了那一份的 TriggerType 等，与 __main__ 里的对不上。
+
+依赖：npd_library.py（有扩展包时）。
+"""
+
+import importlib
+import json
+import os
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from npd import PatternRegistry
+
+# npd_library（及 hashlib、mmap 等）只在真有扩展包时才导入：没装扩展包的启动不为此多付一毫秒
+
+
+ENTRY_POINT_GROUP = "npd.packs"
+DISABLE_ENV = "NPD_NO_PACKS"
+CACHE_DIR_ENV = "NPD_CACHE_DIR"
+CACHE_NAME = "packs.npdlib"
+_INDEX_VERSION = 1
+_SECTIONS = ("needs", "triggers", "patterns")
+
+
+@dataclass(frozen=True)
+class PackInfo:
+    """一个已安装的扩展包：入口点名称、目标（模块:属性）、所属发行包及其版本。"""
+    name: str
+    target: str
+    dist: str = ""
+    version: str = ""
+
+    @property
+    def module(self) -> str:
+        return self.target.partition(":")[0].strip()
+
+
+def _warn(message: str) -> None:
+    if sys.stderr is not None:  # 打包的图形界面没有控制台
+        print(message, file=sys.stderr, flush=True)
+
+
+def cache_dir() -> str:
+    """扩展包索引与合成缓存所在目录。"""
+    configured = os.environ.get(CACHE_DIR_ENV)
+    if configured:
+        return configured
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        return os.path.join(os.environ["LOCALAPPDATA"], "npd")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "npd")
+
+
+# ---------------------------------------------------------------------------
+# 一、发现与导入
+# ---------------------------------------------------------------------------
+
+def discover_packs() -> List[PackInfo]:
+    """扫描已安装发行包的入口点（不导入扩展包本身），按名称排序；同名只取第一个。"""
+    from importlib import metadata  # 导入就要几十毫秒，只在确实需要扫描时导入
+
+    try:
+        eps = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:  # Python 3.9 及更早：返回 {组: [入口点]}
+        eps = metadata.entry_points().get(ENTRY_POINT_GROUP, ())
+    packs: Dict[str, PackInfo] = {}
+    for ep in eps:
+        dist = getattr(ep, "dist", None)
+        info = PackInfo(ep.name, ep.value,
+                        getattr(dist, "name", "") or "" if dist else "",
+                        getattr(dist, "version", "") or "" if dist else "")
+        packs.setdefault(info.name, info)
+    return [packs[name] for name in sorted(packs)]
+
+
+def load_pack(info: PackInfo) -> Dict[str, Any]:
+    """导入扩展包并取得其库字典（入口点目标可以是字典、返回字典的函数或库文件路径）。"""
+    from npd_library import LibraryError, read_library_source
+
+    module_name, _, attr = info.target.partition(":")
+    obj: Any = importlib.import_module(module_name.strip())
+    module = obj
+    for part in attr.strip().split(".") if attr.strip() else ():
+        obj = getattr(obj, part)
+    if callable(obj):
+        obj = obj()
+    if isinstance(obj, (str, os.PathLike)):
+        obj = read_library_source(os.path.join(os.path.dirname(getattr(module, "__file__", None) or "."), obj))
+    if not isinstance(obj, dict):
+        raise LibraryError(f"入口点 {info.target} 应给出库文件格式的字典，实际是 {type(obj).__name__}")
+    return obj
+
+
+def _module_files(packs: Sequence[PackInfo]) -> List[str]:
+    """已导入的扩展包模块文件（及其所在包的 __init__），用于判断扩展包内容是否被改过。"""
+    files = []
+    for info in packs:
+        parts = info.module.split(".")
+        for i in range(1, len(parts) + 1):
+            module = sys.modules.get(".".join(parts[:i]))
+            path = getattr(module, "__file__", None)
+            if module is None:  # 导入失败的包也要记下文件：修好后据此发现变化
+                import importlib.util
+                try:
+                    spec = importlib.util.find_spec(".".join(parts[:i]))
+                except (ImportError, ValueError):
+                    spec = None
+                path = getattr(spec, "origin", None)
+            if path and path not in files:
+                files.append(path)
+    return files
+
+
+# ---------------------------------------------------------------------------
+# 二、合并
+# ---------------------------------------------------------------------------
+
+def _merge_pack(tables: Dict[str, Dict[str, Dict[str, Any]]], data: Dict[str, Any]) -> None:
+    """把一个扩展包并入 tables（section → value → 条目）。出错时抛 LibraryError，tables 保持原样。"""
+    from npd_library import LibraryError
+
+    staged = {section: dict(table) for section, table in tables.items()}
+    touched: Dict[str, List[str]] = {section: [] for section in _SECTIONS}
+    for section in _SECTIONS:
+        entries = data.get(section, [])
+        if not isinstance(entries, list):
+            raise LibraryError(f"{section} 必须是列表")
+        table = staged[section]
+        by_name = {e["name"]: v for v, e in table.items()}
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get("name"):
+                raise LibraryError(f"{section}[{i}] 缺少 name")
+            value = str(entry.get("value") or by_name.get(entry["name"]) or entry["name"])
+            old = table.get(value)
+            merged = dict(old or {})
+            merged.update(entry)
+            merged["value"] = value
+            if section == "triggers" and old is not None:
+                existing = list(old.get("patterns", []))
+                merged["patterns"] = existing + [r for r in entry.get("patterns", []) if r not in existing]
+            table[value] = merged
+            by_name[merged["name"]] = value
+            touched[section].append(value)
+
+    # 引用在每个包合并后就核对：坏包只连累它自己，不会让整个库解析失败
+    def known(section: str) -> set:
+        return set(staged[section]) | {e["name"] for e in staged[section].values()}
+
+    needs, patterns = known("needs"), known("patterns")
+    for value in touched["patterns"]:
+        p = staged["patterns"][value]
+        if "serves_need" not in p:
+            raise LibraryError(f"模式 {p['name']!r} 缺少 serves_need")
+        if str(p["serves_need"]) not in needs:
+            raise LibraryError(f"模式 {p['name']!r} 引用了不存在的 need：{p['serves_need']!r}")
+    for value in touched["triggers"]:
+        t = staged["triggers"][value]
+        for ref in t.get("patterns", []):
+            if str(ref) not in patterns:
+                raise LibraryError(f"触发 {t['name']!r} 引用了不存在的 pattern：{ref!r}")
+    tables.update(staged)
+
+
+def merge_packs(packs: Sequence[PackInfo], build_builtin: Callable[[], "PatternRegistry"]
+                ) -> Tuple[Dict[str, Any], List[PackInfo]]:
+    """
+    导入并依次合并扩展包（叠加在 build_builtin() 构建的内置库上），返回（完整的库字典，实际并入的扩展包）。
+    出问题的包被跳过并在 stderr 说明。
+    """
+    from npd_library import registry_to_dict
+
+    base = registry_to_dict(build_builtin())
+    tables = {section: {e["value"]: dict(e) for e in base[section]} for section in _SECTIONS}
+    loaded = []
+    for info in packs:
+        try:
+            _merge_pack(tables, load_pack(info))
+        except Exception as e:  # 第三方代码，什么错都可能有
+            _warn(f"跳过扩展包 {info.name}（{info.target}）：{type(e).__name__}: {e}")
+            continue
+        loaded.append(info)
+    return {"extends": None, **{section: list(table.values()) for section, table in tables.items()}}, loaded
+
+
+# ---------------------------------------------------------------------------
+# 三、启动时的懒加载：stat 指纹 → 扫描入口点 → 导入扩展包
+# ---------------------------------------------------------------------------
+
+def _stamp(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path or ".")
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _path_stamps() -> List[Any]:
+    """sys.path 各项的 [路径, [mtime, 大小]]：安装/卸载发行包会改变 site-packages 目录的 mtime。"""
+    return [[p, _stamp(p)] for p in sys.path]
+
+
+def _files_unchanged(files: Sequence[Sequence[Any]]) -> bool:
+    return all(_stamp(path) == stamp for path, stamp in files)
+
+
+def _index_path(directory: str) -> str:
+    # 命令行、图形界面、打包程序的 sys.path 各不相同，各用一份索引，交替运行时互不冲掉
+    key = zlib.crc32("\0".join(sys.path).encode("utf-8", "surrogatepass"))
+    return os.path.join(directory, f"packs-{key:08x}.json")
+
+
+def _read_index(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if isinstance(index, dict) and index.get("version") == _INDEX_VERSION else None
+
+
+def _write_index(path: str, index: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _INDEX_VERSION, **index}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # 缓存目录不可写时每次启动都扫描入口点，只是慢一些
+
+
+def _identity(packs: Sequence[PackInfo]) -> List[List[str]]:
+    return [[p.name, p.target, p.dist, p.version] for p in packs]
+
+
+def _digest(packs: Sequence[PackInfo]) -> bytes:
+    import hashlib
+    from npd_library import builtin_digest
+
+    identity = json.dumps(_identity(packs), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(identity + builtin_digest()).digest()
+
+
+def registry_with_packs(build_builtin: Callable[[], "PatternRegistry"],
+                        directory: Optional[str] = None) -> "PatternRegistry":
+    """
+    内置库（build_builtin() 构建）+ 已安装的扩展包。没有扩展包（或设置了 NPD_NO_PACKS）时就是内置库本身。
+    sys.path 与扩展包文件都没变时只做 stat 与一次缓存映射，不扫描入口点、不导入扩展包。
+    """
+    if os.environ.get(DISABLE_ENV):
+        return build_builtin()
+    directory = directory or cache_dir()
+    index_path = _index_path(directory)
+    index = _read_index(index_path)
+    paths = _path_stamps()
+    if index is not None and index["paths"] == paths:
+        packs = [PackInfo(*p) for p in index["packs"]]
+        files = index["files"]
+    else:
+        packs = discover_packs()
+        same = index is not None and index["packs"] == _identity(packs)
+        files = index["files"] if same else None
+
+    if not packs:
+        if index is None or index["paths"] != paths or index["packs"]:
+            _write_index(index_path, {"paths": paths, "packs": [], "files": []})
+        return build_builtin()
+
+    from npd_library import load_library_source
+
+    rebuilt = []
+
+    def build() -> Dict[str, Any]:
+        library, _ = merge_packs(packs, build_builtin)
+        rebuilt.append(True)
+        return library
+
+    fresh = files is not None and _files_unchanged(files)
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        pass  # 不可写时 load_library_source 只是不写缓存
+    registry = load_library_source(build, _digest(packs), os.path.join(directory, CACHE_NAME), reuse=fresh)
+    if rebuilt or index is None or index["paths"] != paths:
+        if rebuilt:
+            files = [[f, _stamp(f)] for f in _module_files(packs)]
+        _write_index(index_path, {"paths": paths, "packs": _identity(packs), "files": files or []})
+    return registry
+
+
+def installed_packs(build_builtin: Callable[[], "PatternRegistry"]) -> List[Tuple[PackInfo, bool]]:
+    """已安装的扩展包及其能否正常并入（会导入每一个包；供命令行 packs 子命令核对用）。"""
+    packs = discover_packs()
+    _, loaded = merge_packs(packs, build_builtin)
+    return [(info, info in loaded) for info in packs]
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+在线的模式序列预测：从事件日志里学「刚出现了什么之后，接下来最可能是什么」。
+get_likely_patterns_for_trigger() 是固定映射；真实的冲突里，下一步往往取决于刚刚发生的手段——
+例如 DARVO 之后常接扮演受害者。
+
+  - 统计：按时间顺序把每条事件里的行为模式接成序列（相邻事件间隔超过 SESSION_GAP 视为新一轮，
+    上下文清空），累计 ORDER 阶以内的转移次数（前 1 个、前 2 个模式 → 下一个模式），
+    以及触发 → 模式的次数；计数以 value 为键，跨库稳定；
+  - 更新：observe(incident) 只改动常数个计数器，O(1)，不需要重新训练；
+  - 预测：predict(trigger, recent) 由低阶到高阶逐级插值——
+    内置映射（或整体频率）→ 触发 → 前 1 个模式 → 前 2 个模式，
+    每一级的权重为 n / (n + MIN_EVIDENCE)（n 为该上下文见过的次数）。数据少时结果就是内置映射，
+    数据越多越贴近自己记下的规律；只遍历出现过的后续模式，界面里随翻页实时查询也没有延迟；
+  - 落盘：SequencePredictor.for_journal(path) 读取日志旁的 .seq.json（计数 + 已统计到的字节偏移），
+    只补读之后新增的行；checkpoint() 写回。
+
+    predictor = SequencePredictor.for_journal("journal.jsonl")
+    predictor.predict(TriggerType.被质疑或要求负责, [BehaviorPattern.DARVO])
+
+依赖：同目录下的 npd.py、npd_journal.py。
+"""
+
+import heapq
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from npd import BehaviorPattern, PatternRegistry, TriggerType, get_registry
+from npd_journal import Incident, iter_incident_offsets
+
+
+ORDER = 2                           # 最多看前几个模式
+MIN_EVIDENCE = 5                    # 上下文见过 n 次时，它的统计占 n / (n + MIN_EVIDENCE) 的权重
+SESSION_GAP = timedelta(hours=12)   # 相邻事件间隔超过它，序列上下文清空
+DEFAULT_LIMIT = 5
+CACHE_SUFFIX = ".seq.json"
+_CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Prediction:
+    """一条预测：行为模式、概率，以及最具体的那一级上下文见过的次数（0 表示只用了内置映射）。"""
+    pattern: BehaviorPattern
+    probability: float
+    evidence: int
+
+
+class SequencePredictor:
+    """
+    在线学习的模式序列模型。用法：
+
+        predictor = SequencePredictor()
+        for incident in iter_incidents("journal.jsonl"):
+            predictor.observe(incident)
+        predictor.predict(TriggerType.设立边界, [BehaviorPattern.DARVO], limit=3)
+    """
+
+    def __init__(
+        self,
+        registry: Optional[PatternRegistry] = None,
+        order: int = ORDER,
+        min_evidence: float = MIN_EVIDENCE,
+        session_gap: timedelta = SESSION_GAP,
+    ):
+        self.registry = registry or get_registry()
+        self.order = order
+        self.min_evidence = min_evidence
+        self.session_gap = session_gap
+        self.count = 0
+        # 上下文（前 k 个模式的 value，k = 0..order）→ 下一个模式的计数；() 即整体频率
+        self._next: Dict[Tuple[str, ...], Counter] = {}
+        self._by_trigger: Dict[str, Counter] = {}
+        # 序列的当前状态：最近 order 个模式、最后一条事件的时间与触发
+        self._recent: Tuple[str, ...] = ()
+        self._last_ts: Optional[datetime] = None
+        self._last_triggers: Tuple[str, ...] = ()
+        # for_journal() 绑定的日志与已统计到的字节偏移
+        self.path: Optional[str] = None
+        self._offset = 0
+
+    # -- 学习 --------------------------------------------------------------
+
+    def observe(self, incident: Incident) -> None:
+        """把一条事件计入统计（按时间顺序调用）。"""
+        if self._last_ts is not None and incident.timestamp - self._last_ts > self.session_gap:
+            self._recent = ()
+        self._last_ts = incident.timestamp
+        patterns = [p.value for p in incident.patterns]
+        triggers = tuple(t.value for t in incident.triggers)
+        if triggers:
+            self._last_triggers = triggers
+        for t in triggers:
+            counts = self._by_trigger.get(t)
+            if counts is None:
+                counts = self._by_trigger[t] = Counter()
+            counts.update(patterns)
+        recent = self._recent
+        for v in patterns:
+            for k in range(min(self.order, len(recent)) + 1):
+                ctx = recent[len(recent) - k:]
+                counts = self._next.get(ctx)
+                if counts is None:
+                    counts = self._next[ctx] = Counter()
+                counts[v] += 1
+            recent = (*recent, v)[-self.order:]
+        self._recent = recent
+        self.count += 1
+
+    def observe_all(self, incidents: Iterable[Incident]) -> None:
+        for incident in incidents:
+            self.observe(incident)
+
+    # -- 预测 --------------------------------------------------------------
+
+    def predict(
+        self,
+        trigger: Optional[TriggerType] = None,
+        recent: Sequence[BehaviorPattern] = (),
+        limit: Optional[int] = DEFAULT_LIMIT,
+    ) -> Tuple[Prediction, ...]:
+        """
+        在 trigger 情境下、刚出现过 recent（按时间顺序，只看最后 order 个）之后，
+        接下来最可能出现的行为模式（按概率降序）。trigger 省略时以整体频率为底。
+        """
+        registry = self.registry
+        if trigger is not None:
+            base = {p.value: 1.0 for p in registry.patterns_for_trigger(trigger)}
+            levels = [self._by_trigger.get(trigger.value)]
+        else:
+            base = {}
+            levels = [self._next.get(())]
+        tail = tuple(p.value for p in recent)[-self.order:] if self.order else ()
+        levels.extend(self._next.get(tail[len(tail) - k:]) for k in range(1, len(tail) + 1))
+
+        # 自高阶向低阶分配权重：每一级拿走剩余权重的 n / (n + MIN_EVIDENCE)
+        weighted: List[Tuple[float, Counter]] = []
+        remaining = 1.0
+        evidence = 0
+        for counts in reversed(levels):
+            if not counts:
+                continue
+            n = sum(counts.values())
+            if not evidence:
+                evidence = n
+            lam = n / (n + self.min_evidence)
+            weighted.append((remaining * lam / n, counts))
+            remaining *= 1 - lam
+        if not weighted and not base:
+            return ()
+
+        scores: Dict[str, float] = {}
+        if base:
+            share = remaining / len(base)
+            for v in base:
+                scores[v] = share
+        for scale, counts in weighted:
+            for v, c in counts.items():
+                scores[v] = scores.get(v, 0.0) + scale * c
+        total = sum(scores.values())
+        lookup = registry.lookup
+        ranked: List[Prediction] = []
+        # 同分时保持内置映射的顺序（nlargest 是稳定的）
+        for v, s in heapq.nlargest(limit or len(scores), scores.items(), key=lambda item: item[1]):
+            key = lookup("pattern", v)
+            if key is not None:  # 当前库里已没有的模式跳过
+                ranked.append(Prediction(key, round(s / total, 4), evidence))
+        return tuple(ranked)
+
+    def predict_next(self, limit: Optional[int] = DEFAULT_LIMIT) -> Tuple[Prediction, ...]:
+        """紧接最后一条记录的事件之后：沿用它的触发与最近的模式序列。"""
+        trigger = self.registry.lookup("trigger", self._last_triggers[0]) if self._last_triggers else None
+        recent = [k for k in (self.registry.lookup("pattern", v) for v in self._recent) if k is not None]
+        return self.predict(trigger, recent, limit)
+
+    def transitions(self, pattern: BehaviorPattern) -> Dict[BehaviorPattern, int]:
+        """某模式之后直接出现各模式的次数（只看前 1 个模式的统计）。"""
+        counts = self._next.get((pattern.value,), Counter())
+        out = {}
+        for v, n in counts.most_common():
+            key = self.registry.lookup("pattern", v)
+            if key is not None:
+                out[key] = n
+        return out
+
+    # -- 绑定日志与落盘 ----------------------------------------------------
+
+    @classmethod
+    def for_journal(cls, path: str, registry: Optional[PatternRegistry] = None, **kwargs: Any) -> "SequencePredictor":
+        """从 path 的 .seq.json 恢复统计（不存在或不可信时从头读），再补读之后新增的事件。"""
+        predictor = cls(registry, **kwargs)
+        predictor.path = path
+        try:
+            with open(path + CACHE_SUFFIX, encoding="utf-8") as f:
+                d = json.load(f)
+            if (d.get("version") == _CACHE_VERSION and d["order"] == predictor.order
+                    and d["offset"] <= os.path.getsize(path)):
+                predictor._load_state(d["state"])
+                predictor._offset = d["offset"]
+        except (OSError, ValueError, KeyError):
+            pass
+        predictor.refresh()
+        return predictor
+
+    def refresh(self) -> int:
+        """补读绑定日志里上次之后追加的事件，返回新增条数（没有新行时只有一次 stat）。"""
+        if self.path is None or not os.path.exists(self.path) or os.path.getsize(self.path) <= self._offset:
+            return 0
+        n = 0
+        for offset, incident in iter_incident_offsets(self.path, self._offset, self.registry):
+            self.observe(incident)
+            self._offset = offset
+            n += 1
+        return n
+
+    def checkpoint(self) -> None:
+        """把统计与已读到的偏移写入日志旁的 .seq.json（原子替换）。"""
+        if self.path is None:
+            raise ValueError("未绑定事件日志（请用 SequencePredictor.for_journal）")
+        target = self.path + CACHE_SUFFIX
+        tmp = target + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _CACHE_VERSION, "order": self.order, "offset": self._offset,
+                       "state": self._dump_state()}, f, ensure_ascii=False)
+        os.replace(tmp, target)
+
+    def _dump_state(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "next": [[list(ctx), dict(c)] for ctx, c in self._next.items()],
+            "triggers": {t: dict(c) for t, c in self._by_trigger.items()},
+            "recent": list(self._recent),
+            "last_ts": self._last_ts.isoformat() if self._last_ts is not None else None,
+            "last_triggers": list(self._last_triggers),
+        }
+
+    def _load_state(self, d: Dict[str, Any]) -> None:
+        self.count = d["count"]
+        self._next = {tuple(ctx): Counter(c) for ctx, c in d["next"]}
+        self._by_trigger = {t: Counter(c) for t, c in d["triggers"].items()}
+        self._recent = tuple(d["recent"])
+        self._last_ts = datetime.fromisoformat(d["last_ts"]) if d["last_ts"] else None
+        self._last_triggers = tuple(d["last_triggers"])
+
+
+def format_predictions(predictions: Iterable[Prediction]) -> str:
+    """一行可读文本，如「扮演受害者 42% · 煤气灯 18%」。"""
+    return " · ".join(f"{p.pattern.name} {p.probability:.0%}" for p in predictions)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+可选的性能埋点：查询/格式化热路径的调用次数与延迟直方图、GUI 事件耗时，以及 cProfile 输出。
+
+默认完全关闭——不包装任何函数，所以没有任何额外开销。enable() 时才把热路径函数换成计时包装：
+不仅替换 npd 等模块里的定义，也替换其他已导入模块里通过 `from npd import ...` 拿到的同一函数引用；
+disable() 原样换回。
+
+两个入口都支持 --profile（及 --profile-stats FILE）：
+
+    python npd_cli.py --profile trigger boundary                 # 退出时把调用统计打印到 stderr
+    python npd_cli.py --profile-stats out.prof batch < in.txt    # 另外用 cProfile 记录并写入 out.prof
+    python npd_windows.py --profile-stats gui.prof
+
+out.prof 可用 `python -m pstats out.prof` 或 snakeviz 等工具查看。
+
+依赖：同目录下的 npd.py。
+"""
+
+import cProfile
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+# 模块 → 需要埋点的函数；enable() 时这些模块会被导入
+HOT_PATHS: Dict[str, Tuple[str, ...]] = {
+    "npd": (
+        "get_pattern_cards",
+        "get_likely_patterns_for_trigger",
+        "get_cards_for_trigger",
+        "find_patterns_by_need",
+        "get_trigger_description",
+        "get_core_need_description",
+        "describe_trigger_and_patterns",
+        "format_trigger_header",
+        "print_cards_for_trigger",
+        "list_all_patterns_with_healing_notes",
+        "search",
+    ),
+    "npd_render": ("render", "write_render", "export_all"),
+}
+# 界面事件：界面入口把界面类传给 enable()，或 npd_windows（含作为 __main__ 运行时）已被导入时才埋点（不为此导入 tkinter）
+GUI_EVENTS: Tuple[str, ...] = ("_on_trigger_select", "_update_card_display")
+
+_BUCKETS = 48  # 第 k 桶：耗时 < 2**k 纳秒
+
+
+class LatencyStats:
+    """一个函数的调用次数、总耗时、最小/最大值与按 2 的幂分桶的延迟直方图。"""
+
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * _BUCKETS
+
+    def record(self, ns: int) -> None:
+        if not self.count or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.count += 1
+        self.total_ns += ns
+        self.buckets[min(ns.bit_length(), _BUCKETS - 1)] += 1
+
+    def percentile(self, p: float) -> int:
+        """近似分位数（纳秒）：落在哪个桶就取该桶上界，且不超过实测最大值。"""
+        if not self.count:
+            return 0
+        target = self.count * p / 100
+        seen = 0
+        for k, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(1 << k, self.max_ns)
+        return self.max_ns
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": self.total_ns / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(50) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "histogram": {f"<{1 << k}ns": n for k, n in enumerate(self.buckets) if n},
+        }
+
+
+_stats: Dict[str, LatencyStats] = {}
+# 已打的补丁：(所属对象, 属性名, 原函数)，disable() 时逆序换回
+_patches: List[Tuple[object, str, Callable]] = []
+
+
+def _timed(label: str, func: Callable) -> Callable:
+    stats = _stats.setdefault(label, LatencyStats())
+    clock = time.perf_counter_ns
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.record(clock() - start)
+
+    wrapper.__npd_profiled__ = func
+    return wrapper
+
+
+def _patch(owner: object, attr: str, replacement: Callable) -> None:
+    _patches.append((owner, attr, getattr(owner, attr)))
+    setattr(owner, attr, replacement)
+
+
+def is_enabled() -> bool:
+    return bool(_patches)
+
+
+def _gui_class() -> Optional[type]:
+    """已导入的图形界面类：python npd_windows.py 与打包的 exe 里界面模块是 __main__，不叫 npd_windows。"""
+    for module_name in ("npd_windows", "__main__"):
+        gui = getattr(sys.modules.get(module_name), "NPDApp", None)
+        if isinstance(gui, type):
+            return gui
+    return None
+
+
+def enable(gui: Optional[type] = None) -> None:
+    """
+    为热路径函数与 GUI 事件打上计时包装；重复调用无效果。
+    gui 为界面类（npd_windows.NPDApp，由界面入口传入）；省略时找已导入的 npd_windows 或 __main__ 里的 NPDApp。
+    """
+    if _patches:
+        return
+    for module_name, names in HOT_PATHS.items():
+        module = importlib.import_module(module_name)
+        for name in names:
+            original = getattr(module, name)
+            wrapper = _timed(f"{module_name}.{name}", original)
+            # 其他模块里 `from npd import xxx` 得到的引用也一并替换
+            for other in list(sys.modules.values()):
+                namespace = getattr(other, "__dict__", None)
+                if not namespace:
+                    continue
+                for attr, value in list(namespace.items()):
+                    if value is original:
+                        _patch(other, attr, wrapper)
+    gui = gui or _gui_class()
+    if gui is not None:
+        for name in GUI_EVENTS:
+            _patch(gui, name, _timed(f"NPDApp.{name}", getattr(gui, name)))
+
+
+def disable() -> None:
+    """撤销所有计时包装（已收集的统计保留，直到 reset()）。"""
+    while _patches:
+        owner, attr, original = _patches.pop()
+        setattr(owner, attr, original)
+    # 开启期间才导入的模块拿到的是包装后的引用，也换回原函数
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not namespace:
+            continue
+        for attr, value in list(namespace.items()):
+            original = getattr(value, "__npd_profiled__", None)
+            if original is not None and callable(value):
+                setattr(module, attr, original)
+
+
+def reset() -> None:
+    for stats in _stats.values():
+        stats.__init__()
+
+
+def stats() -> Dict[str, Dict[str, object]]:
+    """有调用记录的各项统计。"""
+    return {label: s.to_dict() for label, s in _stats.items() if s.count}
+
+
+def summary_lines() -> List[str]:
+    rows = sorted(((label, s) for label, s in _stats.items() if s.count), key=lambda kv: -kv[1].total_ns)
+    lines = [f"{'函数':<44}{'次数':>9}{'总计 ms':>11}{'平均 µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'最大 µs':>10}"]
+    for label, s in rows:
+        d = s.to_dict()
+        lines.append(
+            f"{label:<44}{d['count']:>9}{d['total_ms']:>11.2f}{d['mean_us']:>10.2f}"
+            f"{d['p50_us']:>10.1f}{d['p99_us']:>10.1f}{d['max_us']:>10.1f}"
+        )
+    return lines
+
+
+@contextmanager
+def profiling(stats_path: Optional[str] = None, out: Optional[TextIO] = None,
+              gui: Optional[type] = None) -> Iterator[None]:
+    """
+    在 with 块内开启埋点；退出时把统计摘要写到 out（默认 stderr，无控制台时跳过），
+    给了 stats_path 时另用 cProfile 记录整段执行并写入该文件（pstats 格式）。gui 同 enable()。
+    """
+    enable(gui)
+    profiler = cProfile.Profile() if stats_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(stats_path)
+        disable()
+        out = out or sys.stderr
+        if out is not None:
+            out.write("\n".join(summary_lines()) + "\n")
+            if stats_path:
+                out.write(f"cProfile 统计已写入 {stats_path}\n")
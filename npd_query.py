@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+多触发查询：一个情境往往同时踩中好几个触发（例如「设立边界 + 孩子独立或疏远 + 孩子获得他人关注」），
+这里把它们合并为一张按得分排序、去重后的行为模式清单，并标出每个模式服务于哪条核心需求。
+
+实现：按注册表预先建好「触发 × 模式」关联矩阵——每个触发一行，按稀疏形式存为（模式列号, 权重）
+（在该触发列表中越靠前，权重越高）。查询只是把几行的权重按列加总，代价与涉及的非零项成正比；
+没有用 int 位集：几万列的大库里，从按位或的结果中取出置位的列每次都要扫一遍整行，反而更慢。
+结果按查询内容缓存，同一组触发重复查询几乎没有开销。
+
+依赖：同目录下的 npd.py。
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from npd import (
+    BehaviorPattern,
+    CoreNeed,
+    PatternRegistry,
+    TriggerType,
+    get_registry,
+)
+
+
+TriggerQuery = Union[Iterable[TriggerType], Mapping[TriggerType, float]]
+
+
+@dataclass(frozen=True)
+class PatternScore:
+    """查询结果中的一项：行为模式、得分、服务的核心需求、由哪些触发共同指向。"""
+    pattern: BehaviorPattern
+    score: float
+    serves_need: Optional[CoreNeed]
+    triggers: Tuple[TriggerType, ...]
+
+
+def _rank_weight(position: int, length: int) -> float:
+    """触发列表中第 position 个模式的权重：第一个为 1.0，最后一个为 1/length。"""
+    return (length - position) / length
+
+
+class TriggerQueryEngine:
+    """基于预计算「触发 × 模式」关联矩阵的多触发查询引擎（对应一个注册表）。"""
+
+    def __init__(self, registry: PatternRegistry, cache_size: int = 4096):
+        self.registry = registry
+        patterns: List[BehaviorPattern] = []
+        index: Dict[BehaviorPattern, int] = {}
+        for ps in registry.trigger_patterns.values():
+            for p in ps:
+                if p not in index:
+                    index[p] = len(patterns)
+                    patterns.append(p)
+        self._patterns: Tuple[BehaviorPattern, ...] = tuple(patterns)
+        self._needs: Tuple[Optional[CoreNeed], ...] = tuple(
+            (c.serves_need if c is not None else None)
+            for c in (registry.card_for_pattern(p) for p in patterns)
+        )
+        # 关联矩阵：每个触发一行（模式列号, 权重）
+        self._weights: Dict[TriggerType, Tuple[Tuple[int, float], ...]] = {}
+        for t, ps in registry.trigger_patterns.items():
+            seen = set()
+            row = []
+            for pos, p in enumerate(ps):
+                i = index[p]
+                if i in seen:
+                    continue  # 同一触发里重复列出的模式只计一次
+                seen.add(i)
+                row.append((i, _rank_weight(pos, len(ps))))
+            self._weights[t] = tuple(row)
+        self._query_cached = lru_cache(maxsize=cache_size)(self._query)
+
+    @property
+    def patterns(self) -> Tuple[BehaviorPattern, ...]:
+        """矩阵的列：所有被至少一个触发指向的模式（按首次出现顺序）。"""
+        return self._patterns
+
+    def query(self, triggers: TriggerQuery, limit: Optional[int] = None) -> List[PatternScore]:
+        """
+        返回这组触发（可带权重）可能激活的行为模式，按得分从高到低排序、去重。
+        triggers 可以是触发的集合（权重均为 1），也可以是 {触发: 权重} 映射。
+        得分 = Σ 触发权重 × 该模式在此触发列表中的位置权重；同分时被更多触发指向者在前。
+        """
+        if isinstance(triggers, Mapping):
+            items = triggers.items()
+        else:
+            items = ((t, 1.0) for t in triggers)
+        merged: Dict[TriggerType, float] = {}
+        for t, w in items:
+            if w and t in self._weights:
+                merged[t] = merged.get(t, 0.0) + float(w)
+        key = tuple(sorted(merged.items(), key=lambda kv: kv[0].value))
+        result = self._query_cached(key)
+        return list(result if limit is None else result[:limit])
+
+    def _query(self, key: Tuple[Tuple[TriggerType, float], ...]) -> Tuple[PatternScore, ...]:
+        scores: Dict[int, float] = {}
+        sources: Dict[int, List[TriggerType]] = {}
+        for t, w in key:
+            for i, rw in self._weights[t]:
+                scores[i] = scores.get(i, 0.0) + w * rw
+                sources.setdefault(i, []).append(t)
+        order = sorted(scores, key=lambda i: (-scores[i], -len(sources[i]), i))
+        return tuple(
+            PatternScore(self._patterns[i], round(scores[i], 6), self._needs[i], tuple(sources[i]))
+            for i in order
+        )
+
+
+_engine: Optional[TriggerQueryEngine] = None
+
+
+def get_query_engine() -> TriggerQueryEngine:
+    """返回当前注册表对应的查询引擎；注册表被替换后自动重建。"""
+    global _engine
+    registry = get_registry()
+    if _engine is None or _engine.registry is not registry:
+        _engine = TriggerQueryEngine(registry)
+    return _engine
+
+
+def rank_patterns_for_triggers(triggers: TriggerQuery, limit: Optional[int] = None) -> List[PatternScore]:
+    """多触发版的 get_likely_patterns_for_trigger：返回排序、去重后的模式及得分。"""
+    return get_query_engine().query(triggers, limit)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+触发卡片的流式渲染与渲染缓存。
+
+print_cards_for_trigger() 返回整份输出的行列表；这里改为生成器逐块产出（先是与触发无关、
+按库缓存的 CoreNeed / EscalationLevel 总结，再是触发说明与每张卡片），可直接写入文件或套接字。
+支持四种格式：text（与 print_cards_for_trigger 打印出的内容一致）、markdown、html、json。
+
+完整渲染结果另有按（触发, 格式）的有界 LRU 缓存；export_all() 导出全部触发时只做一次缓冲写入。
+
+依赖：同目录下的 npd.py。
+"""
+
+import html
+import io
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from npd import (
+    PatternCard,
+    PatternRegistry,
+    TriggerType,
+    describe_trigger_and_patterns,
+    format_escalation_level_summary,
+    format_trigger_header,
+    get_registry,
+)
+
+
+FORMATS: Tuple[str, ...] = ("text", "markdown", "html", "json")
+
+_INTRO_NOTE = "这些行为是可预测的程序输出，不是因为你做错了什么。"
+
+
+# ---------------------------------------------------------------------------
+# 一、各格式的片段（开头总结 / 触发说明 / 单张卡片 / 结尾）
+# ---------------------------------------------------------------------------
+
+def _text_header(registry: PatternRegistry) -> str:
+    return "".join(line + "\n" for line in format_trigger_header())
+
+
+def _text_trigger(registry: PatternRegistry, trigger: TriggerType) -> str:
+    return describe_trigger_and_patterns(trigger) + "\n\n"
+
+
+def _text_card(card: PatternCard) -> str:
+    return f"【{card.pattern.name}】\n  表现：{card.description}\n  疗愈提示：{card.healing_note}\n\n"
+
+
+def _md_header(registry: PatternRegistry) -> str:
+    parts = ["## CoreNeed 三条核心需求\n\n"]
+    for need in registry.needs:
+        parts.append(f"- **{need.name}**：{registry.need_description(need)}\n")
+    parts.append("\n## EscalationLevel 供给升级路径\n\n")
+    parts.extend(f"> {line.strip()}\n" for line in format_escalation_level_summary() if line.strip())
+    parts.append("\n---\n\n")
+    return "".join(parts)
+
+
+def _md_trigger(registry: PatternRegistry, trigger: TriggerType) -> str:
+    names = "、".join(p.name for p in registry.patterns_for_trigger(trigger))
+    return (
+        f"## 触发情境：{trigger.name}\n\n"
+        f"- 含义：{registry.trigger_description(trigger)}\n"
+        f"- 程序可能激活的行为模式：{names}\n\n"
+        f"→ {_INTRO_NOTE}\n\n"
+    )
+
+
+def _md_card(card: PatternCard) -> str:
+    return (
+        f"### {card.pattern.name}\n\n"
+        f"- 表现：{card.description}\n"
+        f"- 疗愈提示：{card.healing_note}\n\n"
+    )
+
+
+def _html_header(registry: PatternRegistry) -> str:
+    e = html.escape
+    parts = ['<section class="npd-trigger">\n<h2>CoreNeed 三条核心需求</h2>\n<ul>\n']
+    for need in registry.needs:
+        parts.append(f"<li><strong>{e(need.name)}</strong>：{e(registry.need_description(need))}</li>\n")
+    parts.append("</ul>\n<h2>EscalationLevel 供给升级路径</h2>\n")
+    parts.extend(f"<p>{e(line.strip())}</p>\n" for line in format_escalation_level_summary() if line.strip())
+    parts.append("<hr>\n")
+    return "".join(parts)
+
+
+def _html_trigger(registry: PatternRegistry, trigger: TriggerType) -> str:
+    e = html.escape
+    names = "、".join(e(p.name) for p in registry.patterns_for_trigger(trigger))
+    return (
+        f"<h2>触发情境：{e(trigger.name)}</h2>\n"
+        f"<p>含义：{e(registry.trigger_description(trigger))}</p>\n"
+        f"<p>程序可能激活的行为模式：{names}</p>\n"
+        f"<p>→ {_INTRO_NOTE}</p>\n"
+    )
+
+
+def _html_card(card: PatternCard) -> str:
+    e = html.escape
+    return (
+        f'<article class="npd-card">\n<h3>{e(card.pattern.name)}</h3>\n'
+        f"<p>表现：{e(card.description)}</p>\n"
+        f"<p>疗愈提示：{e(card.healing_note)}</p>\n</article>\n"
+    )
+
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _json_header(registry: PatternRegistry) -> str:
+    needs = [
+        {"name": n.name, "value": n.value, "description": registry.need_description(n)}
+        for n in registry.needs
+    ]
+    escalation = [line.strip() for line in format_escalation_level_summary() if line.strip()]
+    return f'{{"core_needs": {_json(needs)}, "escalation": {_json(escalation)}, '
+
+
+def _json_trigger(registry: PatternRegistry, trigger: TriggerType) -> str:
+    info = {
+        "name": trigger.name,
+        "value": trigger.value,
+        "description": registry.trigger_description(trigger),
+        "patterns": [p.name for p in registry.patterns_for_trigger(trigger)],
+    }
+    return f'"trigger": {_json(info)}, "cards": ['
+
+
+def _json_card(card: PatternCard) -> str:
+    return _json({
+        "pattern": card.pattern.name,
+        "value": card.pattern.value,
+        "serves_need": card.serves_need.name,
+        "description": card.description,
+        "healing_note": card.healing_note,
+    })
+
+
+# 格式 → (开头总结, 触发说明, 单张卡片, 卡片分隔符, 结尾)
+_RENDERERS: Dict[str, Tuple[Callable, Callable, Callable, str, str]] = {
+    "text": (_text_header, _text_trigger, _text_card, "", ""),
+    "markdown": (_md_header, _md_trigger, _md_card, "", ""),
+    "html": (_html_header, _html_trigger, _html_card, "", "</section>\n"),
+    "json": (_json_header, _json_trigger, _json_card, ", ", "]}\n"),
+}
+
+
+def _renderer(fmt: str) -> Tuple[Callable, Callable, Callable, str, str]:
+    try:
+        return _RENDERERS[fmt]
+    except KeyError:
+        raise ValueError(f"不支持的格式：{fmt!r}（可选：{', '.join(FORMATS)}）") from None
+
+
+# ---------------------------------------------------------------------------
+# 二、流式渲染
+# ---------------------------------------------------------------------------
+
+_header_cache: Dict[str, Tuple[PatternRegistry, str]] = {}
+
+
+def _header(fmt: str, registry: PatternRegistry) -> str:
+    """与触发无关的开头总结，按（格式, 库）缓存。"""
+    cached = _header_cache.get(fmt)
+    if cached is None or cached[0] is not registry:
+        cached = _header_cache[fmt] = (registry, _renderer(fmt)[0](registry))
+    return cached[1]
+
+
+def iter_render(trigger: TriggerType, fmt: str = "text") -> Iterator[str]:
+    """逐块产出某触发的完整输出（开头总结 → 触发说明 → 每张卡片 → 结尾）。"""
+    _, render_trigger, render_card, sep, footer = _renderer(fmt)
+    registry = get_registry()
+    yield _header(fmt, registry)
+    yield render_trigger(registry, trigger)
+    for i, card in enumerate(registry.cards_for_trigger(trigger)):
+        yield (sep if i else "") + render_card(card)
+    if footer:
+        yield footer
+
+
+def write_render(out: Any, trigger: TriggerType, fmt: str = "text", encoding: str = "utf-8") -> None:
+    """
+    把渲染结果逐块写入 out：文本流（如 sys.stdout、open(..., "w")）直接写字符串，
+    其余（二进制文件、socket.makefile("wb") 等）写编码后的字节。
+    """
+    text_mode = isinstance(out, io.TextIOBase)
+    for chunk in iter_render(trigger, fmt):
+        out.write(chunk if text_mode else chunk.encode(encoding))
+
+
+# ---------------------------------------------------------------------------
+# 三、完整输出的 LRU 缓存与批量导出
+# ---------------------------------------------------------------------------
+
+class RenderCache:
+    """按（触发, 格式）缓存完整渲染结果的有界 LRU；当前库被替换后整体作废。"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.registry: Optional[PatternRegistry] = None
+        self._entries: "OrderedDict[Tuple[Any, str], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get(self, trigger: TriggerType, fmt: str = "text") -> str:
+        registry = get_registry()
+        if registry is not self.registry:
+            self._entries.clear()
+            self.registry = registry
+        key = (trigger, fmt)
+        text = self._entries.get(key)
+        if text is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return text
+        self.misses += 1
+        text = "".join(iter_render(trigger, fmt))
+        self._entries[key] = text
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return text
+
+
+_cache = RenderCache()
+
+
+def get_render_cache() -> RenderCache:
+    return _cache
+
+
+def render(trigger: TriggerType, fmt: str = "text") -> str:
+    """某触发的完整渲染结果（走 LRU 缓存）。"""
+    return _cache.get(trigger, fmt)
+
+
+def export_all(out: Any, fmt: str = "text", triggers: Optional[Iterable[TriggerType]] = None,
+               encoding: str = "utf-8") -> int:
+    """
+    把全部（或指定的）触发渲染后一次性写入 out；json 格式输出为一个数组。
+    返回写入的字符数。
+    """
+    _renderer(fmt)
+    triggers = get_registry().triggers if triggers is None else triggers
+    pages = (render(t, fmt) for t in triggers)
+    if fmt == "json":
+        text = "[" + ",\n".join(p.rstrip("\n") for p in pages) + "]\n"
+    elif fmt == "html":
+        text = "".join(pages)
+    else:
+        text = "\n".join(pages)
+    out.write(text if isinstance(out, io.TextIOBase) else text.encode(encoding))
+    return len(text)
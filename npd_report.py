@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+批量生成事件报告：为事件日志（npd_journal 的 JSON Lines）里的每一条事件生成一份觉察报告——
+事件本身的时间、升级层级、观察到的模式与备注，后面接每个触发的 print_cards_for_trigger() 输出。
+
+    python npd_report.py incidents.jsonl -o reports.txt [-j 8] [--chunk-size 256] [--library PATH]
+
+  - 并行：事件按块（默认 256 条）分给进程池；每个工作进程启动时加载一次模式库并预渲染全部触发，
+    之后每份报告只是拼接缓存好的文本；
+  - 有序：结果按输入顺序流式写入输出文件，同时在途的块数有上限，内存占用与事件总数无关；
+  - 吞吐：运行中定期向 stderr 报告已完成份数与每秒份数；
+  - 续跑：每写完一块就把「输入读到的字节偏移 / 输出写到的字节偏移」记入旁边的 .progress.json；
+    中断后用同样的命令重跑，会截掉输出末尾未记录的部分，从断点继续（--no-resume 则从头开始）。
+
+依赖：同目录下的 npd.py、npd_journal.py、npd_render.py。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from npd import get_registry
+from npd_journal import Incident
+from npd_render import render
+
+
+PROGRESS_SUFFIX = ".progress.json"
+_PROGRESS_VERSION = 1
+DEFAULT_CHUNK_SIZE = 256
+REPORT_INTERVAL = 2.0  # 吞吐报告的间隔秒数
+
+# 一块事件：(第一条的序号, 各行文本, 读完这块后输入文件的字节偏移)
+Chunk = Tuple[int, List[str], int]
+
+
+# ---------------------------------------------------------------------------
+# 一、单份报告
+# ---------------------------------------------------------------------------
+
+def format_report(incident: Incident, index: int) -> str:
+    """一条事件的报告文本（触发部分走 npd_render 的渲染缓存）。"""
+    parts = [f"==================== 事件 #{index} · {incident.timestamp.isoformat(sep=' ')} ====================\n"]
+    if incident.stage is not None:
+        parts.append(f"升级层级：{incident.stage.name}\n")
+    if incident.patterns:
+        parts.append(f"观察到的行为模式：{'、'.join(p.name for p in incident.patterns)}\n")
+    if incident.note:
+        parts.append(f"备注：{incident.note}\n")
+    parts.append("\n")
+    if not incident.triggers:
+        parts.append("（未记录触发）\n\n")
+    for trigger in incident.triggers:
+        parts.append(render(trigger, "text"))
+    return "".join(parts)
+
+
+def _render_chunk(chunk: Chunk) -> bytes:
+    start, lines, _ = chunk
+    registry = get_registry()
+    parts = []
+    for i, line in enumerate(lines, start):
+        try:
+            parts.append(format_report(Incident.from_json(line, registry), i))
+        except (ValueError, KeyError, TypeError) as e:
+            parts.append(f"==================== 事件 #{i} ====================\n无法解析：{e}\n\n")
+    return "".join(parts).encode("utf-8")
+
+
+def _init_worker(library: Optional[str]) -> None:
+    """工作进程初始化：加载一次模式库，并预渲染全部触发，之后的报告都命中缓存。"""
+    if library:
+        from npd_library import use_library
+        use_library(library)
+    for trigger in get_registry().triggers:
+        render(trigger, "text")
+
+
+# ---------------------------------------------------------------------------
+# 二、分块读取与续跑进度
+# ---------------------------------------------------------------------------
+
+def iter_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, start_offset: int = 0,
+                start_index: int = 1) -> Iterator[Chunk]:
+    """从字节偏移 start_offset 起把非空行按 chunk_size 分块；写了一半的末行不读。"""
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        index = start_index
+        lines: List[str] = []
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            line = raw.decode("utf-8").strip()
+            if line:
+                lines.append(line)
+            if len(lines) >= chunk_size:
+                yield index, lines, offset
+                index += len(lines)
+                lines = []
+        if lines:
+            yield index, lines, offset
+
+
+def _progress_path(output: str) -> str:
+    return output + PROGRESS_SUFFIX
+
+
+def _load_progress(source: str, output: str) -> Tuple[int, int, int]:
+    """(已完成份数, 输入偏移, 输出偏移)；进度不存在或与当前输入/输出对不上时从头开始。"""
+    try:
+        with open(_progress_path(output), encoding="utf-8") as f:
+            d = json.load(f)
+        if (d.get("version") == _PROGRESS_VERSION and d["source"] == os.path.abspath(source)
+                and d["source_offset"] <= os.path.getsize(source)
+                and d["output_offset"] <= os.path.getsize(output)):
+            return d["done"], d["source_offset"], d["output_offset"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return 0, 0, 0
+
+
+def _save_progress(source: str, output: str, done: int, source_offset: int, output_offset: int) -> None:
+    tmp = _progress_path(output) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": _PROGRESS_VERSION, "source": os.path.abspath(source), "done": done,
+                   "source_offset": source_offset, "output_offset": output_offset}, f, ensure_ascii=False)
+    os.replace(tmp, _progress_path(output))
+
+
+# ---------------------------------------------------------------------------
+# 三、流水线
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ReportRun:
+    """一次运行的结果：本次生成的份数、续跑时跳过的份数、耗时与写入的字节数。"""
+    generated: int
+    resumed_from: int
+    elapsed: float
+    bytes_written: int
+
+    @property
+    def rate(self) -> float:
+        return self.generated / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _stderr_log(message: str) -> None:
+    if sys.stderr is not None:
+        print(message, file=sys.stderr, flush=True)
+
+
+def generate_reports(
+    source: str,
+    output: str,
+    jobs: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    resume: bool = True,
+    library: Optional[str] = None,
+    log: Optional[Callable[[str], None]] = _stderr_log,
+) -> ReportRun:
+    """
+    为 source 中的每条事件生成报告，按顺序写入 output。
+    jobs 为工作进程数（默认 CPU 数；1 表示在当前进程里直接生成，不起进程池）。
+    """
+    jobs = jobs or os.cpu_count() or 1
+    done, source_offset, output_offset = _load_progress(source, output) if resume else (0, 0, 0)
+    if done and log:
+        log(f"从第 {done + 1} 条事件续跑（已完成 {done} 份）")
+
+    chunks = iter_chunks(source, chunk_size, source_offset, done + 1)
+    start = time.perf_counter()
+    generated = 0
+    written = 0
+    next_report = start + REPORT_INTERVAL
+
+    mode = "r+b" if done and os.path.exists(output) else "wb"
+    with open(output, mode) as out:
+        out.seek(output_offset)
+        out.truncate()
+
+        def emit(chunk: Chunk, data: bytes) -> None:
+            nonlocal done, generated, written, output_offset, next_report
+            out.write(data)
+            out.flush()
+            done += len(chunk[1])
+            generated += len(chunk[1])
+            written += len(data)
+            output_offset += len(data)
+            _save_progress(source, output, done, chunk[2], output_offset)
+            now = time.perf_counter()
+            if log and now >= next_report:
+                log(f"已生成 {done:,} 份（{generated / (now - start):,.0f} 份/秒）")
+                next_report = now + REPORT_INTERVAL
+
+        if jobs == 1:
+            _init_worker(library)
+            for chunk in chunks:
+                emit(chunk, _render_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(library,)) as pool:
+                pending: deque = deque()
+                window = jobs * 4  # 同时在途的块数上限
+                for chunk in chunks:
+                    pending.append((chunk, pool.submit(_render_chunk, chunk)))
+                    if len(pending) >= window:
+                        head, future = pending.popleft()
+                        emit(head, future.result())
+                while pending:
+                    head, future = pending.popleft()
+                    emit(head, future.result())
+
+    run = ReportRun(generated, done - generated, time.perf_counter() - start, written)
+    if log:
+        log(f"完成：本次生成 {run.generated:,} 份，共 {done:,} 份，"
+            f"{run.elapsed:.2f} 秒，{run.rate:,.0f} 份/秒，{run.bytes_written / 1e6:.1f} MB")
+    return run
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="npd_report", description="为事件日志批量生成觉察报告")
+    parser.add_argument("source", help="事件日志（JSON Lines）")
+    parser.add_argument("-o", "--output", required=True, help="报告输出文件")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="工作进程数（默认 CPU 数）")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块的事件数")
+    parser.add_argument("--no-resume", action="store_true", help="忽略上次的进度，从头生成")
+    parser.add_argument("--library", metavar="PATH", help="使用自定义库文件（JSON / TOML）")
+    args = parser.parse_args(argv)
+    if args.library:
+        # 先在主进程里读一遍（顺带写好二进制缓存）：库文件有问题时在打开输出、起进程池之前就报错，
+        # 工作进程拿到的是已确认可用的路径
+        from npd_library import load_library
+        try:
+            load_library(args.library)
+        except (OSError, ValueError, KeyError) as e:  # LibraryError 是 ValueError
+            raise SystemExit(f"npd_report: 无法加载库文件 {args.library}：{e}")
+    generate_reports(args.source, args.output, args.jobs, args.chunk_size, not args.no_resume, args.library)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+全文检索：在卡片的表现（description）、疗愈提示（healing_note）以及触发、核心需求的说明里查找。
+
+例如输入「你想多了」，能找到「否认感受」这张卡片。
+
+  - 分词：中文按相邻两字切成二元组（单字成段时保留单字），英文/数字按词并转小写；
+  - 倒排索引：词 → {文档: 词频}，只建一次；库里追加卡片时只为新卡片建索引；
+  - 排序：BM25。每个词在当前统计量下的各文档得分在第一次查询时算好并缓存，
+    后续查询只需把几个词的得分相加再取前 N。大库（≥ NUMPY_MIN_DOCS 篇文档）且装有 NumPy 时
+    用数组向量累加，否则用字典——小库用纯 Python 更快，也省掉导入 NumPy 的启动时间。
+
+依赖：同目录下的 npd.py；NumPy 可选。
+"""
+
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from npd import PatternCard, PatternRegistry, get_registry
+
+
+NUMPY_MIN_DOCS = 500
+
+_numpy: Any = False  # False：尚未尝试导入；None：未安装
+
+
+def _load_numpy() -> Any:
+    """按需导入 NumPy（只尝试一次）。"""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+_CJK_RUN = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+_WORD = re.compile(r"[0-9A-Za-z_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """中文二元组 + 英文小写词。"""
+    tokens: List[str] = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(w.lower() for w in _WORD.findall(text))
+    return tokens
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """一条检索结果：kind 为 "pattern" / "trigger" / "need"，key 为对应的模式/触发/需求。"""
+    kind: str
+    key: Any
+    score: float
+    card: Optional[PatternCard] = None
+
+
+class SearchIndex:
+    """BM25 倒排索引；add_* 可随时追加文档，已建的部分不需要重建。"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.registry: Optional[PatternRegistry] = None
+        self._docs: List[Tuple[str, Any, Optional[PatternCard]]] = []
+        self._lengths: List[int] = []
+        self._total_length = 0
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # 词 → [(文档, BM25 词项得分)]（有 NumPy 时为 (文档数组, 得分数组)），
+        # 依赖文档数与平均文档长度，追加文档后清空、下次查询时按词重新计算
+        self._impacts: Dict[str, Any] = {}
+        self._kind_array: Any = None
+        self._indexed_cards = 0
+        self._indexed_keys: Dict[Tuple[str, Any], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add_document(self, kind: str, key: Any, text: str, card: Optional[PatternCard] = None) -> None:
+        doc_id = len(self._docs)
+        self._docs.append((kind, key, card))
+        tokens = tokenize(text)
+        self._lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        for tok in tokens:
+            posting = self._postings.setdefault(tok, {})
+            posting[doc_id] = posting.get(doc_id, 0) + 1
+        self._impacts.clear()
+        self._kind_array = None
+
+    def add_card(self, card: PatternCard) -> None:
+        p = card.pattern
+        self.add_document("pattern", p, f"{p.name} {p.value} {card.description} {card.healing_note}", card)
+
+    def sync(self, registry: PatternRegistry) -> None:
+        """
+        让索引与注册表一致：若新注册表只是在原有卡片之后追加了卡片（触发/需求说明未改），
+        只为新增部分建索引；否则整体重建。
+        """
+        if registry is self.registry:
+            return
+        old = self.registry
+        if old is not None and not self._is_extension(old, registry):
+            self.__init__(self.k1, self.b)
+        for card in registry.cards[self._indexed_cards:]:
+            self.add_card(card)
+        self._indexed_cards = len(registry.cards)
+        for t in registry.triggers:
+            desc = registry.trigger_description(t)
+            if ("trigger", t) not in self._indexed_keys:
+                self._indexed_keys[("trigger", t)] = desc
+                self.add_document("trigger", t, f"{t.name} {t.value} {desc}")
+        for n in registry.needs:
+            desc = registry.need_description(n)
+            if ("need", n) not in self._indexed_keys:
+                self._indexed_keys[("need", n)] = desc
+                self.add_document("need", n, f"{n.name} {n.value} {desc}")
+        self.registry = registry
+
+    def _is_extension(self, old: PatternRegistry, new: PatternRegistry) -> bool:
+        n = self._indexed_cards
+        if len(new.cards) < n or any(a is not b for a, b in zip(old.cards, new.cards[:n])):
+            return False
+        for (kind, key), desc in self._indexed_keys.items():
+            current = new.trigger_description(key) if kind == "trigger" else new.need_description(key)
+            if current != desc:
+                return False
+        return True
+
+    def _backend(self) -> Any:
+        """返回 NumPy 模块（大库且已安装时）或 None（用纯 Python）。"""
+        return _load_numpy() if len(self._docs) >= NUMPY_MIN_DOCS else None
+
+    def _term_impacts(self, tok: str, np: Any) -> Any:
+        impacts = self._impacts.get(tok)
+        if impacts is None:
+            posting = self._postings.get(tok, {})
+            n_docs = len(self._docs)
+            avgdl = self._total_length / n_docs if n_docs else 0.0
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            k1, b, lengths = self.k1, self.b, self._lengths
+            impacts = [
+                (d, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[d] / avgdl)))
+                for d, tf in posting.items()
+            ]
+            if np is not None:
+                impacts = (
+                    np.fromiter((d for d, _ in impacts), dtype=np.int64, count=len(impacts)),
+                    np.fromiter((w for _, w in impacts), dtype=np.float64, count=len(impacts)),
+                )
+            self._impacts[tok] = impacts
+        return impacts
+
+    def search(self, query: str, limit: int = 10, kinds: Optional[Tuple[str, ...]] = None) -> List[SearchHit]:
+        """按 BM25 得分返回最相关的至多 limit 条结果；kinds 可限定只要某几类文档。"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        np = self._backend()
+        if np is not None:
+            top = self._search_numpy(np, tokens, limit, kinds)
+        else:
+            scores: Dict[int, float] = {}
+            for tok in tokens:
+                for d, w in self._term_impacts(tok, None):
+                    scores[d] = scores.get(d, 0.0) + w
+            if kinds is not None:
+                scores = {d: s for d, s in scores.items() if self._docs[d][0] in kinds}
+            top = heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [SearchHit(*self._docs[d][:2], round(s, 6), self._docs[d][2]) for d, s in top]
+
+    def _search_numpy(self, np: Any, tokens: List[str], limit: int,
+                      kinds: Optional[Tuple[str, ...]]) -> List[Tuple[int, float]]:
+        acc = np.zeros(len(self._docs))
+        for tok in tokens:
+            ids, weights = self._term_impacts(tok, np)
+            acc[ids] += weights  # 同一个词的文档不重复，可直接向量累加
+        if kinds is not None:
+            if self._kind_array is None:
+                self._kind_array = np.array([doc[0] for doc in self._docs])
+            acc[~np.isin(self._kind_array, kinds)] = 0.0
+        hits = np.flatnonzero(acc > 0)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-acc[hits], limit - 1)[:limit]]
+        return sorted(((int(d), float(acc[d])) for d in hits), key=lambda kv: (-kv[1], kv[0]))
+
+
+_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> SearchIndex:
+    """返回与当前注册表同步的检索索引（首次调用时构建，之后按需增量更新）。"""
+    global _index
+    if _index is None:
+        _index = SearchIndex()
+    _index.sync(get_registry())
+    return _index
+
+
+def search(query: str, limit: int = 10, kinds: Optional[Tuple[str, ...]] = None) -> List[SearchHit]:
+    """在当前库的卡片与说明文字中检索，返回按相关度排序的结果。"""
+    return get_search_index().search(query, limit, kinds)
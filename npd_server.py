@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+本地 JSON API 服务（asyncio + 标准库，无第三方框架），供 Tk 窗口以外的前端读取模型数据。
+
+    python npd_server.py [--host 127.0.0.1] [--port 8765] [--library PATH]
+
+接口（只支持 GET / HEAD；{key} 可以写中文名或 value，中文需按 UTF-8 百分号编码）：
+
+    GET /triggers              全部触发：说明与可能激活的行为模式
+    GET /triggers/{key}        某触发的说明与卡片          ← get_trigger_description + get_cards_for_trigger
+    GET /needs                 全部核心需求
+    GET /needs/{key}           服务于某核心需求的卡片      ← find_patterns_by_need
+    GET /patterns/{key}        某行为模式的卡片与常见触发
+    GET /escalation            供给升级路径（供给正常 / 不足两种情况）← get_escalation_path
+    GET /health                存活检查
+
+模式库是静态的，所以全部响应（含响应头）在启动时就序列化为字节并算好 ETag；
+请求到来时只是查表与一次写入。带 If-None-Match 的请求命中时返回 304；
+HTTP/1.1 默认保持连接（keep-alive），同一连接上可连续发送多个请求。
+当前库被替换（npd.set_registry / npd_library.use_library）后，下一次请求时整表重建。
+
+压测见 benchmarks/bench_server.py。
+
+依赖：同目录下的 npd.py、npd_cli.py。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from npd import PatternRegistry, get_escalation_path, get_registry
+from npd_cli import need_record, pattern_record, trigger_record
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SERVER_NAME = "npd-server"
+
+MAX_HEADER_BYTES = 16384
+KEEPALIVE_TIMEOUT = 15.0  # 空闲连接保留的秒数
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+# ---------------------------------------------------------------------------
+# 一、预序列化的响应
+# ---------------------------------------------------------------------------
+
+class Response:
+    """一份完整响应：响应头与正文都已是字节，另备好 304 与 HEAD 用的响应头。"""
+
+    __slots__ = ("status", "body", "etag", "head", "head_close", "not_modified", "not_modified_close")
+
+    def __init__(self, status: int, payload: object):
+        self.status = status
+        self.body = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        base = (
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(self.body)}\r\n"
+            f"ETag: {self.etag}\r\n"
+            f"Cache-Control: no-cache\r\n"
+            f"Server: {SERVER_NAME}\r\n"
+        )
+        status_line = f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        self.head = (status_line + base + "\r\n").encode("ascii")
+        self.head_close = (status_line + base + "Connection: close\r\n\r\n").encode("ascii")
+        nm = f"HTTP/1.1 304 Not Modified\r\nETag: {self.etag}\r\nServer: {SERVER_NAME}\r\n"
+        self.not_modified = (nm + "\r\n").encode("ascii")
+        self.not_modified_close = (nm + "Connection: close\r\n\r\n").encode("ascii")
+
+
+def _error(status: int, message: str) -> Response:
+    return Response(status, {"error": message})
+
+
+_NOT_FOUND = _error(404, "not found")
+_BAD_REQUEST = _error(400, "bad request")
+_NOT_ALLOWED = _error(405, "method not allowed")
+
+
+def _trigger_summary(registry: PatternRegistry, trigger) -> Dict[str, object]:
+    return {
+        "name": trigger.name,
+        "value": trigger.value,
+        "description": registry.trigger_description(trigger),
+        "patterns": [p.name for p in registry.patterns_for_trigger(trigger)],
+    }
+
+
+def _escalation_payload() -> Dict[str, object]:
+    return {
+        str(failing).lower(): [{"name": s.name, "value": s.value} for s in get_escalation_path(failing)]
+        for failing in (False, True)
+    }
+
+
+class ResponseTable:
+    """路径 → 预序列化响应；每个触发 / 需求 / 模式同时以中文名与 value 登记。"""
+
+    def __init__(self, registry: PatternRegistry):
+        self.registry = registry
+        routes: Dict[str, Response] = {}
+        routes["/health"] = Response(200, {"status": "ok"})
+        routes["/escalation"] = Response(200, _escalation_payload())
+        routes["/triggers"] = Response(200, [_trigger_summary(registry, t) for t in registry.triggers])
+        routes["/needs"] = Response(200, [
+            {"name": n.name, "value": n.value, "description": registry.need_description(n)}
+            for n in registry.needs
+        ])
+        for prefix, keys, record in (
+            ("/triggers/", registry.triggers, trigger_record),
+            ("/needs/", registry.needs, need_record),
+            ("/patterns/", registry.patterns, pattern_record),
+        ):
+            for key in keys:
+                response = Response(200, record(key))
+                routes[prefix + key.name] = response
+                routes[prefix + str(key.value)] = response
+        for path in [p for p in routes if len(p) > 1]:
+            routes.setdefault(path + "/", routes[path])
+        self.routes = routes
+
+    def get(self, path: str) -> Response:
+        return self.routes.get(path, _NOT_FOUND)
+
+
+_table: Optional[ResponseTable] = None
+
+
+def get_response_table() -> ResponseTable:
+    """当前库对应的响应表（库被替换后重建）。"""
+    global _table
+    registry = get_registry()
+    if _table is None or _table.registry is not registry:
+        _table = ResponseTable(registry)
+    return _table
+
+
+# ---------------------------------------------------------------------------
+# 二、HTTP/1.1 连接处理
+# ---------------------------------------------------------------------------
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _parse_head(raw: bytes) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    """解析请求行与请求头，返回 (方法, 路径, 版本, 小写头名 → 值)；格式不对时返回 None。"""
+    try:
+        lines = raw.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        return None
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    path = unquote(target.split("?", 1)[0], encoding="utf-8", errors="replace")
+    return method, path, version, headers
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """在一条连接上依次处理请求，直到对方关闭、要求 Connection: close 或空闲超时。"""
+    try:
+        while True:
+            try:
+                raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                break
+            except asyncio.LimitOverrunError:
+                writer.write(_BAD_REQUEST.head_close + _BAD_REQUEST.body)
+                break
+            parsed = _parse_head(raw[:-4])
+            if parsed is None:
+                writer.write(_BAD_REQUEST.head_close + _BAD_REQUEST.body)
+                break
+            method, path, version, headers = parsed
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+            if "content-length" in headers:
+                # GET/HEAD 不应带正文；有的话读掉，免得污染下一个请求
+                try:
+                    await reader.readexactly(int(headers["content-length"]))
+                except (ValueError, asyncio.IncompleteReadError):
+                    break
+
+            if method in ("GET", "HEAD"):
+                response = get_response_table().get(path)
+            else:
+                response = _NOT_ALLOWED
+            inm = headers.get("if-none-match")
+            if response.status == 200 and inm is not None and _etag_matches(inm, response.etag):
+                writer.write(response.not_modified if keep_alive else response.not_modified_close)
+            else:
+                head = response.head if keep_alive else response.head_close
+                writer.write(head if method == "HEAD" else head + response.body)
+            if not keep_alive:
+                break
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    """预先构建响应表后开始监听；port=0 时由系统分配端口（见 server.sockets[0].getsockname()）。"""
+    get_response_table()
+    return await asyncio.start_server(handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    server = await start_server(host, port)
+    bound_host, bound_port = server.sockets[0].getsockname()[:2]
+    table = get_response_table()
+    print(f"npd-server 正在监听 http://{bound_host}:{bound_port}/（{len(table.routes)} 个预序列化响应）", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="npd_server", description="隐性 NPD 母亲内在程序模型 — 本地 JSON API")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口（0 表示由系统分配）")
+    parser.add_argument("--library", metavar="PATH", help="使用自定义库文件（JSON / TOML）")
+    args = parser.parse_args(argv)
+    if args.library:
+        from npd_library import use_library
+        try:
+            use_library(args.library)
+        except (OSError, ValueError, KeyError) as e:  # LibraryError 是 ValueError
+            raise SystemExit(f"npd_server: 无法加载库文件 {args.library}：{e}")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
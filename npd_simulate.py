@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+供给升级的蒙特卡洛模拟：把 EscalationLevel 当作马尔可夫链来跑。
+
+get_escalation_path() 只给出固定的「崇拜 → 恐惧 → 怜悯」顺序；这里进一步问：
+在某几个触发同时出现、而你又（不）提供供给时，一次冲突平均几回合升级？最后停在哪里？
+
+状态与每一回合的转移（k 为当前层级）：
+  - 供给恢复：你提供了当前层级想要的供给（赞美 / 顺从 / 照顾），本次冲突在第 k 级结束；
+  - 升级：没拿到供给，且触发的「压力」推动程序升到 k+1 级；在三级（怜悯）之上再升级即「程序撤退」
+    （冷处理、爱的撤回，本次冲突以疏离告终）；
+  - 停留：其余情况，继续在第 k 级拉扯。
+
+触发压力取自 TRIGGER_PRESSURE（示意性的默认值，不是临床测量），多个触发按 1 - Π(1 - q) 合并；
+supply_rate 是你在每一回合提供供给的概率——「如果我坚持这条边界」就是把它调低看看结果。
+
+装有 NumPy 时整批向量化模拟（百万级回合数秒内完成），否则退回逐个模拟的纯 Python 实现。
+同样的 seed 得到同样的结果。
+
+依赖：同目录下的 npd.py；NumPy 可选。
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from npd import EscalationLevel, TriggerType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 各触发推动程序升级的压力（每回合、未获得供给时升级的概率）
+TRIGGER_PRESSURE: Dict[TriggerType, float] = {
+    TriggerType.被批评或否定: 0.45,
+    TriggerType.孩子独立或疏远: 0.35,
+    TriggerType.设立边界: 0.40,
+    TriggerType.孩子成就超过或脱离: 0.30,
+    TriggerType.未被关注或忽视: 0.20,
+    TriggerType.被质疑或要求负责: 0.50,
+    TriggerType.孩子获得他人关注: 0.25,
+    TriggerType.暴露缺点或失败: 0.45,
+}
+DEFAULT_PRESSURE = 0.30  # 自定义库中没有列出的触发
+
+LEVELS: Tuple[EscalationLevel, ...] = tuple(EscalationLevel)
+# 终止状态：在第 1..3 级恢复供给，或程序撤退
+TERMINAL_STATES: Tuple[str, ...] = tuple(f"供给恢复·{lv.name}" for lv in LEVELS) + ("程序撤退", "未结束")
+_WITHDRAW = len(LEVELS)
+_UNFINISHED = len(LEVELS) + 1
+
+
+@dataclass(frozen=True)
+class EscalationModel:
+    """每个层级的一回合转移概率：(供给恢复, 升级, 停留)。"""
+    resolve: Tuple[float, ...]
+    escalate: Tuple[float, ...]
+
+    @property
+    def stay(self) -> Tuple[float, ...]:
+        return tuple(1.0 - r - e for r, e in zip(self.resolve, self.escalate))
+
+
+def combined_pressure(triggers: Iterable[TriggerType]) -> float:
+    """多个触发的合并压力：至少有一个触发推动升级的概率。"""
+    p_none = 1.0
+    for t in triggers:
+        p_none *= 1.0 - TRIGGER_PRESSURE.get(t, DEFAULT_PRESSURE)
+    return 1.0 - p_none
+
+
+def build_model(
+    triggers: Iterable[TriggerType],
+    supply_rate: float = 0.5,
+    compliance: Sequence[float] = (1.0, 1.0, 1.0),
+) -> EscalationModel:
+    """
+    由触发与你的供给概率构建转移模型。
+    compliance 是各层级对 supply_rate 的乘数（例如恐惧让你更容易顺从，可设为 (1.0, 1.4, 1.2)）。
+    """
+    q = combined_pressure(triggers)
+    resolve = tuple(min(1.0, max(0.0, supply_rate * c)) for c in compliance)
+    escalate = tuple((1.0 - r) * q for r in resolve)
+    return EscalationModel(resolve, escalate)
+
+
+def exact_terminal_distribution(model: EscalationModel) -> Dict[str, float]:
+    """
+    终止状态的精确分布（不限回合数）。层级只会停留或上升，
+    从第 k 级离开时恢复供给与升级的概率之比即 resolve[k] : escalate[k]。
+    """
+    dist: Dict[str, float] = {}
+    reach = 1.0
+    for k, lv in enumerate(LEVELS):
+        leave = model.resolve[k] + model.escalate[k]
+        if leave <= 0:
+            dist[TERMINAL_STATES[k]] = 0.0
+            dist["未结束"] = reach  # 永远停在这一级
+            reach = 0.0
+            continue
+        dist[TERMINAL_STATES[k]] = reach * model.resolve[k] / leave
+        reach *= model.escalate[k] / leave
+    dist["程序撤退"] = reach
+    dist.setdefault("未结束", 0.0)
+    return dist
+
+
+@dataclass
+class SimulationResult:
+    """一批模拟的汇总：终止状态计数、结束回合数、首次升到各层级的回合数。"""
+    n_episodes: int
+    terminal_counts: Dict[str, int]
+    # 每个层级（二级、三级）→ 首次到达该层级的回合数列表的分位数 {50: x, 90: y, 99: z}
+    escalation_quantiles: Dict[EscalationLevel, Dict[int, float]]
+    escalation_rates: Dict[EscalationLevel, float]
+    mean_steps: float
+
+    def terminal_distribution(self) -> Dict[str, float]:
+        return {s: n / self.n_episodes for s, n in self.terminal_counts.items()}
+
+    def summary(self) -> List[str]:
+        lines = [f"模拟冲突数：{self.n_episodes:,}，平均 {self.mean_steps:.2f} 回合结束"]
+        lines.append("终止状态：")
+        for state, share in self.terminal_distribution().items():
+            lines.append(f"  {state:<12}{share:>8.2%}")
+        lines.append("升级时间（首次到达该层级的回合数）：")
+        for lv, qs in self.escalation_quantiles.items():
+            rate = self.escalation_rates[lv]
+            if qs:
+                qtext = "，".join(f"p{p}={v:g}" for p, v in qs.items())
+                lines.append(f"  {lv.name}：{rate:.2%} 的冲突会到达；{qtext}")
+            else:
+                lines.append(f"  {lv.name}：没有冲突到达")
+        return lines
+
+
+_QUANTILES = (50, 90, 99)
+
+
+def simulate(
+    model: EscalationModel,
+    n_episodes: int = 100000,
+    max_steps: int = 100,
+    seed: Optional[int] = 0,
+) -> SimulationResult:
+    """模拟 n_episodes 次冲突，每次最多 max_steps 回合；同一 seed 结果可复现。"""
+    if np is not None:
+        return _simulate_numpy(model, n_episodes, max_steps, seed)
+    return _simulate_python(model, n_episodes, max_steps, seed)
+
+
+def _simulate_numpy(model: EscalationModel, n: int, max_steps: int, seed: Optional[int]) -> SimulationResult:
+    rng = np.random.default_rng(seed)
+    n_levels = len(LEVELS)
+    resolve = np.array(model.resolve)
+    up = resolve + np.array(model.escalate)  # u < resolve → 恢复；resolve ≤ u < up → 升级
+    level = np.zeros(n, dtype=np.int8)
+    terminal = np.full(n, _UNFINISHED, dtype=np.int8)
+    steps = np.full(n, max_steps, dtype=np.int32)
+    first = np.full((n_levels, n), -1, dtype=np.int32)
+    first[0] = 0
+    active = np.arange(n)
+    for step in range(1, max_steps + 1):
+        if not len(active):
+            break
+        lv = level[active]
+        u = rng.random(len(active))
+        done = u < resolve[lv]
+        escalated = ~done & (u < up[lv])
+        terminal[active[done]] = lv[done]
+        steps[active[done]] = step
+        esc_idx = active[escalated]
+        new_level = lv[escalated] + 1
+        withdrawn = new_level >= n_levels
+        terminal[esc_idx[withdrawn]] = _WITHDRAW
+        steps[esc_idx[withdrawn]] = step
+        moved = esc_idx[~withdrawn]
+        level[moved] = new_level[~withdrawn]
+        first[new_level[~withdrawn], moved] = step
+        active = active[~done & ~(escalated & (lv + 1 >= n_levels))]
+    counts = np.bincount(terminal, minlength=len(TERMINAL_STATES))
+    quantiles: Dict[EscalationLevel, Dict[int, float]] = {}
+    rates: Dict[EscalationLevel, float] = {}
+    for k in range(1, n_levels):
+        reached = first[k][first[k] >= 0]
+        rates[LEVELS[k]] = len(reached) / n if n else 0.0
+        quantiles[LEVELS[k]] = (
+            {p: float(v) for p, v in zip(_QUANTILES, np.percentile(reached, _QUANTILES))} if len(reached) else {}
+        )
+    return SimulationResult(
+        n,
+        {s: int(c) for s, c in zip(TERMINAL_STATES, counts)},
+        quantiles,
+        rates,
+        float(steps.mean()) if n else 0.0,
+    )
+
+
+def _percentile(sorted_values: List[int], p: int) -> float:
+    """与 NumPy 默认（线性插值）一致的分位数。"""
+    pos = (len(sorted_values) - 1) * p / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _simulate_python(model: EscalationModel, n: int, max_steps: int, seed: Optional[int]) -> SimulationResult:
+    rng = random.Random(seed)
+    n_levels = len(LEVELS)
+    counts = [0] * len(TERMINAL_STATES)
+    firsts: List[List[int]] = [[] for _ in range(n_levels)]
+    total_steps = 0
+    for _ in range(n):
+        level, outcome, step = 0, _UNFINISHED, max_steps
+        for s in range(1, max_steps + 1):
+            u = rng.random()
+            if u < model.resolve[level]:
+                outcome, step = level, s
+                break
+            if u < model.resolve[level] + model.escalate[level]:
+                level += 1
+                if level >= n_levels:
+                    outcome, step = _WITHDRAW, s
+                    break
+                firsts[level].append(s)
+        counts[outcome] += 1
+        total_steps += step
+    quantiles: Dict[EscalationLevel, Dict[int, float]] = {}
+    rates: Dict[EscalationLevel, float] = {}
+    for k in range(1, n_levels):
+        reached = sorted(firsts[k])
+        rates[LEVELS[k]] = len(reached) / n if n else 0.0
+        quantiles[LEVELS[k]] = {p: _percentile(reached, p) for p in _QUANTILES} if reached else {}
+    return SimulationResult(
+        n,
+        dict(zip(TERMINAL_STATES, counts)),
+        quantiles,
+        rates,
+        total_steps / n if n else 0.0,
+    )
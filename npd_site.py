@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+静态站点导出：把整个模型生成一组互相链接的 Markdown / HTML 页面——
+每个触发、每个行为模式、每条核心需求各一页，外加首页索引。
+
+    python npd_site.py site/ [--format html|markdown] [--library my_lib.json] [--force]
+    python npd_site.py site/ --library my_lib.json --watch       # 库文件一改就增量重建
+
+  - 增量：每页先收集它的「源」（页面用到的全部字段：卡片内容、触发 ↔ 模式映射、名称），
+    按源的 SHA-1 记入输出目录下的 .npd-site.json；源没变的页面不渲染、不写盘，
+    库里删掉的键对应的页面会被删除。模板改版（_TEMPLATE_VERSION）或换格式时整站重建，
+    旧清单里列出、新格式下不再生成的页面（例如从 html 换到 markdown 后的全部 .html）一并删除；
+  - 监视：--watch 轮询库文件的修改时间，变化后重新加载库，并与上一轮保留在内存里的源逐页比较
+    （元组直接比较，不必再算哈希），只渲染、只写入受影响的几页——改一张卡片的内容只会重写
+    该模式页与引用它的触发页；需求页与首页只列名称和链接，改名或改归属时才重写。
+    监视期间清单只在退出时写回：清单落后于页面时，下次冷启动最多多写几页，不会漏写。
+
+直接删掉输出目录里的某个页面不会被察觉（清单仍记着它），用 --force 整站重建。
+
+依赖：同目录下的 npd.py；--library / --watch 用到 npd_library.py。
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from npd import PatternRegistry, format_escalation_level_summary, get_registry
+
+
+MANIFEST_NAME = ".npd-site.json"
+_TEMPLATE_VERSION = 1
+FORMATS: Dict[str, str] = {"html": ".html", "markdown": ".md"}
+_SAFE_NAME = re.compile(r"[A-Za-z0-9_\-]+")
+
+# 页面的源：页面类型 + 用到的全部字段（只含字符串与元组，可直接比较、可稳定地 repr 后取哈希）
+Source = Tuple
+
+
+def _slug(value: str) -> str:
+    """键的 value → 文件名（自定义库的 value 不一定适合做文件名，不安全的取哈希）。"""
+    if _SAFE_NAME.fullmatch(value):
+        return value
+    return "k-" + hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# 一、每页的源
+# ---------------------------------------------------------------------------
+
+def _ref(key) -> Tuple[str, str]:
+    return (key.name, key.value)
+
+
+def iter_page_sources(registry: PatternRegistry, fmt: str = "html") -> Iterator[Tuple[str, Source]]:
+    """(相对路径, 源)：首页、每个触发、每个模式、每条需求各一页。"""
+    ext = FORMATS[fmt]
+    card_for = registry.card_for_pattern
+
+    def card_fields(pattern) -> Tuple:
+        card = card_for(pattern)
+        if card is None:
+            return (_ref(pattern), None, "", "")
+        return (_ref(pattern), _ref(card.serves_need), card.description, card.healing_note)
+
+    # 每个模式的卡片字段只取一次：模式页、触发页、需求页共用（大库上收集源是每次构建的主要开销）。
+    # 以 id() 为键：注册表里同一个键始终是同一个对象，省掉自定义键逐个计算哈希；查不到时照常现取
+    patterns = registry.patterns
+    fields = {id(p): card_fields(p) for p in patterns}
+    triggers_of: Dict[int, List[Tuple[str, str]]] = {}
+    trigger_refs = []
+    for trigger in registry.triggers:
+        ref = _ref(trigger)
+        trigger_refs.append(ref)
+        for pattern in registry.patterns_for_trigger(trigger):
+            triggers_of.setdefault(id(pattern), []).append(ref)
+
+    yield "index" + ext, (
+        "index",
+        tuple((_ref(n), registry.need_description(n)) for n in registry.needs),
+        tuple(trigger_refs),
+        tuple(f[0] for f in fields.values()),
+    )
+    for trigger, ref in zip(registry.triggers, trigger_refs):
+        yield f"triggers/{_slug(ref[1])}{ext}", (
+            "trigger", ref, registry.trigger_description(trigger),
+            tuple(fields.get(id(p)) or card_fields(p) for p in registry.patterns_for_trigger(trigger)),
+        )
+    for pattern in patterns:
+        f = fields[id(pattern)]
+        yield f"patterns/{_slug(f[0][1])}{ext}", ("pattern", f, tuple(triggers_of.get(id(pattern), ())))
+    for need in registry.needs:
+        yield f"needs/{_slug(need.value)}{ext}", (
+            "need", _ref(need), registry.need_description(need),
+            tuple((fields.get(id(c.pattern)) or card_fields(c.pattern))[0] for c in registry.cards_for_need(need)),
+        )
+
+
+def _digest(source: Source) -> str:
+    return hashlib.sha1(repr(source).encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# 二、渲染（只依赖源，不再访问注册表）
+# ---------------------------------------------------------------------------
+
+def _link(kind: str, ref: Tuple[str, str], ext: str, depth: int) -> Tuple[str, str]:
+    """(显示名, 相对链接)；depth 为当前页所在目录的层数。"""
+    directory = {"trigger": "triggers", "pattern": "patterns", "need": "needs"}[kind]
+    return ref[0], f"{'../' * depth}{directory}/{_slug(ref[1])}{ext}"
+
+
+def _blocks(source: Source, ext: str) -> Tuple[str, List[Tuple]]:
+    """
+    把源转成与格式无关的块：("h2", 文本)、("p", 文本)、("links", [(名称, 链接), ...])、
+    ("card", 标题, 链接或 None, 表现, 疗愈提示, 需求链接或 None)。返回 (页面标题, 块列表)。
+    """
+    kind = source[0]
+    depth = 0 if kind == "index" else 1
+    blocks: List[Tuple] = []
+
+    def card(fields, heading_link: bool) -> Tuple:
+        ref, need, desc, note = fields
+        return ("card", ref[0], _link("pattern", ref, ext, depth)[1] if heading_link else None, desc, note,
+                _link("need", need, ext, depth) if need is not None else None)
+
+    if kind == "index":
+        _, needs, triggers, patterns = source
+        title = "隐性NPD母亲 · 内在程序模型"
+        blocks.append(("h2", "核心需求"))
+        for ref, desc in needs:
+            blocks.append(("links", [_link("need", ref, ext, depth)]))
+            blocks.append(("p", desc))
+        blocks.append(("h2", "供给升级路径"))
+        blocks.extend(("p", line.strip()) for line in format_escalation_level_summary() if line.strip())
+        blocks.append(("h2", "触发情境"))
+        blocks.append(("links", [_link("trigger", ref, ext, depth) for ref in triggers]))
+        blocks.append(("h2", "行为模式"))
+        blocks.append(("links", [_link("pattern", ref, ext, depth) for ref in patterns]))
+    elif kind == "trigger":
+        _, ref, desc, cards = source
+        title = f"触发情境：{ref[0]}"
+        blocks.append(("p", f"含义：{desc}"))
+        blocks.append(("p", "→ 这些行为是可预测的程序输出，不是因为你做错了什么。"))
+        blocks.append(("h2", "程序可能激活的行为模式"))
+        blocks.extend(card(fields, True) for fields in cards)
+    elif kind == "pattern":
+        _, fields, triggers = source
+        title = f"行为模式：{fields[0][0]}"
+        blocks.append(card(fields, False))
+        blocks.append(("h2", "常见触发"))
+        blocks.append(("links", [_link("trigger", ref, ext, depth) for ref in triggers]) if triggers
+                      else ("p", "（无）"))
+    else:
+        _, ref, desc, patterns = source
+        title = f"核心需求：{ref[0]}"
+        blocks.append(("p", desc))
+        blocks.append(("h2", "服务于这条需求的行为模式"))
+        blocks.append(("links", [_link("pattern", p, ext, depth) for p in patterns]))
+    if kind != "index":
+        blocks.append(("links", [("← 返回首页", "../index" + ext)]))
+    return title, blocks
+
+
+def _render_markdown(source: Source) -> str:
+    title, blocks = _blocks(source, ".md")
+    parts = [f"# {title}\n\n"]
+    for block in blocks:
+        tag = block[0]
+        if tag == "h2":
+            parts.append(f"## {block[1]}\n\n")
+        elif tag == "p":
+            parts.append(f"{block[1]}\n\n")
+        elif tag == "links":
+            parts.append("".join(f"- [{name}]({href})\n" for name, href in block[1]) + "\n")
+        else:
+            _, name, href, desc, note, need = block
+            parts.append(f"### [{name}]({href})\n\n" if href else f"### {name}\n\n")
+            parts.append(f"- 表现：{desc}\n- 疗愈提示：{note}\n")
+            if need is not None:
+                parts.append(f"- 服务的核心需求：[{need[0]}]({need[1]})\n")
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _render_html(source: Source) -> str:
+    e = html.escape
+    title, blocks = _blocks(source, ".html")
+    parts = [
+        '<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{e(title)}</title>\n</head>\n<body>\n<h1>{e(title)}</h1>\n"
+    ]
+    for block in blocks:
+        tag = block[0]
+        if tag == "h2":
+            parts.append(f"<h2>{e(block[1])}</h2>\n")
+        elif tag == "p":
+            parts.append(f"<p>{e(block[1])}</p>\n")
+        elif tag == "links":
+            parts.append("<ul>\n" + "".join(f'<li><a href="{e(href)}">{e(name)}</a></li>\n'
+                                            for name, href in block[1]) + "</ul>\n")
+        else:
+            _, name, href, desc, note, need = block
+            heading = f'<a href="{e(href)}">{e(name)}</a>' if href else e(name)
+            parts.append(f'<article class="npd-card">\n<h3>{heading}</h3>\n'
+                         f"<p>表现：{e(desc)}</p>\n<p>疗愈提示：{e(note)}</p>\n")
+            if need is not None:
+                parts.append(f'<p>服务的核心需求：<a href="{e(need[1])}">{e(need[0])}</a></p>\n')
+            parts.append("</article>\n")
+    parts.append("</body>\n</html>\n")
+    return "".join(parts)
+
+
+_RENDERERS: Dict[str, Callable[[Source], str]] = {"html": _render_html, "markdown": _render_markdown}
+
+
+def render_page(source: Source, fmt: str = "html") -> str:
+    return _RENDERERS[fmt](source)
+
+
+# ---------------------------------------------------------------------------
+# 三、增量构建
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SiteBuild:
+    """一次构建的结果：写入 / 未变 / 删除的页数与耗时（秒）。"""
+    written: int
+    unchanged: int
+    removed: int
+    elapsed: float
+
+
+class SiteBuilder:
+    """
+    输出目录的增量构建器。冷启动时按清单里的源哈希判断哪些页要重写；
+    同一个实例连续构建（监视模式）时直接与上一轮的源比较。
+    """
+
+    def __init__(self, out_dir: str, fmt: str = "html"):
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式：{fmt!r}（可选：{', '.join(FORMATS)}）")
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self._manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self._orphans: List[str] = []  # 旧清单（别的格式或模板版本）里的页面：首次构建时删掉新站点不再生成的
+        self._digests: Dict[str, str] = self._load_manifest()
+        self._sources: Dict[str, Source] = {}
+        self._dirty_manifest = False
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                d = json.load(f)
+            pages = dict(d["pages"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+        if d.get("version") == _TEMPLATE_VERSION and d.get("format") == self.fmt:
+            return pages
+        self._orphans = list(pages)
+        return {}
+
+    def save_manifest(self) -> None:
+        """把各页的源哈希写回清单（原子替换）；没有变化时什么也不做。"""
+        if not self._dirty_manifest:
+            return
+        os.makedirs(self.out_dir, exist_ok=True)
+        tmp = self._manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _TEMPLATE_VERSION, "format": self.fmt, "pages": self._digests},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self._manifest_path)
+        self._dirty_manifest = False
+
+    def _write(self, relpath: str, text: str) -> None:
+        path = os.path.join(self.out_dir, relpath)
+        try:
+            f = open(path, "w", encoding="utf-8", newline="\n")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, "w", encoding="utf-8", newline="\n")
+        with f:
+            f.write(text)
+
+    def build(self, registry: Optional[PatternRegistry] = None, force: bool = False,
+              save_manifest: bool = True) -> SiteBuild:
+        """构建（或增量更新）整站；force=True 时忽略清单，全部重写。"""
+        start = time.perf_counter()
+        registry = registry or get_registry()
+        render = _RENDERERS[self.fmt]
+        previous, digests = self._sources, self._digests
+        if force:
+            previous, digests = {}, {}
+        sources: Dict[str, Source] = {}
+        written = unchanged = 0
+        for relpath, source in iter_page_sources(registry, self.fmt):
+            sources[relpath] = source
+            old = previous.get(relpath)
+            if old is not None and old == source:
+                unchanged += 1
+                continue
+            digest = _digest(source)
+            if digests.get(relpath) == digest:
+                unchanged += 1
+                continue
+            self._write(relpath, render(source))
+            digests[relpath] = digest
+            written += 1
+
+        removed = 0
+        stale = [p for p in self._orphans if p not in sources and p not in self._digests]
+        self._orphans = []
+        for relpath in stale + [p for p in self._digests if p not in sources]:
+            digests.pop(relpath, None)
+            try:
+                os.remove(os.path.join(self.out_dir, relpath))
+            except FileNotFoundError:
+                pass
+            removed += 1
+
+        self._sources, self._digests = sources, digests
+        if written or removed or force:
+            self._dirty_manifest = True
+        if save_manifest:
+            self.save_manifest()
+        return SiteBuild(written, unchanged, removed, time.perf_counter() - start)
+
+
+def build_site(out_dir: str, fmt: str = "html", registry: Optional[PatternRegistry] = None,
+               force: bool = False) -> SiteBuild:
+    """一次性构建：只重写源有变化的页面。"""
+    return SiteBuilder(out_dir, fmt).build(registry, force)
+
+
+def watch(library: str, out_dir: str, fmt: str = "html", interval: float = 0.5, force: bool = False,
+          log: Callable[[str], None] = print, max_builds: Optional[int] = None) -> None:
+    """
+    监视库文件，修改后重新加载并增量重建（Ctrl+C 退出）。
+    force=True 时第一轮整站重写；max_builds 主要供测试限制轮数。
+    """
+    from npd_library import load_library
+    builder = SiteBuilder(out_dir, fmt)
+    mtime = None
+    builds = 0
+    try:
+        while max_builds is None or builds < max_builds:
+            try:
+                current = os.stat(library).st_mtime_ns
+            except FileNotFoundError:
+                current = None
+            if current is not None and current != mtime:
+                mtime = current
+                start = time.perf_counter()
+                try:
+                    registry = load_library(library)
+                except (OSError, ValueError, KeyError) as e:
+                    log(f"库文件无法加载，等待下一次修改：{e}")
+                else:
+                    loaded = time.perf_counter() - start
+                    result = builder.build(registry, force=force and builds == 0, save_manifest=False)
+                    log(f"写入 {result.written} 页、删除 {result.removed} 页、未变 {result.unchanged} 页"
+                        f"（加载库 {loaded * 1000:.0f} ms，更新站点 {result.elapsed * 1000:.1f} ms）")
+                builds += 1
+                continue
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        builder.save_manifest()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="npd_site", description="把模型导出为静态站点（增量更新）")
+    parser.add_argument("out_dir", help="输出目录")
+    parser.add_argument("--format", choices=tuple(FORMATS), default="html")
+    parser.add_argument("--library", metavar="PATH", help="使用自定义库文件（JSON / TOML）")
+    parser.add_argument("--force", action="store_true", help="忽略清单，整站重写")
+    parser.add_argument("--watch", action="store_true", help="监视 --library 指定的库文件，修改后增量重建")
+    parser.add_argument("--interval", type=float, default=0.5, help="监视时检查修改的间隔秒数")
+    args = parser.parse_args(argv)
+    if args.watch:
+        if not args.library:
+            parser.error("--watch 需要同时指定 --library")
+        print(f"正在监视 {args.library} → {args.out_dir}（Ctrl+C 退出）")
+        watch(args.library, args.out_dir, args.format, args.interval, args.force)
+        return 0
+    registry = None
+    if args.library:
+        from npd_library import load_library
+        try:
+            registry = load_library(args.library)
+        except (OSError, ValueError, KeyError) as e:
+            raise SystemExit(f"npd_site: 无法加载库文件 {args.library}：{e}")
+    result = build_site(args.out_dir, args.format, registry, args.force)
+    print(f"写入 {result.written} 页、删除 {result.removed} 页、未变 {result.unchanged} 页（{result.elapsed * 1000:.1f} ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
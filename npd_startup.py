@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+启动计时：把一次启动拆成几个阶段，看冷启动的时间花在哪里、随库变大是否在变慢。
+
+  - 阶段：interpreter（操作系统创建进程 → 本模块被导入，含解释器初始化；打包的 exe 还含引导程序）、
+    import（其余模块导入完）、data（注册表载入完、首屏数据备好）、window（窗口与控件建好）、
+    paint（窗口首次映射并绘制完）、ready（延后构建的卡片面板等也完成）；
+    每个阶段记的是「从上一阶段结束到本阶段结束」的耗时，没有经过的阶段不出现；
+  - 进程创建时间：Linux 读 /proc（按时钟滴答，精度约 10 ms），Windows 用 GetProcessTimes；取不到时 interpreter 阶段缺省，
+    其余阶段从本模块被导入时算起；
+  - 记录：write() 向文件追加一行 JSON（时间、是否为打包程序、各阶段毫秒数），
+    多次启动的记录放在一起就能跟踪冷启动的变化；无界面的基准见 benchmarks/bench_startup.py。
+
+入口脚本应尽早导入本模块（在 tkinter 等重模块之前），再在各阶段结束处调用 startup_timer.mark()：
+
+    from npd_startup import startup_timer
+    ...
+    startup_timer.mark("import")
+
+依赖：仅标准库。
+"""
+
+import time
+
+_IMPORTED_AT = time.perf_counter()  # 先于其余导入取时刻：本模块自身的导入算进 import 阶段
+
+import os  # noqa: E402
+import sys  # noqa: E402
+from typing import Dict, List, Optional, Tuple  # noqa: E402
+
+PHASES = ("interpreter", "import", "data", "window", "paint", "ready")
+PHASE_LABELS = {
+    "interpreter": "解释器启动",
+    "import": "导入模块",
+    "data": "载入数据",
+    "window": "构建窗口",
+    "paint": "首次绘制",
+    "ready": "界面就绪",
+}
+LOG_ENV = "NPD_STARTUP_LOG"  # 设置后图形界面每次启动都把计时追加到这个文件
+
+
+def process_age() -> Optional[float]:
+    """本进程从操作系统创建起已运行的秒数；平台不支持时返回 None。"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/stat", "rb") as f:
+                stat = f.read()
+            with open("/proc/uptime", "rb") as f:
+                uptime = float(f.read().split()[0])
+            # 第 2 个字段（进程名）可能含空格，从右括号之后数：starttime 是其后的第 20 个字段
+            start_ticks = int(stat[stat.rindex(b")") + 2:].split()[19])
+            return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+            kernel32 = ctypes.windll.kernel32
+            created, exited, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(created),
+                                            ctypes.byref(exited), ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+
+            def ticks(ft):  # 100 纳秒为单位
+                return ft.dwHighDateTime << 32 | ft.dwLowDateTime
+            return max(0.0, (ticks(now) - ticks(created)) / 1e7)
+        except (AttributeError, OSError):
+            return None
+    return None
+
+
+class StartupTimer:
+    """各启动阶段的结束时刻（相对进程创建；取不到进程创建时间时相对本模块被导入）。"""
+
+    def __init__(self):
+        age = process_age()
+        self.origin = _IMPORTED_AT - (age if age is not None else 0.0)
+        self._marks: List[Tuple[str, float]] = []
+        if age is not None:
+            self._marks.append(("interpreter", _IMPORTED_AT - self.origin))
+
+    def mark(self, phase: str) -> float:
+        """记下 phase 在此刻结束，返回从起点到现在的秒数。同一阶段重复标记时以第一次为准。"""
+        elapsed = time.perf_counter() - self.origin
+        if phase not in self.marks():
+            self._marks.append((phase, elapsed))
+        return elapsed
+
+    def marks(self) -> Dict[str, float]:
+        """阶段 → 该阶段结束时距起点的秒数。"""
+        return dict(self._marks)
+
+    def phases(self) -> Dict[str, float]:
+        """阶段 → 该阶段本身的耗时（秒）。"""
+        out, last = {}, 0.0
+        for phase, at in self._marks:
+            out[phase] = at - last
+            last = at
+        return out
+
+    @property
+    def total(self) -> float:
+        return self._marks[-1][1] if self._marks else 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        from datetime import datetime
+        return {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "phases_ms": {p: round(s * 1000, 1) for p, s in self.phases().items()},
+            "total_ms": round(self.total * 1000, 1),
+        }
+
+    def report(self) -> str:
+        """一行可读摘要，如「解释器启动 41 ms · 导入模块 52 ms · …（共 190 ms）」。"""
+        parts = [f"{PHASE_LABELS.get(p, p)} {s * 1000:.0f} ms" for p, s in self.phases().items()]
+        return " · ".join(parts) + f"（共 {self.total * 1000:.0f} ms）"
+
+    def write(self, path: str) -> None:
+        """向 path 追加一行 JSON 记录（写不了时静默跳过：计时不能影响启动）。"""
+        import json
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.as_dict(), ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+
+startup_timer = StartupTimer()
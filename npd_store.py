@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+事件库（SQLite）：npd_journal 的可选存储后端，适合多年数据上的仪表盘式提问——
+「最近 90 天里『设立边界』有多少次引出了『爱的撤回』？」「每个月哪条核心需求占主导？」
+
+  - 表结构以 TriggerType / BehaviorPattern / CoreNeed 的 value 为键（跨库稳定，与 .jsonl 日志一致）；
+  - 索引：incidents(ts)，以及 (触发, ts)、(模式, ts)、(需求, ts) 三张无 rowid 的关联表，
+    按时间、触发、模式、需求筛选事件都走索引；
+  - 汇总：每次写入在同一事务里增量更新按日（daily_counts）与按周（weekly_counts，键为周一日期）的计数，
+    涵盖事件数、触发、模式、需求、升级层级以及（触发, 模式）组合。时间窗统计只读汇总表，
+    行数与天数成正比、与事件数无关，几年的数据也是毫秒级；按月统计由按日汇总聚合得到。
+
+    with IncidentStore("incidents.sqlite") as store:
+        store.append(new_incident([TriggerType.设立边界], [BehaviorPattern.爱的撤回]))
+        store.pair_count(TriggerType.设立边界, BehaviorPattern.爱的撤回, since=date.today() - timedelta(days=90))
+        store.dominant("need", period="month")
+
+时间窗按自然日计算：since / until 可以是 date 或 datetime（只取日期部分），两端都包含。
+
+    python npd_store.py import journal.jsonl incidents.sqlite     # 从事件日志导入
+    python npd_store.py stats incidents.sqlite [--days 90]
+
+依赖：同目录下的 npd.py、npd_journal.py；标准库 sqlite3。
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from npd import (
+    BehaviorPattern,
+    CoreNeed,
+    EscalationLevel,
+    PatternRegistry,
+    TriggerType,
+    get_registry,
+)
+from npd_journal import Incident, iter_incidents
+
+
+SCHEMA_VERSION = 1
+KINDS = ("incident", "trigger", "pattern", "need", "stage", "pair")
+PERIODS = ("day", "week", "month")
+_EPOCH = datetime(1970, 1, 1)
+
+Day = Union[date, datetime, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id       INTEGER PRIMARY KEY,
+    ts       INTEGER NOT NULL,          -- 1970-01-01 起的秒数（本地时间，不带时区）
+    day      TEXT    NOT NULL,          -- YYYY-MM-DD
+    stage    INTEGER,
+    triggers TEXT    NOT NULL,          -- JSON 数组（value，保持记录时的顺序）
+    patterns TEXT    NOT NULL,
+    note     TEXT    NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS incidents_ts ON incidents(ts);
+
+CREATE TABLE IF NOT EXISTS incident_triggers (
+    trigger TEXT NOT NULL, ts INTEGER NOT NULL, incident_id INTEGER NOT NULL,
+    PRIMARY KEY (trigger, ts, incident_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incident_patterns (
+    pattern TEXT NOT NULL, ts INTEGER NOT NULL, incident_id INTEGER NOT NULL,
+    PRIMARY KEY (pattern, ts, incident_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incident_needs (
+    need TEXT NOT NULL, ts INTEGER NOT NULL, incident_id INTEGER NOT NULL,
+    PRIMARY KEY (need, ts, incident_id)
+) WITHOUT ROWID;
+
+-- 增量汇总：kind 见 KINDS；key2 只在 kind = 'pair' 时是模式 value，其余为空串
+CREATE TABLE IF NOT EXISTS daily_counts (
+    kind TEXT NOT NULL, day TEXT NOT NULL, key TEXT NOT NULL, key2 TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (kind, day, key, key2)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS weekly_counts (
+    kind TEXT NOT NULL, week TEXT NOT NULL, key TEXT NOT NULL, key2 TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (kind, week, key, key2)
+) WITHOUT ROWID;
+-- 主键按 (kind, 时段) 排列，服务「某时间窗内的排行」；下面的索引服务「某个键的计数 / 序列」
+CREATE INDEX IF NOT EXISTS daily_counts_key ON daily_counts(kind, key, key2, day);
+CREATE INDEX IF NOT EXISTS weekly_counts_key ON weekly_counts(kind, key, key2, week);
+"""
+
+
+def _day(value: Optional[Day]) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def _week_of(day: date) -> str:
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def _value(key) -> str:
+    return key if isinstance(key, str) else key.value
+
+
+class IncidentStore:
+    """
+    SQLite 事件库。接口与 IncidentJournal 对齐（append / 迭代 / len / *_counts），
+    另加时间窗统计：count、pair_count、series、dominant、top 与按条件取事件的 query。
+    """
+
+    def __init__(self, path: str, registry: Optional[PatternRegistry] = None, readonly: bool = False):
+        """readonly=True 时以只读方式打开已有的库（只统计、不建表也不改日志模式），写入会报 sqlite3.OperationalError。"""
+        self.path = path
+        self.registry = registry or get_registry()
+        if readonly:
+            self._db = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._db.close()
+                raise ValueError(f"不是事件库或版本不受支持：{version}（当前为 {SCHEMA_VERSION}）")
+            return
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f"不支持的事件库版本：{version}（当前为 {SCHEMA_VERSION}）")
+        with self._db:
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "IncidentStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- 写入 ------------------------------------------------------------
+
+    def append(self, incident: Incident) -> int:
+        """写入一条事件并更新日 / 周汇总（同一事务），返回事件 id。"""
+        return self.extend((incident,))[0]
+
+    def extend(self, incidents: Iterable[Incident]) -> List[int]:
+        """批量写入：全部事件与汇总增量在一个事务里提交，汇总按 (kind, key, 日期) 合并后一次更新。"""
+        card_for = self.registry.card_for_pattern
+        daily: Counter = Counter()
+        ids: List[int] = []
+        links: Tuple[List[Tuple], ...] = ([], [], [])
+        db = self._db
+        with db:
+            for inc in incidents:
+                ts = int((inc.timestamp.replace(tzinfo=None) - _EPOCH).total_seconds())
+                day = inc.timestamp.date().isoformat()
+                triggers = [t.value for t in inc.triggers]
+                patterns = [p.value for p in inc.patterns]
+                # 同一事件里服务同一需求的多个模式只计一次（与 JournalStats 一致）
+                needs = list(dict.fromkeys(
+                    card.serves_need.value for card in map(card_for, inc.patterns) if card is not None))
+                stage = inc.stage.value if inc.stage is not None else None
+                cur = db.execute(
+                    "INSERT INTO incidents(ts, day, stage, triggers, patterns, note) VALUES (?, ?, ?, ?, ?, ?)",
+                    (ts, day, stage, json.dumps(triggers, ensure_ascii=False),
+                     json.dumps(patterns, ensure_ascii=False), inc.note),
+                )
+                rowid = cur.lastrowid
+                ids.append(rowid)
+                links[0].extend((t, ts, rowid) for t in triggers)
+                links[1].extend((p, ts, rowid) for p in patterns)
+                links[2].extend((n, ts, rowid) for n in needs)
+
+                daily[("incident", day, "", "")] += 1
+                for t in dict.fromkeys(triggers):
+                    daily[("trigger", day, t, "")] += 1
+                    for p in dict.fromkeys(patterns):
+                        daily[("pair", day, t, p)] += 1
+                for p in dict.fromkeys(patterns):
+                    daily[("pattern", day, p, "")] += 1
+                for n in needs:
+                    daily[("need", day, n, "")] += 1
+                if stage is not None:
+                    daily[("stage", day, str(stage), "")] += 1
+
+            for table, rows in zip(("incident_triggers", "incident_patterns", "incident_needs"), links):
+                db.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?, ?, ?)", rows)
+            weekly: Counter = Counter()
+            for (kind, day, key, key2), n in daily.items():
+                weekly[(kind, _week_of(date.fromisoformat(day)), key, key2)] += n
+            db.executemany(
+                "INSERT INTO daily_counts(kind, day, key, key2, n) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(kind, day, key, key2) DO UPDATE SET n = n + excluded.n",
+                [(*k, n) for k, n in daily.items()],
+            )
+            db.executemany(
+                "INSERT INTO weekly_counts(kind, week, key, key2, n) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(kind, week, key, key2) DO UPDATE SET n = n + excluded.n",
+                [(*k, n) for k, n in weekly.items()],
+            )
+        return ids
+
+    def import_journal(self, path: str, batch_size: int = 5000) -> int:
+        """把 npd_journal 的 .jsonl 日志流式导入，返回导入的条数。"""
+        total = 0
+        batch: List[Incident] = []
+        for incident in iter_incidents(path, 0, self.registry):
+            batch.append(incident)
+            if len(batch) >= batch_size:
+                total += len(self.extend(batch))
+                batch = []
+        if batch:
+            total += len(self.extend(batch))
+        return total
+
+    # -- 读取事件 ----------------------------------------------------------
+
+    def _incident(self, row: Tuple) -> Incident:
+        ts, stage, triggers, patterns, note = row
+        lookup = self.registry.lookup
+        return Incident(
+            timestamp=_EPOCH + timedelta(seconds=ts),
+            triggers=tuple(k for k in (lookup("trigger", v) for v in json.loads(triggers)) if k),
+            patterns=tuple(k for k in (lookup("pattern", v) for v in json.loads(patterns)) if k),
+            stage=EscalationLevel(stage) if stage is not None else None,
+            note=note,
+        )
+
+    def query(
+        self,
+        since: Optional[Day] = None,
+        until: Optional[Day] = None,
+        trigger: Optional[TriggerType] = None,
+        pattern: Optional[BehaviorPattern] = None,
+        need: Optional[CoreNeed] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Incident]:
+        """按时间窗与触发 / 模式 / 需求筛选事件（按时间顺序逐条产出）。"""
+        sql = ["SELECT i.ts, i.stage, i.triggers, i.patterns, i.note FROM incidents i"]
+        where: List[str] = []
+        params: List[Any] = []
+        for table, column, key in (("incident_triggers", "trigger", trigger),
+                                   ("incident_patterns", "pattern", pattern),
+                                   ("incident_needs", "need", need)):
+            if key is not None:
+                alias = column[0]
+                sql.append(f"JOIN {table} {alias} ON {alias}.incident_id = i.id AND {alias}.{column} = ?")
+                params.append(_value(key))
+        lo, hi = _day(since), _day(until)
+        if lo is not None:
+            where.append("i.ts >= ?")
+            params.append(int((datetime.fromisoformat(lo) - _EPOCH).total_seconds()))
+        if hi is not None:
+            where.append("i.ts < ?")
+            params.append(int((datetime.fromisoformat(hi) + timedelta(days=1) - _EPOCH).total_seconds()))
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append("ORDER BY i.ts, i.id")
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(limit)
+        for row in self._db.execute(" ".join(sql), params):
+            yield self._incident(row)
+
+    def __iter__(self) -> Iterator[Incident]:
+        return self.query()
+
+    def __len__(self) -> int:
+        return self.count("incident")
+
+    # -- 时间窗统计（只读汇总表） ------------------------------------------
+
+    @staticmethod
+    def _window(column: str, since: Optional[Day], until: Optional[Day]) -> Tuple[str, List[str]]:
+        clauses, params = [], []
+        if since is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(_day(since))
+        if until is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(_day(until))
+        return "".join(f" AND {c}" for c in clauses), params
+
+    def count(self, kind: str, key=None, since: Optional[Day] = None, until: Optional[Day] = None) -> int:
+        """某个触发 / 模式 / 需求 / 升级层级（kind="incident" 时为全部事件）在时间窗内出现的事件数。"""
+        extra, params = self._window("day", since, until)
+        k = "" if key is None else str(_value(key))
+        row = self._db.execute(
+            f"SELECT COALESCE(SUM(n), 0) FROM daily_counts INDEXED BY daily_counts_key "
+            f"WHERE kind = ? AND key = ? AND key2 = ''{extra}",
+            [kind, k, *params],
+        ).fetchone()
+        return row[0]
+
+    def pair_count(self, trigger: TriggerType, pattern: BehaviorPattern,
+                   since: Optional[Day] = None, until: Optional[Day] = None) -> int:
+        """时间窗内同时记录了该触发与该模式的事件数（「设立边界」引出「爱的撤回」的次数）。"""
+        extra, params = self._window("day", since, until)
+        row = self._db.execute(
+            f"SELECT COALESCE(SUM(n), 0) FROM daily_counts INDEXED BY daily_counts_key "
+            f"WHERE kind = 'pair' AND key = ? AND key2 = ?{extra}",
+            [_value(trigger), _value(pattern), *params],
+        ).fetchone()
+        return row[0]
+
+    def _grouped(self, kind: str, period: str, since: Optional[Day], until: Optional[Day],
+                 key=None) -> List[Tuple[str, str, int]]:
+        if period not in PERIODS:
+            raise ValueError(f"period 应为 {PERIODS} 之一：{period}")
+        if period == "week":
+            table, column, bucket = "weekly_counts", "week", "week"
+            # 周汇总以周一为键：时间窗的起点对齐到所在周的周一
+            since = _week_of(date.fromisoformat(_day(since))) if since is not None else None
+        else:
+            table, column = "daily_counts", "day"
+            bucket = "day" if period == "day" else "substr(day, 1, 7)"
+        extra, params = self._window(column, since, until)
+        source = table
+        if key is not None:
+            source += f" INDEXED BY {table}_key"
+            extra += " AND key = ?"
+            params.append(str(_value(key)))
+        return self._db.execute(
+            f"SELECT {bucket} AS bucket, key, SUM(n) FROM {source} "
+            f"WHERE kind = ? AND key2 = ''{extra} GROUP BY bucket, key ORDER BY bucket, SUM(n) DESC, key",
+            [kind, *params],
+        ).fetchall()
+
+    def series(self, kind: str, key=None, period: str = "day",
+               since: Optional[Day] = None, until: Optional[Day] = None) -> List[Tuple[str, Any, int]]:
+        """按日 / 周 / 月的计数序列：[(时段, 键, 次数), ...]；时段为 YYYY-MM-DD（周为周一）或 YYYY-MM。"""
+        return [(bucket, self._resolve(kind, k), n) for bucket, k, n in self._grouped(kind, period, since, until, key)]
+
+    def dominant(self, kind: str = "need", period: str = "month",
+                 since: Optional[Day] = None, until: Optional[Day] = None) -> List[Tuple[str, Any, int]]:
+        """每个时段里出现最多的触发 / 模式 / 需求：[(时段, 键, 次数), ...]。"""
+        best: Dict[str, Tuple[str, int]] = {}
+        for bucket, k, n in self._grouped(kind, period, since, until):
+            if bucket not in best:  # 每个时段内已按次数降序
+                best[bucket] = (k, n)
+        return [(bucket, self._resolve(kind, k), n) for bucket, (k, n) in best.items()]
+
+    def top(self, kind: str, since: Optional[Day] = None, until: Optional[Day] = None,
+            limit: Optional[int] = None) -> Dict[Any, int]:
+        """时间窗内按次数降序的计数（键解析为当前库中的枚举成员，库中没有的保留 value）。"""
+        extra, params = self._window("day", since, until)
+        sql = (f"SELECT key, SUM(n) AS total FROM daily_counts WHERE kind = ? AND key2 = ''{extra} "
+               "GROUP BY key ORDER BY total DESC, key")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return {self._resolve(kind, k): n for k, n in self._db.execute(sql, [kind, *params])}
+
+    def _resolve(self, kind: str, key: str):
+        if kind == "stage":
+            return EscalationLevel(int(key))
+        if kind == "incident":
+            return key
+        return self.registry.lookup(kind, key) or key
+
+    # -- 与 IncidentJournal 对齐的累计计数 -----------------------------------
+
+    def trigger_counts(self) -> Dict[TriggerType, int]:
+        return self.top("trigger")
+
+    def pattern_counts(self) -> Dict[BehaviorPattern, int]:
+        return self.top("pattern")
+
+    def need_counts(self) -> Dict[CoreNeed, int]:
+        return self.top("need")
+
+    def stage_counts(self) -> Dict[EscalationLevel, int]:
+        return self.top("stage")
+
+
+# ---------------------------------------------------------------------------
+# 命令行
+# ---------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="npd_store", description="SQLite 事件库：导入事件日志、查看时间窗统计")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="把 .jsonl 事件日志导入事件库")
+    p.add_argument("journal")
+    p.add_argument("database")
+    p = sub.add_parser("stats", help="时间窗内的触发、模式、需求排行与每月主导需求")
+    p.add_argument("database")
+    p.add_argument("--days", type=int, help="只看最近 N 天（默认全部）")
+    args = parser.parse_args(argv)
+
+    with IncidentStore(args.database) as store:
+        if args.command == "import":
+            print(f"已导入 {store.import_journal(args.journal):,} 条事件")
+            return 0
+        since = date.today() - timedelta(days=args.days - 1) if args.days else None
+        print(f"事件数：{store.count('incident', since=since):,}")
+        for kind, label in (("trigger", "触发"), ("pattern", "行为模式"), ("need", "核心需求")):
+            ranked = store.top(kind, since=since, limit=5)
+            print(f"{label}：" + "、".join(f"{getattr(k, 'name', k)}×{n}" for k, n in ranked.items()))
+        for month, need, n in store.dominant("need", "month", since=since):
+            print(f"  {month}  {getattr(need, 'name', need)}（{n}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
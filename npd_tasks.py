@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+图形界面的后台执行层：把慢操作（检索、识别整份聊天记录、批量导出、事件统计）交给线程池 / 进程池，
+Tk 主线程只负责按帧轮询、把结果交回界面。
+
+  - 线程任务：func(ctx, *args)，ctx 是 TaskContext——ctx.progress(done, total, message) 汇报进度，
+    ctx.check() / ctx.cancelled 响应取消；适合 I/O 与会释放 GIL 的工作；
+  - 进程任务：func(*args)（process=True），适合纯 Python 的 CPU 密集工作；func 与参数须可 pickle，
+    不支持进度，取消只能阻止尚未开始的任务、或丢弃已在运行的任务的结果；
+  - 通道（channel）：同一通道上提交新任务时，旧任务自动取消、其结果被丢弃——例如结果还没回来
+    用户就选了另一个触发，旧结果不会再覆盖界面；
+  - 轮询：结果与进度经线程安全的队列回到主线程，由 widget.after() 每帧（POLL_MS）取一次，
+    每次最多处理 FRAME_BUDGET_MS 毫秒的回调，剩下的留到下一帧；没有在途任务时不轮询。
+
+    runner = TaskRunner(app)
+    runner.submit(slow_search, "你想多了", channel="search",
+                  on_done=show_hits, on_progress=lambda done, total, msg: status.set(msg))
+
+依赖：标准库 concurrent.futures；只用到 widget 的 after() / after_cancel()，不导入 tkinter。
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor  # 进程池到用时才导入（会带进 multiprocessing）
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+POLL_MS = 16          # 轮询间隔（约一帧）
+FRAME_BUDGET_MS = 8   # 每次轮询最多用于回调的时间，保证主循环不会被结果处理卡住超过一帧
+
+Progress = Tuple[int, Optional[int], str]
+
+
+class TaskCancelled(Exception):
+    """任务已被取消；线程任务里 ctx.check() 抛出，由执行层吞掉。"""
+
+
+class TaskContext:
+    """传给线程任务的句柄：查询是否已取消、汇报进度（只保留最新一次，主线程按帧读取）。"""
+
+    __slots__ = ("_cancel", "_progress", "_task_id")
+
+    def __init__(self, cancel: threading.Event, progress: Dict[int, Progress], task_id: int):
+        self._cancel = cancel
+        self._progress = progress
+        self._task_id = task_id
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def progress(self, done: int, total: Optional[int] = None, message: str = "") -> None:
+        self._progress[self._task_id] = (done, total, message)  # 单次字典赋值，GIL 下是原子的
+
+
+class Task:
+    """一个已提交的任务。cancel() 之后它的任何回调都不会再被调用。"""
+
+    __slots__ = ("id", "channel", "future", "on_done", "on_error", "on_progress", "_cancel")
+
+    def __init__(self, task_id: int, channel: Optional[str], on_done, on_error, on_progress):
+        self.id = task_id
+        self.channel = channel
+        self.future: Optional[Future] = None
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskRunner:
+    """
+    绑定到某个 Tk 控件的后台任务执行器。线程池在构造时创建（最多 max_threads 个线程），
+    进程池在第一次提交进程任务时才创建。窗口关闭前调用 shutdown()。
+    """
+
+    def __init__(self, widget: Any, max_threads: Optional[int] = 4, max_processes: Optional[int] = None,
+                 poll_ms: int = POLL_MS, budget_ms: float = FRAME_BUDGET_MS):
+        self._widget = widget
+        self._threads = ThreadPoolExecutor(max_threads, thread_name_prefix="npd-task")
+        self._processes: Optional[Executor] = None
+        self._max_processes = max_processes
+        self._poll_ms = poll_ms
+        self._budget = budget_ms / 1000
+        self._finished: "queue.SimpleQueue[Task]" = queue.SimpleQueue()
+        self._progress: Dict[int, Progress] = {}
+        self._tasks: Dict[int, Task] = {}
+        self._channels: Dict[str, Task] = {}
+        self._next_id = 0
+        self._poll_job: Optional[str] = None
+        self._closed = False
+
+    # -- 提交与取消 --------------------------------------------------------
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        channel: Optional[str] = None,
+        process: bool = False,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        on_progress: Optional[Callable[[int, Optional[int], str], None]] = None,
+    ) -> Task:
+        """提交任务；回调都在主线程调用。给了 channel 时，先取消该通道上尚未结束的任务。"""
+        if self._closed:
+            raise RuntimeError("TaskRunner 已关闭")
+        if channel is not None:
+            self.cancel(channel)
+        self._next_id += 1
+        task = Task(self._next_id, channel, on_done, on_error, on_progress)
+        if process:
+            if self._processes is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._processes = ProcessPoolExecutor(self._max_processes)
+            task.future = self._processes.submit(func, *args)
+        else:
+            ctx = TaskContext(task._cancel, self._progress, task.id)
+            task.future = self._threads.submit(func, ctx, *args)
+        self._tasks[task.id] = task
+        if channel is not None:
+            self._channels[channel] = task
+        task.future.add_done_callback(lambda _f, t=task: self._finished.put(t))  # 可能在工作线程里调用
+        self._schedule()
+        return task
+
+    def cancel(self, channel: str) -> None:
+        """取消某通道上的任务（没有则什么也不做）。"""
+        task = self._channels.pop(channel, None)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._channels.clear()
+
+    def busy(self, channel: Optional[str] = None) -> bool:
+        """是否有在途任务（给了 channel 时只看该通道）。"""
+        if channel is not None:
+            task = self._channels.get(channel)
+            return task is not None and not task.cancelled
+        return any(not t.cancelled for t in self._tasks.values())
+
+    def shutdown(self) -> None:
+        """取消全部任务、停止轮询并关闭池（不等待正在运行的任务）。"""
+        self._closed = True
+        self.cancel_all()
+        if self._poll_job is not None:
+            try:
+                self._widget.after_cancel(self._poll_job)
+            except Exception:
+                pass
+            self._poll_job = None
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    # -- 主线程轮询 --------------------------------------------------------
+
+    def _schedule(self) -> None:
+        if self._poll_job is None and not self._closed:
+            self._poll_job = self._widget.after(self._poll_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._poll_job = None
+        deadline = time.perf_counter() + self._budget
+        try:
+            for task_id in list(self._progress):
+                done, total, message = self._progress.pop(task_id)
+                task = self._tasks.get(task_id)
+                if task is not None and not task.cancelled and task.on_progress is not None:
+                    task.on_progress(done, total, message)
+            while time.perf_counter() < deadline:
+                try:
+                    task = self._finished.get_nowait()
+                except queue.Empty:
+                    break
+                self._deliver(task)
+        finally:
+            # 回调抛出的异常交给 Tk 报告，轮询照常继续
+            if self._tasks:
+                self._schedule()
+
+    def _deliver(self, task: Task) -> None:
+        self._tasks.pop(task.id, None)
+        self._progress.pop(task.id, None)
+        if task.channel is not None and self._channels.get(task.channel) is task:
+            del self._channels[task.channel]
+        if task.cancelled or task.future.cancelled():
+            return  # 被取消或已被同通道的新任务取代：丢弃结果
+        error = task.future.exception()
+        if isinstance(error, TaskCancelled):
+            return
+        if error is not None:
+            if task.on_error is not None:
+                task.on_error(error)
+            else:
+                raise error
+        elif task.on_done is not None:
+            task.on_done(task.future.result())
@@ -4,17 +4,37 @@
 
 依赖：同目录下的 npd.py（逻辑与数据）。
 交互：左侧选择触发情境 → 上方固定显示三条 CoreNeed 与供给升级路径 → 中间为当前 PatternCard，左右翻页查看。
+「识别原话…」：粘贴对方说过的话，列出匹配的行为模式与可能的触发，双击跳到对应卡片（见 npd_classify.py）。
+每张卡片下方附「我的防御策略」：当前触发 + 该模式下排名靠前的应对做法（见 npd_defense.py，随卡片页一起预渲染）。
+「导出全部…」「事件统计…」以及大库的卡片渲染、原话识别都在后台执行（见 npd_tasks.py）：
+进度显示在底部状态栏，可随时取消；结果回来前又换了触发或重新识别，旧结果直接丢弃。
+左侧搜索框边输入边过滤触发与行为模式（中文名、value 或拼音首字母，见 npd_lookup.py）；
+连续按键只在停顿 FILTER_DEBOUNCE_MS 后刷新一次列表，选中模式时跳到包含它的触发下的那张卡片。
+--journal 指定事件日志时，卡片下方显示「接下来可能」：按日志学到的、在当前触发下出现该模式之后
+最常接着出现的模式（见 npd_predict.py；日志在后台读取，之后新追加的事件在切换触发时补读）。
+启动时先画出骨架（状态栏、搜索框与触发列表、空的右侧框架），窗口首次映射后再建程序核心、升级路径图与卡片面板；
+防御策略、序列预测等只在第一次用到时导入，搜索索引与事件日志在首次绘制之后才开始后台加载。
+各启动阶段的耗时（见 npd_startup.py）用 --startup-log 或环境变量 NPD_STARTUP_LOG 追加记录到文件。
 """
 
+from npd_startup import LOG_ENV, startup_timer  # 先于其余导入：计时从这里开始算导入阶段
+
+import argparse
+import io
+import os
+import sys
 import tkinter as tk
-from tkinter import ttk, font as tkfont
-from typing import List, Optional
+from tkinter import ttk, filedialog, font as tkfont
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from npd_tasks import TaskRunner
 
 try:
     from npd import (
         TriggerType,
         CoreNeed,
         get_cards_for_trigger,
+        get_registry,
         get_trigger_description,
         describe_trigger_and_patterns,
     )
@@ -23,6 +43,7 @@ except ImportError:
     TriggerType = None
     CoreNeed = None
     get_cards_for_trigger = None
+    get_registry = None
     get_trigger_description = None
     describe_trigger_and_patterns = None
     PatternCard = None
@@ -39,33 +60,198 @@ def _build_core_need_titles_only() -> str:
     if CoreNeed is None:
         return "【未找到 npd 模块】"
     lines = ["【三条核心需求】", ""]
-    for need in CoreNeed:
+    for need in get_registry().needs:
         lines.append(f"  · {need.name}")
     return "\n".join(lines)
 
 
-def _card_to_display_text(card: "PatternCard") -> str:
-    return (
+def prepare_startup_data(library: Optional[str] = None, compact: bool = False) -> Tuple[Tuple[TriggerType, ...], str]:
+    """
+    首屏要用的数据：换上 library 指定的库（给了时；compact 为真时以列式紧凑形式加载）后的触发列表与核心需求标题。
+    不碰 tkinter，benchmarks/bench_startup.py 在无界面环境下用它测载入数据阶段。
+    """
+    if library:
+        from npd_library import use_library
+        use_library(library, compact=compact)
+    return get_registry().triggers, _build_core_need_titles_only()
+
+
+def _card_to_display_text(card: "PatternCard", strategies: Sequence[str] = ()) -> str:
+    text = (
         f"【{card.pattern.name}】\n\n"
         f"表现：\n{card.description}\n\n"
         f"疗愈提示：\n{card.healing_note}"
     )
+    if strategies:
+        text += "\n\n我的防御策略：\n" + "\n".join(strategies)
+    return text
+
+
+FILTER_DEBOUNCE_MS = 80  # 搜索框停止输入这么久后才刷新列表
+# 卡片数不超过它的触发直接在主线程渲染；更多时（大型自定义库）交给后台线程
+SYNC_PAGE_LIMIT = 200
+_JOB_CHANNELS = ("export", "summary", "predict")  # 状态栏「取消」作用的后台任务
+_EXPORT_FORMATS = {".md": "markdown", ".html": "html", ".htm": "html", ".json": "json"}
+
+
+# ---------------------------------------------------------------------------
+# 后台任务（线程任务的第一个参数是 npd_tasks.TaskContext；ctx 为 None 时即在主线程直接调用）
+# ---------------------------------------------------------------------------
+
+def _render_pages(ctx, trigger: TriggerType) -> Tuple[str, ...]:
+    """某触发的全部卡片页（连同防御策略推荐）；每张卡片检查一次是否已取消。"""
+    from npd_defense import format_strategies, recommend as recommend_strategies
+    pages = []
+    for card in get_cards_for_trigger(trigger):
+        if ctx is not None:
+            ctx.check()
+        pages.append(_card_to_display_text(card, format_strategies(recommend_strategies(trigger, card.pattern))))
+    return tuple(pages)
+
+
+def _classify_text(ctx, text: str):
+    from npd_classify import get_classifier
+    return get_classifier().classify(text, limit=8, keep_spans=True)
+
+
+def _export_file(ctx, path: str, fmt: str) -> int:
+    """把全部触发渲染到内存再一次写入 path；取消时不留下写了一半的文件。"""
+    from npd_render import export_all
+    triggers = get_registry().triggers
+
+    def tracked():
+        for i, trigger in enumerate(triggers):
+            ctx.check()
+            ctx.progress(i, len(triggers), f"正在导出 {i:,} / {len(triggers):,} 个触发…")
+            yield trigger
+
+    buf = io.StringIO()
+    n = export_all(buf, fmt, tracked())
+    ctx.check()
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(buf.getvalue())
+    return n
+
+
+def _warm_lookup(ctx) -> None:
+    from npd_lookup import get_lookup_index
+    get_lookup_index()
+
+
+def _load_predictor(ctx, path: str):
+    from npd_predict import SequencePredictor
+    return SequencePredictor.for_journal(path)
+
+
+def _summarize_incident_file(path: str, library: Optional[str] = None, compact: bool = False) -> Dict[str, Any]:
+    """
+    （进程池）统计事件日志 .jsonl、事件库 .sqlite 或事件归档 .npda 中的事件，计数以 value 为键。
+    只读：不封口日志末行、不写汇总缓存、不给事件库建表。子进程按 library 自行载入与界面相同的库，
+    库里自定义的键才不会被当成未知值丢掉。
+    """
+    if library:
+        from npd_library import load_library
+        registry = load_library(library, compact=compact)
+    else:
+        registry = get_registry()
+    if path.lower().endswith(".npda"):
+        from npd_archive import IncidentArchive
+        with IncidentArchive(path, registry) as archive:
+            counts = {"count": len(archive)}
+            for kind in ("trigger", "pattern", "need"):
+                counts[kind + "s"] = {getattr(k, "value", k): n for k, n in archive.counts(kind).items()}
+            return counts
+    if path.lower().endswith((".sqlite", ".sqlite3", ".db")):
+        from npd_store import IncidentStore
+        with IncidentStore(path, registry, readonly=True) as store:
+            summary: Dict[str, Any] = {"count": len(store)}
+            for kind in ("trigger", "pattern", "need"):
+                summary[kind + "s"] = {getattr(k, "value", k): n for k, n in store.top(kind).items()}
+            return summary
+    from npd_journal import JournalStats, iter_incidents
+    stats = JournalStats()
+    for incident in iter_incidents(path, 0, registry):
+        stats.add(incident, registry)
+    return stats.to_dict()
 
 
 class NPDApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, journal: Optional[str] = None, startup_log: Optional[str] = None,
+                 library: Optional[str] = None, compact: bool = False):
         super().__init__()
         self.title("隐性NPD父母 · 内在程序模型")
         self.minsize(800, 560)
         self.geometry("900x600")
 
         # 当前选中的 trigger 及该 trigger 下的卡片列表、当前索引
+        self._triggers: Tuple[TriggerType, ...] = get_registry().triggers if get_registry else ()
         self._current_trigger: Optional[TriggerType] = None
-        self._cards: List[PatternCard] = []
+        self._cards: Sequence[PatternCard] = ()
         self._card_index: int = 0
 
+        # 预渲染的卡片页（按触发缓存；库被替换后作废）与文本框中当前显示的页
+        self._page_cache: Dict[TriggerType, Tuple[str, ...]] = {}
+        self._page_cache_registry = None
+        self._shown_page: Optional[int] = None
+        self._nav_enabled: Optional[bool] = None
+        # 键盘翻页：连续按键先累计，空闲时只重绘一次
+        self._pending_delta = 0
+        self._page_key_job: Optional[str] = None
+        self._classify_window: Optional[tk.Toplevel] = None
+        self._summary_window: Optional[tk.Toplevel] = None
+        # 后台任务：大库的卡片渲染、原话识别、导出与事件统计
+        self._tasks = TaskRunner(self)
+        self._pending_pattern = None  # 卡片还在后台渲染时，渲染完要翻到的模式
+        self._predictor = None        # 按事件日志学习的序列预测（npd_predict.SequencePredictor）
+        # 左侧列表每一行对应的（触发, 模式）；模式为 None 的是触发行
+        self._list_rows: List[Tuple[Any, Any]] = [(t, None) for t in self._triggers]
+        self._filter_job: Optional[str] = None
+        # 启动：先画骨架，首次映射后再建卡片面板、开始后台加载
+        self._journal = journal
+        self._startup_log = startup_log
+        # 启动时载入的库：进程池的子进程按它重新载入（子进程里只有内置库）
+        self._library = library
+        self._compact = compact
+        self._panels_built = False
+
         self._setup_fonts()
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._map_binding: Optional[str] = self.bind("<Map>", self._on_first_map)
+
+    def _on_first_map(self, event):
+        # 根窗口的绑定也会收到每个子控件的 <Map>：只认窗口本身，且只处理一次
+        if event.widget is not self or self._map_binding is None:
+            return
+        self.unbind("<Map>", self._map_binding)
+        self._map_binding = None
+        self.after_idle(self._after_first_paint)
+
+    def _after_first_paint(self):
+        """骨架已显示：补建其余面板，再把搜索索引与事件日志交给后台。"""
+        self.update_idletasks()  # 骨架的重绘也排在空闲回调里：先让它们画完
+        startup_timer.mark("paint")
+        self._ensure_panels()
+        self.update_idletasks()
+        startup_timer.mark("ready")
+        if self._startup_log:
+            startup_timer.write(self._startup_log)
+        if self._triggers:
+            self._tasks.submit(_warm_lookup, channel="lookup")  # 搜索框的索引在后台预先建好
+        if self._journal:
+            self._start_job("predict", "读取事件日志", _load_predictor, self._journal,
+                            on_done=self._on_predictor_ready)
+
+    def _on_close(self):
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._tasks.shutdown()
+        if self._predictor is not None:
+            try:
+                self._predictor.checkpoint()  # 下次启动只补读新增的事件
+            except OSError:
+                pass
+        self.destroy()
 
     def _setup_fonts(self):
         """确保有可用中文字体。"""
@@ -101,12 +287,27 @@ class NPDApp(tk.Tk):
         hint.pack(anchor=tk.W, pady=(2, 0))
 
     def _build_ui(self):
+        # 底部状态栏：后台任务的进度与取消
+        status = ttk.Frame(self, padding=(8, 0, 8, 6))
+        status.pack(side=tk.BOTTOM, fill=tk.X)
+        self._status_var = tk.StringVar(value="")
+        ttk.Label(status, textvariable=self._status_var).pack(side=tk.LEFT)
+        self._btn_cancel = ttk.Button(status, text="取消", command=self._cancel_jobs)
+        self._btn_cancel.pack(side=tk.RIGHT)
+        self._btn_cancel.state(["disabled"])
+
         main = ttk.Frame(self, padding=8)
         main.pack(fill=tk.BOTH, expand=True)
 
-        # 左侧：触发情境列表
+        # 左侧：搜索框 + 触发情境列表
         left = ttk.LabelFrame(main, text="触发情境", padding=6)
         left.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 8))
+        self._filter_var = tk.StringVar(value="")
+        self._filter_entry = ttk.Entry(left, textvariable=self._filter_var, font=FONT_UI)
+        self._filter_entry.pack(fill=tk.X, pady=(0, 4))
+        self._filter_var.trace_add("write", lambda *_: self._on_filter_change())
+        self._filter_entry.bind("<Return>", lambda e: self._pick_first_row())
+        self._filter_entry.bind("<Escape>", lambda e: self._filter_var.set(""))
         self._trigger_listbox = tk.Listbox(
             left,
             font=FONT_UI,
@@ -118,18 +319,31 @@ class NPDApp(tk.Tk):
         )
         self._trigger_listbox.pack(fill=tk.BOTH, expand=True)
         self._trigger_listbox.bind("<<ListboxSelect>>", self._on_trigger_select)
-        if TriggerType is not None:
-            for t in TriggerType:
-                self._trigger_listbox.insert(tk.END, t.name)
+        for t in self._triggers:
+            self._trigger_listbox.insert(tk.END, t.name)
+        ttk.Button(left, text="识别原话…", command=self._open_classifier).pack(fill=tk.X, pady=(6, 0))
+        ttk.Button(left, text="导出全部…", command=self._export_all).pack(fill=tk.X, pady=(4, 0))
+        ttk.Button(left, text="事件统计…", command=self._open_incident_summary).pack(fill=tk.X, pady=(4, 0))
 
         # 右侧：上方固定 CoreNeed + Escalation，中间卡片 + 翻页
         right = ttk.Frame(main)
         right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        # 上方固定：CoreNeed（仅标题）与供给升级路径图
-        top_frame = ttk.LabelFrame(right, text="程序核心", padding=6)
-        top_frame.pack(fill=tk.X, pady=(0, 8))
-
+        # 上方固定：CoreNeed（仅标题）与供给升级路径图；中间：当前 PatternCard。
+        # 首屏只放两个空框架，里面的控件由 _build_panels 在首次绘制后补建
+        self._top_frame = ttk.LabelFrame(right, text="程序核心", padding=6)
+        self._top_frame.pack(fill=tk.X, pady=(0, 8))
+        self._card_frame = ttk.LabelFrame(right, text="行为模式卡片", padding=8)
+        self._card_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 8))
+
+    def _ensure_panels(self):
+        """卡片面板还没建时现在建（通常在首次绘制后；最迟在第一次显示卡片前）。"""
+        if not self._panels_built:
+            self._panels_built = True
+            self._build_panels()
+
+    def _build_panels(self):
+        top_frame, card_frame = self._top_frame, self._card_frame
         self._core_need_var = tk.StringVar(value=_build_core_need_titles_only())
         core_lbl = tk.Label(
             top_frame,
@@ -146,10 +360,6 @@ class NPDApp(tk.Tk):
         esc_canvas_frame.pack(fill=tk.X, pady=(10, 0))
         self._build_escalation_diagram(esc_canvas_frame)
 
-        # 中间：当前 PatternCard
-        card_frame = ttk.LabelFrame(right, text="行为模式卡片", padding=8)
-        card_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 8))
-
         self._card_text = tk.Text(
             card_frame,
             font=FONT_UI,
@@ -161,6 +371,10 @@ class NPDApp(tk.Tk):
         )
         self._card_text.pack(fill=tk.BOTH, expand=True)
 
+        # 接下来可能出现的模式（只有 --journal 时有内容）
+        self._next_var = tk.StringVar(value="")
+        ttk.Label(card_frame, textvariable=self._next_var, foreground="gray").pack(anchor=tk.W, pady=(6, 0))
+
         # 页码与翻页按钮
         nav_frame = ttk.Frame(card_frame)
         nav_frame.pack(fill=tk.X, pady=(8, 0))
@@ -176,75 +390,442 @@ class NPDApp(tk.Tk):
         self._btn_next = ttk.Button(btn_frame, text="下一页 →", command=self._next_card)
         self._btn_next.pack(side=tk.LEFT, padx=2)
 
-        self._update_card_display()
+        # 键盘翻页：←/→ 与 PgUp/PgDn
+        for seq, delta in (("<Left>", -1), ("<Prior>", -1), ("<Right>", 1), ("<Next>", 1)):
+            self.bind(seq, lambda e, d=delta: self._on_page_key(d))
+
+        self._show_placeholder()
 
     def _on_trigger_select(self, event):
         w = event.widget
         sel = w.curselection()
-        if not sel or TriggerType is None:
+        if not sel:
             return
         idx = int(sel[0])
-        triggers = list(TriggerType)
-        if idx < 0 or idx >= len(triggers):
+        if idx < 0 or idx >= len(self._list_rows):
+            return
+        trigger, pattern = self._list_rows[idx]
+        if trigger is None:
+            self._status_var.set(f"「{pattern.name}」没有关联的触发情境")
+        elif pattern is None:
+            self._show_trigger(trigger)
+        else:
+            self._open_card(trigger, pattern)
+
+    # -- 搜索框 ------------------------------------------------------------
+
+    def _on_filter_change(self):
+        """每次按键只重置计时；停顿 FILTER_DEBOUNCE_MS 后才真正过滤一次。"""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DEBOUNCE_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        query = self._filter_var.get()
+        if not query.strip():
+            rows = [(t, None) for t in self._triggers]
+            labels = [t.name for t in self._triggers]
+            total = len(rows)
+        else:
+            from npd_lookup import get_lookup_index
+            entries, total = get_lookup_index().filter(query)
+            rows = [(e.trigger, None if e.kind == "trigger" else e.key) for e in entries]
+            labels = [e.key.name if e.kind == "trigger" else f"  {e.key.name}（模式）" for e in entries]
+        self._list_rows = rows
+        lb = self._trigger_listbox
+        lb.delete(0, tk.END)
+        if labels:
+            lb.insert(tk.END, *labels)
+        self._mark_current_row()
+        if query.strip():
+            more = f"，只列出前 {len(rows):,} 项" if total > len(rows) else ""
+            self._status_var.set(f"找到 {total:,} 项{more}" if total else "没有匹配的触发或模式")
+        else:
+            self._status_var.set("")
+
+    def _pick_first_row(self):
+        if self._filter_job is not None:  # 还没刷新就按了回车：先过滤
+            self.after_cancel(self._filter_job)
+            self._apply_filter()
+        if self._list_rows:
+            lb = self._trigger_listbox
+            lb.selection_clear(0, tk.END)
+            lb.selection_set(0)
+            lb.event_generate("<<ListboxSelect>>")
+
+    def _mark_current_row(self, pattern=None):
+        """在左侧列表中选中当前触发（或其下的 pattern）所在的行；被过滤掉时不选。"""
+        lb = self._trigger_listbox
+        lb.selection_clear(0, tk.END)
+        trigger = self._current_trigger
+        if trigger is None:
             return
-        self._current_trigger = triggers[idx]
-        self._cards = get_cards_for_trigger(self._current_trigger) if get_cards_for_trigger else []
+        for target in ((trigger, pattern), (trigger, None)):
+            if target in self._list_rows:
+                idx = self._list_rows.index(target)
+                lb.selection_set(idx)
+                lb.see(idx)
+                return
+
+    def _show_trigger(self, trigger: TriggerType):
+        if trigger == self._current_trigger:
+            return
+        self._ensure_panels()
+        self._current_trigger = trigger
         self._card_index = 0
+        self._pending_pattern = None
+        if self._predictor is not None:
+            self._predictor.refresh()  # 补读其他程序新追加的事件（没有时只是一次 stat）
+        cards = get_cards_for_trigger(trigger) if get_cards_for_trigger else ()
+        pages = self._cached_pages(trigger)
+        if pages is None and len(cards) > SYNC_PAGE_LIMIT:
+            # 大库：后台渲染，先显示占位；渲染完成前又选了别的触发，这次的结果会被丢弃
+            self._cards = ()
+            self._load_pages([f"正在加载 {len(cards):,} 张卡片…"])
+            self._card_text.tag_configure("page0", elide=False)
+            self._shown_page = 0
+            self._page_var.set("正在加载…")
+            self._set_nav_enabled(False)
+            registry = get_registry()
+            self._tasks.submit(
+                _render_pages, trigger, channel="pages",
+                on_done=lambda pages: self._on_pages_ready(registry, trigger, pages),
+            )
+            return
+        self._tasks.cancel("pages")
+        self._cards = cards
+        self._load_pages(pages if pages is not None else self._pages_for(trigger))
         self._update_card_display()
 
-    def _prev_card(self):
-        if not self._cards:
+    def _on_pages_ready(self, registry, trigger: TriggerType, pages: Tuple[str, ...]):
+        if registry is not get_registry():
+            return  # 渲染期间库被替换：结果已过期
+        if self._cached_pages(trigger) is None:
+            self._page_cache[trigger] = pages
+        if trigger != self._current_trigger:
             return
-        self._card_index = (self._card_index - 1) % len(self._cards)
+        self._cards = get_cards_for_trigger(trigger)
+        self._load_pages(pages)
+        pattern, self._pending_pattern = self._pending_pattern, None
+        self._card_index = next((i for i, c in enumerate(self._cards) if c.pattern == pattern), 0)
         self._update_card_display()
 
+    def _select_trigger(self, trigger: TriggerType, pattern=None):
+        """在左侧列表中选中 trigger 并显示其卡片；给了 pattern 时翻到该模式的卡片。"""
+        if trigger not in self._triggers:
+            return
+        self._open_card(trigger, pattern)
+        self._mark_current_row(pattern)
+
+    def _open_card(self, trigger: TriggerType, pattern=None):
+        """显示 trigger 的卡片；给了 pattern 时翻到该模式的卡片。"""
+        self._show_trigger(trigger)
+        if self._tasks.busy("pages"):
+            self._pending_pattern = pattern  # 卡片还在后台渲染，完成后再翻页
+            return
+        for i, card in enumerate(self._cards):
+            if card.pattern == pattern:
+                self._card_index = i
+                self._update_card_display()
+                break
+
+    # -- 识别原话 ----------------------------------------------------------
+
+    def _open_classifier(self):
+        if self._classify_window is not None and self._classify_window.winfo_exists():
+            self._classify_window.lift()
+            return
+        win = self._classify_window = tk.Toplevel(self)
+        win.title("识别原话")
+        win.geometry("520x420")
+        frame = ttk.Frame(win, padding=8)
+        frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text="粘贴对方说过的话（可以是整段聊天记录）：").pack(anchor=tk.W)
+        self._classify_input = tk.Text(frame, font=FONT_UI, wrap=tk.WORD, height=7, undo=True)
+        self._classify_input.pack(fill=tk.BOTH, expand=True, pady=(4, 6))
+        self._classify_input.tag_configure("hit", background="#ffe08a")
+        ttk.Button(frame, text="识别", command=self._run_classifier).pack(anchor=tk.E)
+        ttk.Label(frame, text="结果（双击跳到对应卡片）：").pack(anchor=tk.W, pady=(6, 0))
+        self._classify_results = tk.Listbox(frame, font=FONT_UI, height=8, activestyle=tk.NONE)
+        self._classify_results.pack(fill=tk.BOTH, expand=True, pady=(4, 0))
+        self._classify_results.bind("<Double-Button-1>", self._on_classify_pick)
+        self._classify_rows: List[Tuple[object, object]] = []
+        self._classify_input.focus_set()
+
+    def _run_classifier(self):
+        text = self._classify_input.get("1.0", "end-1c")
+        self._classify_results.delete(0, tk.END)
+        self._classify_results.insert(tk.END, "正在识别…")
+        self._classify_rows = []
+        # 整份聊天记录（以及首次使用时构建词表自动机）可能较慢：放到后台，重复点击只保留最后一次
+        self._tasks.submit(_classify_text, text, channel="classify",
+                           on_done=lambda result: self._show_classification(text, result))
+
+    def _show_classification(self, text: str, result):
+        if self._classify_window is None or not self._classify_window.winfo_exists():
+            return
+        box = self._classify_input
+        box.tag_remove("hit", "1.0", tk.END)
+        if box.get("1.0", "end-1c") == text:  # 识别期间改过输入时，偏移已对不上，不再高亮
+            for start, end, _ in result.spans:
+                box.tag_add("hit", f"1.0+{start}c", f"1.0+{end}c")
+        lb = self._classify_results
+        lb.delete(0, tk.END)
+        self._classify_rows = []
+        registry = get_registry()
+        for s in result.patterns:
+            # 跳转用的触发：优先取结果中最可能、且包含该模式的触发
+            trigger = next((t.key for t in result.triggers if s.key in registry.patterns_for_trigger(t.key)), None)
+            trigger = trigger or next((t for t in self._triggers if s.key in registry.patterns_for_trigger(t)), None)
+            lb.insert(tk.END, f"{s.confidence:6.1%}  模式：{s.key.name}（{'、'.join(s.phrases)}）")
+            self._classify_rows.append((trigger, s.key))
+        for s in result.triggers:
+            lb.insert(tk.END, f"{s.confidence:6.1%}  触发：{s.key.name}")
+            self._classify_rows.append((s.key, None))
+        if not result:
+            lb.insert(tk.END, "没有识别出已知的说法。")
+
+    def _on_classify_pick(self, event):
+        sel = self._classify_results.curselection()
+        if not sel or sel[0] >= len(self._classify_rows):
+            return
+        trigger, pattern = self._classify_rows[sel[0]]
+        if trigger is not None:
+            self._select_trigger(trigger, pattern)
+
+    # -- 导出与事件统计（后台） ----------------------------------------------
+
+    def _start_job(self, channel: str, label: str, func, *args, process: bool = False, on_done=None):
+        """提交一个可取消的后台任务，进度与结果显示在状态栏。"""
+        def finished(result):
+            self._job_finished()
+            if on_done is not None:
+                on_done(result)
+
+        def failed(error):
+            self._job_finished()
+            self._status_var.set(f"{label}失败：{error}")
+
+        self._tasks.submit(
+            func, *args, channel=channel, process=process, on_done=finished, on_error=failed,
+            on_progress=lambda done, total, message: self._status_var.set(message),
+        )
+        self._status_var.set(f"正在{label}…")
+        self._btn_cancel.state(["!disabled"])
+
+    def _on_predictor_ready(self, predictor):
+        self._predictor = predictor
+        self._status_var.set(f"已从事件日志学习 {predictor.count:,} 条事件")
+        if self._cards:
+            self._update_next_hint()
+
+    def _update_next_hint(self):
+        """当前触发下、出现当前卡片的模式之后，最可能接着出现的模式（每次查询只有几十微秒）。"""
+        if self._predictor is None:
+            return
+        pattern = self._cards[self._card_index].pattern
+        from npd_predict import format_predictions
+        predictions = self._predictor.predict(self._current_trigger, (pattern,), limit=3)
+        self._next_var.set(f"接下来可能：{format_predictions(predictions)}" if predictions else "")
+
+    def _job_finished(self):
+        self._status_var.set("")
+        if not any(self._tasks.busy(channel) for channel in _JOB_CHANNELS):
+            self._btn_cancel.state(["disabled"])
+
+    def _cancel_jobs(self):
+        for channel in _JOB_CHANNELS:
+            self._tasks.cancel(channel)
+        self._btn_cancel.state(["disabled"])
+        self._status_var.set("已取消")
+
+    def _export_all(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, title="导出全部触发", defaultextension=".txt",
+            filetypes=[("文本", "*.txt"), ("Markdown", "*.md"), ("HTML", "*.html"), ("JSON", "*.json")],
+        )
+        if not path:
+            return
+        fmt = _EXPORT_FORMATS.get(os.path.splitext(path)[1].lower(), "text")
+        self._start_job("export", "导出", _export_file, path, fmt,
+                        on_done=lambda n: self._status_var.set(f"已导出到 {path}（{n:,} 字）"))
+
+    def _open_incident_summary(self):
+        path = filedialog.askopenfilename(
+            parent=self, title="选择事件日志、事件库或事件归档",
+            filetypes=[("事件日志", "*.jsonl"), ("事件库", "*.sqlite *.sqlite3 *.db"), ("事件归档", "*.npda"),
+                       ("全部文件", "*.*")],
+        )
+        if not path:
+            return
+        # 逐行解析整份日志是纯 Python 的 CPU 密集工作：交给进程池
+        self._start_job("summary", "统计事件", _summarize_incident_file, path,
+                        self._library, self._compact, process=True,
+                        on_done=lambda summary: self._show_summary(path, summary))
+
+    def _show_summary(self, path: str, summary: Dict[str, Any]):
+        win = self._summary_window
+        if win is None or not win.winfo_exists():
+            win = self._summary_window = tk.Toplevel(self)
+            win.geometry("420x460")
+            self._summary_text = tk.Text(win, font=FONT_UI, wrap=tk.WORD, padx=8, pady=8)
+            self._summary_text.pack(fill=tk.BOTH, expand=True)
+        win.title(f"事件统计 · {os.path.basename(path)}")
+        registry = get_registry()
+        lines = [f"事件数：{summary.get('count', 0):,}", ""]
+        for kind, title in (("trigger", "触发"), ("pattern", "行为模式"), ("need", "核心需求")):
+            counts = summary.get(kind + "s", {})
+            lines.append(f"【{title}】")
+            for value, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+                key = registry.lookup(kind, value)
+                lines.append(f"  {key.name if key is not None else value}：{n:,}")
+            lines.append("")
+        text = self._summary_text
+        text.config(state=tk.NORMAL)
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, "\n".join(lines))
+        text.config(state=tk.DISABLED)
+        win.lift()
+
+    # -- 卡片页 ------------------------------------------------------------
+
+    def _cached_pages(self, trigger: TriggerType) -> Optional[Tuple[str, ...]]:
+        registry = get_registry()
+        if registry is not self._page_cache_registry:
+            self._page_cache.clear()
+            self._page_cache_registry = registry
+        return self._page_cache.get(trigger)
+
+    def _pages_for(self, trigger: TriggerType) -> Tuple[str, ...]:
+        """该触发下所有卡片页的显示文本（连同防御策略推荐只渲染一次，翻页时不再计算）。"""
+        pages = self._cached_pages(trigger)
+        if pages is None:
+            pages = self._page_cache[trigger] = _render_pages(None, trigger)
+        return pages
+
+    def _load_pages(self, pages: Sequence[str]):
+        """
+        切换触发时把全部卡片页一次写入文本框，每页一个 tag（page0, page1, ...）并先全部隐藏；
+        翻页只需切换两个 tag 的 elide，不再删除、重插文本。
+        """
+        text = self._card_text
+        text.config(state=tk.NORMAL)
+        text.delete("1.0", tk.END)
+        for i, page in enumerate(pages):
+            tag = f"page{i}"
+            text.tag_configure(tag, elide=True)
+            text.insert(tk.END, page + "\n", (tag,))
+        text.config(state=tk.DISABLED)
+        self._shown_page = None
+
+    def _show_placeholder(self):
+        self._load_pages(["选择左侧任一触发情境后，此处将显示对应的行为模式卡片，可通过下方按钮翻页。"])
+        self._card_text.tag_configure("page0", elide=False)
+        self._shown_page = 0
+        self._page_var.set("请先选择左侧的触发情境")
+        self._next_var.set("")
+        self._set_nav_enabled(False)
+
+    def _set_nav_enabled(self, enabled: bool):
+        if enabled == self._nav_enabled:
+            return
+        flag = "!disabled" if enabled else "disabled"
+        self._btn_prev.state([flag])
+        self._btn_next.state([flag])
+        self._nav_enabled = enabled
+
+    def _prev_card(self):
+        self._step_card(-1)
+
     def _next_card(self):
+        self._step_card(1)
+
+    def _step_card(self, delta: int):
         if not self._cards:
             return
-        self._card_index = (self._card_index + 1) % len(self._cards)
+        self._card_index = (self._card_index + delta) % len(self._cards)
         self._update_card_display()
 
+    def _on_page_key(self, delta: int):
+        """连续的翻页按键只累计步数，等事件队列空闲时一次性翻到目标页。"""
+        if not self._cards or self.focus_get() is self._filter_entry:
+            return  # 在搜索框里 ←/→ 只移动光标
+        self._pending_delta += delta
+        if self._page_key_job is None:
+            self._page_key_job = self.after_idle(self._flush_page_keys)
+
+    def _flush_page_keys(self):
+        self._page_key_job = None
+        delta, self._pending_delta = self._pending_delta, 0
+        if delta:
+            self._step_card(delta)
+
     def _update_card_display(self):
         if not self._cards:
-            self._page_var.set("请先选择左侧的触发情境")
-            self._card_text.config(state=tk.NORMAL)
-            self._card_text.delete("1.0", tk.END)
-            self._card_text.insert(tk.END, "选择左侧任一触发情境后，此处将显示对应的行为模式卡片，可通过下方按钮翻页。")
-            self._card_text.config(state=tk.DISABLED)
-            self._btn_prev.state(["disabled"])
-            self._btn_next.state(["disabled"])
+            self._show_placeholder()
             return
 
         n = len(self._cards)
         self._page_var.set(f"第 {self._card_index + 1} / {n} 张")
-        self._btn_prev.state(["!disabled"])
-        self._btn_next.state(["!disabled"])
-
-        card = self._cards[self._card_index]
-        self._card_text.config(state=tk.NORMAL)
-        self._card_text.delete("1.0", tk.END)
-        self._card_text.insert(tk.END, _card_to_display_text(card))
-        self._card_text.see("1.0")
-        self._card_text.config(state=tk.DISABLED)
-        self._card_text.update_idletasks()
-
+        self._set_nav_enabled(True)
+        self._update_next_hint()
 
-def main():
+        if self._shown_page == self._card_index:
+            return
+        text = self._card_text
+        if self._shown_page is not None:
+            text.tag_configure(f"page{self._shown_page}", elide=True)
+        tag = f"page{self._card_index}"
+        text.tag_configure(tag, elide=False)
+        text.see(f"{tag}.first")
+        self._shown_page = self._card_index
+
+
+def main(argv: Optional[List[str]] = None):
+    startup_timer.mark("import")
+    parser = argparse.ArgumentParser(prog="npd_windows", description="隐性NPD父母 · 内在程序模型（图形界面）")
+    parser.add_argument("--profile", action="store_true", help="退出时输出各函数与界面事件的调用次数与耗时")
+    parser.add_argument("--profile-stats", metavar="FILE", help="同 --profile，并用 cProfile 记录、写入 FILE")
+    parser.add_argument("--journal", metavar="PATH", help="事件日志 .jsonl：按它学习，在卡片下方显示接下来可能出现的模式")
+    parser.add_argument("--library", metavar="PATH", help="使用自定义库文件（JSON / TOML，见 npd_library.py）")
+    parser.add_argument("--compact", action="store_true", help="以列式紧凑形式加载 --library（几万张卡片以上的大库启动快得多）")
+    parser.add_argument("--startup-log", metavar="FILE", default=os.environ.get(LOG_ENV),
+                        help=f"把各启动阶段的耗时追加为 FILE 中的一行 JSON（也可设环境变量 {LOG_ENV}）")
+    args, _ = parser.parse_known_args(argv)
+    if TriggerType is not None and (args.profile or args.profile_stats):
+        from npd_profile import profiling
+        with profiling(args.profile_stats, gui=NPDApp):  # 以脚本或 exe 运行时本模块是 __main__，直接把类交过去
+            _run(args.journal, args.library, args.compact, args.startup_log)
+    else:
+        _run(args.journal, args.library, args.compact, args.startup_log)
+
+
+def _show_error(message: str):
+    root = tk.Tk()
+    root.title("错误")
+    tk.Label(root, text=message, font=("Microsoft YaHei UI", 12), padx=20, pady=20).pack()
+    root.mainloop()
+
+
+def _run(journal: Optional[str] = None, library: Optional[str] = None, compact: bool = False,
+         startup_log: Optional[str] = None):
     if TriggerType is None:
-        root = tk.Tk()
-        root.title("错误")
-        tk.Label(
-            root,
-            text="请将 npd.py 放在同目录下后再运行 npd_windows.py。",
-            font=("Microsoft YaHei UI", 12),
-            padx=20,
-            pady=20,
-        ).pack()
-        root.mainloop()
+        _show_error("请将 npd.py 放在同目录下后再运行 npd_windows.py。")
+        return
+    try:
+        prepare_startup_data(library, compact)
+    except (OSError, ValueError) as e:  # 窗口程序没有控制台：库文件读不了时弹窗说明
+        _show_error(f"无法载入库文件 {library}：{e}")
         return
-    app = NPDApp()
+    startup_timer.mark("data")
+    app = NPDApp(journal, startup_log, library, compact)
+    startup_timer.mark("window")
     app.mainloop()
 
 
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()  # 打包为 exe 后进程池的子进程也从这里启动；源码运行时无需导入
     main()